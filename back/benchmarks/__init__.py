@@ -0,0 +1,5 @@
+# Throughput benchmarks (`python -m benchmarks`) and kernel equivalence checks (`python -m benchmarks.equivalence`)
+# on synthetic force-curve experiments; run from back/
+from .synthetic import SyntheticSpec, iter_synthetic_chunks, synthetic_truth, write_hdf5
+from .measure import CaseResult, measure
+from .suites import SUITES, BenchmarkContext, run_suites
@@ -0,0 +1,113 @@
+"""
+Run the benchmarks from back/:
+
+    python -m benchmarks --preset quick
+    python -m benchmarks --preset standard --suite cpoints fmodels
+    python -m benchmarks --curves 1000000 --points 1000 --suite ingest exporters
+    python -m benchmarks --preset quick --update-baseline
+
+Each case reports curves/sec and peak RSS next to the stored baseline for the
+same preset (or size); the exit status is 1 when any case fails, with or
+without a baseline, or regressed beyond the tolerance. Cases whose optional
+dependency (pyarrow) is not installed are skipped and do not fail. Baselines
+are machine specific: record them on the machine that runs the comparison.
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+
+from benchmarks.baselines import BASELINES_PATH, DEFAULT_TOLERANCE, baseline_entry, compare, load_baselines, save_baselines
+from benchmarks.suites import SUITES, BenchmarkContext, run_suites
+from benchmarks.synthetic import SyntheticSpec
+
+# Experiment size of each preset, and how many of its curves the stage suites and the exporters process
+PRESETS = {
+    "smoke": {"curves": 10, "points": 1_000, "stage_curves": 10, "export_curves": 10},
+    "quick": {"curves": 200, "points": 2_000, "stage_curves": 50, "export_curves": 200},
+    "standard": {"curves": 5_000, "points": 10_000, "stage_curves": 200, "export_curves": 1_000},
+    "dense": {"curves": 1_000, "points": 100_000, "stage_curves": 50, "export_curves": 200},
+    "large": {"curves": 100_000, "points": 10_000, "stage_curves": 500, "export_curves": 5_000},
+    "huge": {"curves": 1_000_000, "points": 1_000, "stage_curves": 1_000, "export_curves": 20_000},
+}
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Throughput benchmarks on synthetic force-curve experiments.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--curves", type=int, help="Override the preset's number of curves")
+    parser.add_argument("--points", type=int, help="Override the preset's points per curve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="Baselines file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    parser.add_argument("--workdir", help="Where to put the generated files (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated files")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    logging.disable(logging.INFO)  # The pipeline logs every curve
+
+    preset = PRESETS[args.preset]
+    overridden = args.curves is not None or args.points is not None
+    spec = SyntheticSpec(n_curves=args.curves or preset["curves"], n_points=args.points or preset["points"], seed=args.seed)
+    run_key = f"{spec.n_curves}x{spec.n_points}" if overridden else args.preset
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="nanoidenter-bench-")
+    context = BenchmarkContext(spec, workdir, stage_curves=preset["stage_curves"], export_curves=preset["export_curves"])
+
+    baselines = load_baselines(args.baselines)
+    run_baseline = baselines.get(run_key, {})
+    print(f"Benchmark '{run_key}': {spec.n_curves} curves x {spec.n_points} points, seed {spec.seed}, "
+          f"{context.stage_curves} stage / {context.export_curves} export curves")
+    print(f"{'case':<34}{'curves':>9}{'seconds':>10}{'curves/s':>12}{'peak MB':>10}{'baseline/s':>12}  status")
+
+    results, regressions = [], 0
+    try:
+        for result in run_suites(context, args.suite):
+            results.append(result)
+            key = f"{result.suite}/{result.name}"
+            baseline = run_baseline.get(key)
+            # A failing case counts whether or not it has a baseline
+            reasons = [] if result.skipped else compare(result, baseline or {}, args.tolerance)
+            regressions += bool(reasons)
+            if result.skipped:
+                status = f"skipped: {result.skipped}"
+            elif result.error:
+                status = f"FAILED: {result.error}"
+            elif reasons:
+                status = "REGRESSION: " + "; ".join(reasons)
+            else:
+                status = "ok" if baseline else "new"
+            base_rate = f"{baseline['curves_per_sec']:.1f}" if baseline else "-"
+            print(f"{key:<34}{result.curves:>9}{result.seconds:>10.3f}{result.curves_per_sec:>12.1f}"
+                  f"{result.peak_rss_mb:>10.0f}{base_rate:>12}  {status}", flush=True)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"run": run_key, "spec": vars(spec), "results": [r.to_dict() for r in results]}, f, indent=2)
+    failures = sum(1 for r in results if r.error)
+    if args.update_baseline:
+        # Failing and skipped cases get no baseline
+        baselines[run_key] = {**run_baseline, **{f"{r.suite}/{r.name}": baseline_entry(r) for r in results if not r.error and not r.skipped}}
+        save_baselines(baselines, args.baselines)
+        print(f"Baseline '{run_key}' updated in {args.baselines}")
+        if failures:
+            print(f"{failures} case(s) failed")
+            return 1
+        return 0
+    if regressions:
+        print(f"{regressions} case(s) failed or regressed")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
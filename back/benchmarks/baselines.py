@@ -0,0 +1,41 @@
+# Stored benchmark baselines and the regression check against them
+import json
+import os
+from typing import Dict, List
+
+from benchmarks.measure import CaseResult
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# Relative slowdown (or memory growth) tolerated before a case counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Memory growth always tolerated, so small cases do not trip on allocator noise
+RSS_SLACK_MB = 64.0
+
+def load_baselines(path: str = BASELINES_PATH) -> Dict[str, Dict[str, Dict]]:
+    """Baselines by run key (preset name, or '<curves>x<points>'), then by 'suite/case'."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_baselines(baselines: Dict[str, Dict[str, Dict]], path: str = BASELINES_PATH) -> None:
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def baseline_entry(result: CaseResult) -> Dict:
+    return {"curves_per_sec": round(result.curves_per_sec, 3), "peak_rss_mb": round(result.peak_rss_mb, 1)}
+
+def compare(result: CaseResult, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Reasons the result regressed from its baseline entry; empty when it did not."""
+    if result.error:
+        return [f"failed: {result.error}"]
+    reasons = []
+    base_rate = baseline.get("curves_per_sec") or 0.0
+    if base_rate > 0 and result.curves_per_sec < base_rate * (1.0 - tolerance):
+        reasons.append(f"throughput {result.curves_per_sec:.1f}/s vs {base_rate:.1f}/s")
+    base_rss = baseline.get("peak_rss_mb") or 0.0
+    if base_rss > 0 and result.peak_rss_mb > max(base_rss * (1.0 + tolerance), base_rss + RSS_SLACK_MB):
+        reasons.append(f"peak RSS {result.peak_rss_mb:.0f} MB vs {base_rss:.0f} MB")
+    return reasons
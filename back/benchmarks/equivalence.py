@@ -0,0 +1,384 @@
+"""
+Numerical equivalence of a candidate kernel (a faster CP method, indentation,
+elasticity spectrum, fmodel or emodel) with the reference implementation. Both
+run side by side on generated and recorded curves; every stage is fed the
+reference output of the stages before it, so a deviation is the candidate's
+alone. Run from back/:
+
+    python -m benchmarks.equivalence --stage cp --kernel gofsphere --candidate fast_kernels:FastGofSphere
+    python -m benchmarks.equivalence --stage elspectra --candidate fast_kernels:calc_elspectra --db data/my.db
+    python -m benchmarks.equivalence --stage fmodel --kernel hertz --candidate fast_kernels:FastHertz --tolerance modulus=1e-4
+
+The exit status is 1 when any deviation exceeds its tolerance or the two
+implementations disagree on which curves have a result.
+"""
+import sys
+import argparse
+import importlib
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import duckdb
+import numpy as np
+from benchmarks.measure import quiet
+from benchmarks.synthetic import SyntheticSpec, iter_synthetic_chunks
+
+STAGES = ("cp", "indentation", "elspectra", "fmodel", "emodel")
+
+# Maximum deviation accepted per quantity: absolute for positions and forces, relative for moduli and fit parameters
+DEFAULT_TOLERANCES = {
+    "contact_z": 1e-9,  # m
+    "contact_force": 1e-12,  # N
+    "indentation": 1e-12,  # m
+    "indentation_force": 1e-15,  # N
+    "elasticity": 1e-6,  # relative
+    "modulus": 1e-6,  # relative, every fmodel parameter
+    "emodel_params": 1e-6,  # relative
+}
+
+# Quantities each stage is judged on
+STAGE_METRICS = {
+    "cp": ("contact_z", "contact_force"),
+    "indentation": ("indentation", "indentation_force"),
+    "elspectra": ("elasticity",),
+    "fmodel": ("modulus",),
+    "emodel": ("emodel_params",),
+}
+
+# Upstream settings, as fetch_curves_batch uses them by default
+UPSTREAM_CP = "autothresh"
+ELSPECTRA_ARGS = {"win": 61, "order": 2, "tip_angle": 30.0, "interp": True}
+
+_KERNEL_DIRS = {
+    "cp": ("filters/cpoints/import_cpoints", "filters.cpoints.import_cpoints"),
+    "fmodel": ("filters/fmodels/import_fmodels", "filters.fmodels.import_fmodels"),
+    "emodel": ("filters/emodels/import_emodels", "filters.emodels.import_emodels"),
+}
+
+@dataclass
+class CurveCase:
+    curve_id: str
+    z: np.ndarray
+    force: np.ndarray
+    metadata: Dict[str, Any]
+
+@dataclass
+class EquivalenceReport:
+    stage: str
+    reference: str
+    candidate: str
+    curves: int = 0
+    compared: int = 0  # Curves where both produced a result
+    mismatched: List[str] = field(default_factory=list)  # Curves where only one did, or shapes differ
+    max_deviation: Dict[str, float] = field(default_factory=dict)
+    worst_curve: Dict[str, str] = field(default_factory=dict)
+    tolerances: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def failures(self) -> List[str]:
+        reasons = [
+            f"{metric} deviates by {value:.3e} (tolerance {self.tolerances[metric]:.3e}, worst {self.worst_curve[metric]})"
+            for metric, value in self.max_deviation.items()
+            if not value <= self.tolerances[metric]  # NaN fails too
+        ]
+        if self.mismatched:
+            reasons.append(f"results differ in availability or shape for {len(self.mismatched)} curve(s), e.g. {', '.join(self.mismatched[:5])}")
+        return reasons
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def record(self, metric: str, deviation: float, curve_id: str) -> None:
+        if metric not in self.max_deviation or not deviation <= self.max_deviation[metric]:
+            self.max_deviation[metric] = deviation
+            self.worst_curve[metric] = curve_id
+
+# ---------- curves ----------
+
+def generated_curves(spec: SyntheticSpec) -> Iterator[CurveCase]:
+    """The synthetic experiment's curves, baseline-corrected as they are stored."""
+    from transform.transform import transform_data
+    meta = spec.metadata()
+    for chunk in iter_synthetic_chunks(spec):
+        for curve_id, curve in transform_data(chunk).items():
+            segment = curve.segments[0]
+            yield CurveCase(curve_id, np.asarray(segment.z_sensor, dtype=np.float64), np.asarray(segment.deflection, dtype=np.float64), meta)
+
+def recorded_curves(db_path: str, curve_ids: Optional[List[int]] = None, limit: Optional[int] = None) -> Iterator[CurveCase]:
+    """Curves of the active dataset in db_path (all, or the given ids, at most limit), with their stored metadata."""
+    from storage.lazy_source import lazy_curve_scope
+    with duckdb.connect(db_path, read_only=True) as conn, lazy_curve_scope(conn, curve_ids or None):
+        query = "SELECT curve_id, z_values, force_values, spring_constant, tip_radius, tip_geometry FROM force_vs_z"
+        if curve_ids:
+            query += " WHERE curve_id IN ({})".format(",".join(str(int(cid)) for cid in curve_ids))
+        query += " ORDER BY curve_id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        for curve_id, z, force, spring_constant, tip_radius, tip_geometry in conn.execute(query).fetchall():
+            if not z or not force:
+                continue
+            metadata = {"spring_constant": spring_constant, "tip_radius": tip_radius, "tip_geometry": tip_geometry or "sphere"}
+            yield CurveCase(f"curve{curve_id}", np.asarray(z, dtype=np.float64), np.asarray(force, dtype=np.float64), metadata)
+
+# ---------- kernels ----------
+
+def _kernel_classes(stage: str) -> Dict[str, type]:
+    from filters.load_classes import load_filter_classes
+    directory, package = _KERNEL_DIRS[stage]
+    with quiet():
+        classes = load_filter_classes(Path(directory), package)
+    return {cls.NAME.lower(): cls for cls in classes}
+
+def _instance(cls: type, params: Optional[Dict[str, Any]]) -> Any:
+    """A configured kernel object: parameters take values the way the UDF wrappers set them."""
+    instance = cls()
+    instance.create()
+    for name, value in (params or {}).items():
+        if name not in instance.parameters:
+            raise ValueError(f"{cls.__name__} has no parameter '{name}'")
+        instance.parameters[name]["value"] = value
+    return instance
+
+def reference_kernel(stage: str, name: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> Tuple[Callable, Any]:
+    """
+    The current implementation of a stage as (callable, configured object or None).
+    cp, fmodel and emodel need the kernel's registry name (e.g. "gofsphere", "hertz").
+    """
+    if stage == "indentation":
+        from filters.calculate_indentation import calc_indentation
+        return calc_indentation, None
+    if stage == "elspectra":
+        from filters.calculate_elasticity import calc_elspectra
+        return calc_elspectra, None
+    if stage not in _KERNEL_DIRS:
+        raise ValueError(f"Unknown stage '{stage}' (choose from {', '.join(STAGES)})")
+    classes = _kernel_classes(stage)
+    if not name or name.lower() not in classes:
+        raise ValueError(f"Stage '{stage}' needs one of: {', '.join(sorted(classes))}")
+    instance = _instance(classes[name.lower()], params)
+    return instance.calculate, instance
+
+def load_candidate(target: Any, params: Optional[Dict[str, Any]] = None) -> Callable:
+    """
+    A candidate kernel from a callable, a kernel class, or a "module:attribute"
+    string naming either. Classes are instantiated and configured like the
+    registered filters and their calculate() is used.
+    """
+    if isinstance(target, str):
+        module_name, _, attribute = target.partition(":")
+        if not attribute:
+            raise ValueError("Candidates are given as 'module:attribute'")
+        target = getattr(importlib.import_module(module_name), attribute)
+    if isinstance(target, type):
+        return _instance(target, params).calculate
+    if not callable(target):
+        raise ValueError(f"{target!r} is not callable")
+    return target
+
+def _call(kernel: Callable, *args) -> Any:
+    """Run a kernel as the UDF wrappers do: any exception means no result."""
+    try:
+        with quiet():
+            return kernel(*args)
+    except Exception:
+        return None
+
+# ---------- comparison ----------
+
+def _arrays(result: Any, count: int) -> Optional[List[np.ndarray]]:
+    """The first count arrays of a kernel result, None when there is no usable result."""
+    if result is None or result is False:
+        return None
+    try:
+        arrays = [np.asarray(result[i], dtype=np.float64).ravel() for i in range(count)]
+    except (TypeError, ValueError, IndexError):
+        return None
+    return arrays
+
+def _absolute(reference: np.ndarray, candidate: np.ndarray) -> float:
+    if reference.size == 0:
+        return 0.0
+    return float(np.max(np.abs(reference - candidate)))
+
+def _relative(reference: np.ndarray, candidate: np.ndarray) -> float:
+    if reference.size == 0:
+        return 0.0
+    scale = np.maximum(np.maximum(np.abs(reference), np.abs(candidate)), np.finfo(np.float64).tiny)
+    deviation = np.abs(reference - candidate) / scale
+    deviation[reference == candidate] = 0.0  # Equal infinities, zeros
+    return float(np.max(deviation))
+
+def _compare_results(report: EquivalenceReport, curve_id: str, reference: Any, candidate: Any) -> None:
+    stage = report.stage
+    count = {"cp": 1, "indentation": 2, "elspectra": 2}.get(stage)
+    if stage in ("fmodel", "emodel"):
+        # Fits return [x, y_fit, params]; params are what gets stored and exported
+        reference = [reference[-1]] if _arrays(reference, 1) is not None else None
+        candidate = [candidate[-1]] if _arrays(candidate, 1) is not None else None
+        count = 1
+    ref, cand = _arrays(reference, count), _arrays(candidate, count)
+    if ref is None and cand is None:
+        return
+    if ref is None or cand is None or [a.shape for a in ref] != [a.shape for a in cand]:
+        report.mismatched.append(curve_id)
+        return
+    report.compared += 1
+    if stage == "cp":
+        if ref[0].size < 2:
+            report.mismatched.append(curve_id)
+            return
+        report.record("contact_z", abs(ref[0][0] - cand[0][0]), curve_id)
+        report.record("contact_force", abs(ref[0][1] - cand[0][1]), curve_id)
+    elif stage == "indentation":
+        report.record("indentation", _absolute(ref[0], cand[0]), curve_id)
+        report.record("indentation_force", _absolute(ref[1], cand[1]), curve_id)
+    elif stage == "elspectra":
+        # Depths must match exactly up to the indentation tolerance; the moduli relatively
+        report.record("indentation", _absolute(ref[0], cand[0]), curve_id)
+        report.record("elasticity", _relative(ref[1], cand[1]), curve_id)
+    else:
+        report.record(STAGE_METRICS[stage][0], _relative(ref[0], cand[0]), curve_id)
+
+# ---------- harness ----------
+
+def _window(instance: Any, zi: np.ndarray, values: np.ndarray, stage: str) -> Tuple[np.ndarray, np.ndarray]:
+    """The fit window the UDF wrappers cut (minInd/maxInd in nm, default 0-800 nm)."""
+    if stage == "fmodel":
+        from filters.fmodels.fmodel_registry import getFizi as cut
+    else:
+        from filters.emodels.emodel_registry import getEizi as cut
+    low = float(instance.get_value("minInd")) * 1e-9 if "minInd" in instance.parameters else 0.0
+    high = float(instance.get_value("maxInd")) * 1e-9 if "maxInd" in instance.parameters else 800e-9
+    return cut(low, high, zi, values)
+
+def check_equivalence(
+    stage: str,
+    candidate: Any,
+    curves: Iterable[CurveCase],
+    kernel: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    tolerances: Optional[Dict[str, float]] = None,
+    upstream_cp: str = UPSTREAM_CP,
+    set_zero_force: bool = True,
+) -> EquivalenceReport:
+    """
+    Run the reference implementation of stage (kernel names the CP method or
+    model) and candidate on every curve, and report the largest deviation of each
+    quantity. params configures both; tolerances override DEFAULT_TOLERANCES.
+    """
+    reference, ref_instance = reference_kernel(stage, kernel, params)
+    candidate_kernel = load_candidate(candidate, params)
+    upstream = reference_kernel("cp", upstream_cp)[0] if stage != "cp" else reference
+    from filters.calculate_indentation import calc_indentation
+    from filters.calculate_elasticity import calc_elspectra
+
+    limits = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    unknown = sorted(set(tolerances or {}) - set(DEFAULT_TOLERANCES))
+    if unknown:
+        raise ValueError(f"Unknown tolerances: {', '.join(unknown)} (choose from {', '.join(DEFAULT_TOLERANCES)})")
+    metrics = STAGE_METRICS[stage] + (("indentation",) if stage == "elspectra" else ())
+    report = EquivalenceReport(stage, kernel or stage, getattr(candidate, "__name__", str(candidate)), tolerances={m: limits[m] for m in metrics})
+
+    for case in curves:
+        report.curves += 1
+        meta = case.metadata
+        if stage == "cp":
+            _compare_results(report, case.curve_id, _call(reference, case.z, case.force, meta), _call(candidate_kernel, case.z, case.force, meta))
+            continue
+        cp = _call(upstream, case.z, case.force, meta)
+        if _arrays(cp, 1) is None:
+            continue
+        cp = [list(map(float, cp[0]))]
+        indentation_args = (case.z.tolist(), case.force.tolist(), cp, float(meta.get("spring_constant") or 1.0), set_zero_force)
+        if stage == "indentation":
+            _compare_results(report, case.curve_id, _call(reference, *indentation_args), _call(candidate_kernel, *indentation_args))
+            continue
+        indentation = _arrays(_call(calc_indentation, *indentation_args), 2)
+        if indentation is None:
+            continue
+        zi, fi = indentation
+        if stage == "fmodel":
+            x, y = _window(ref_instance, zi, fi, stage)
+            if x.size <= 5:  # The fmodel UDF skips windows this small
+                continue
+            _compare_results(report, case.curve_id, _call(reference, x, y), _call(candidate_kernel, x, y))
+            continue
+        elspectra_args = (
+            zi.tolist(), fi.tolist(), ELSPECTRA_ARGS["win"], ELSPECTRA_ARGS["order"],
+            meta.get("tip_geometry") or "sphere", float(meta.get("tip_radius") or 1e-5),
+            ELSPECTRA_ARGS["tip_angle"], ELSPECTRA_ARGS["interp"],
+        )
+        if stage == "elspectra":
+            _compare_results(report, case.curve_id, _call(reference, *elspectra_args), _call(candidate_kernel, *elspectra_args))
+            continue
+        spectrum = _arrays(_call(calc_elspectra, *elspectra_args), 2)
+        if spectrum is None:
+            continue
+        x, y = _window(ref_instance, spectrum[0], spectrum[1], stage)
+        if x.size == 0:
+            continue
+        _compare_results(report, case.curve_id, _call(reference, x, y), _call(candidate_kernel, x, y))
+    return report
+
+# ---------- command line ----------
+
+def _key_values(pairs: List[str], label: str) -> Dict[str, float]:
+    values = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"{label} are given as name=value, got '{pair}'")
+        values[key] = float(value)
+    return values
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.equivalence", description="Compare a candidate kernel with the reference implementation.")
+    parser.add_argument("--stage", choices=STAGES, required=True)
+    parser.add_argument("--kernel", help="Reference CP method or model for the cp/fmodel/emodel stages (e.g. gofsphere, hertz)")
+    parser.add_argument("--candidate", help="Candidate as module:attribute (default: the reference itself, a determinism check)")
+    parser.add_argument("--param", nargs="*", default=[], help="Kernel parameters as name=value, applied to both")
+    parser.add_argument("--tolerance", nargs="*", default=[], help=f"Overrides as name=value; names: {', '.join(DEFAULT_TOLERANCES)}")
+    parser.add_argument("--upstream-cp", default=UPSTREAM_CP, help="CP method producing the input of the later stages")
+    parser.add_argument("--curves", type=int, default=50, help="Generated curves (0 for none)")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="Also compare on the recorded curves of this database's active dataset")
+    parser.add_argument("--recorded", type=int, default=100, help="At most this many recorded curves")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    params = _key_values(args.param, "Parameters")
+    tolerances = _key_values(args.tolerance, "Tolerances")
+    reference = reference_kernel(args.stage, args.kernel, params)[0]
+    candidate = args.candidate or reference
+
+    sources = []
+    if args.curves:
+        sources.append(("generated", generated_curves(SyntheticSpec(n_curves=max(args.curves, 10), n_points=args.points, seed=args.seed))))
+    if args.db:
+        sources.append(("recorded", recorded_curves(args.db, limit=args.recorded)))
+    if not sources:
+        print("Nothing to compare: give --curves and/or --db")
+        return 1
+
+    failed = False
+    for label, curves in sources:
+        report = check_equivalence(args.stage, candidate, curves, kernel=args.kernel, params=params,
+                                   tolerances=tolerances, upstream_cp=args.upstream_cp)
+        print(f"[{label}] {report.stage} {report.reference} vs {args.candidate or 'reference'}: "
+              f"{report.compared}/{report.curves} curves compared")
+        for metric, limit in report.tolerances.items():
+            value = report.max_deviation.get(metric)
+            shown = "-" if value is None else f"{value:.3e}"
+            where = f" ({report.worst_curve[metric]})" if value else ""
+            print(f"  {metric:<18} max deviation {shown:>10}  tolerance {limit:.1e}{where}")
+        for reason in report.failures:
+            print(f"  FAIL: {reason}")
+        print("  " + ("PASS" if report.passed else "FAIL"))
+        failed = failed or not report.passed
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# Wall time and peak resident memory of one benchmark case
+import os
+import sys
+import time
+import resource
+import threading
+import contextlib
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+# Seconds between resident-memory samples while a case runs
+RSS_SAMPLE_INTERVAL_S = 0.01
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+@dataclass
+class CaseResult:
+    suite: str
+    name: str
+    curves: int
+    seconds: float
+    peak_rss_mb: float
+    error: Optional[str] = None
+    # Why the case did not run (its optional dependency is missing); skipped cases never fail
+    skipped: Optional[str] = None
+
+    @property
+    def curves_per_sec(self) -> float:
+        return self.curves / self.seconds if self.seconds > 0 and not self.error and not self.skipped else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "curves_per_sec": self.curves_per_sec}
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _lifetime_peak_rss() -> int:
+    """Peak resident set size since the process started, in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KiB elsewhere
+
+class _PeakSampler(threading.Thread):
+    """Samples the resident set size in the background, keeping the maximum."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss() or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLE_INTERVAL_S):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, current_rss() or 0)
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress prints, which would otherwise dominate both the output and the timings."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(suite: str, name: str, curves: int, run: Callable[[], Any]) -> CaseResult:
+    """
+    Time run() and record the peak resident memory while it ran. Sampling
+    /proc/self/statm gives the peak of this case alone; elsewhere the process'
+    lifetime peak is reported. An exception is recorded on the result, not raised.
+    """
+    sampler = _PeakSampler() if current_rss() is not None else None
+    if sampler:
+        sampler.start()
+    error = None
+    start = time.perf_counter()
+    try:
+        run()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    peak = sampler.stop() if sampler else _lifetime_peak_rss()
+    return CaseResult(suite, name, curves, seconds, peak / (1 << 20), error)
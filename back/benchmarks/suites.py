@@ -0,0 +1,255 @@
+# Benchmark cases: every processing stage, ingest path and exporter, run on one synthetic experiment
+import os
+import shutil
+import importlib.util
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import duckdb
+from benchmarks.measure import CaseResult, measure, quiet
+from benchmarks.synthetic import HDF5_FORCE_PATH, HDF5_Z_PATH, SyntheticSpec, iter_synthetic_chunks, write_hdf5
+
+SUITES = ("ingest", "filters", "cpoints", "fmodels", "emodels", "pipeline", "exporters")
+
+# Contact point method the model stages start from
+REFERENCE_CP = "autothresh"
+# Curves per fetch_curves_batch call, as the batch jobs use
+FETCH_BATCH_CURVES = 100
+
+# Dataset paths under which each opener finds the curves an exporter wrote
+ROUNDTRIP_PATHS = {
+    "json": ("curve0/approach/Force", "curve0/approach/Z"),
+    "csv": ("Force (N)", "Z (m)"),
+    "txt": ("Force (N)", "Z (m)"),
+    "parquet": ("force_values", "z_values"),
+    "arrow": ("force_values", "z_values"),
+}
+
+# Options each raw export case passes, as the export endpoint does
+EXPORT_CASES = {
+    "csv": ("csv", {}),
+    "txt": ("txt", {}),
+    "json": ("json", {}),
+    "hdf5": ("hdf5", {"dataset_path": "dataset", "level_names": ["curve0", "segment0"], "metadata_path": "tip"}),
+    "hdf5_chunked": ("hdf5", {"dataset_path": "dataset", "level_names": ["curve0", "segment0"], "metadata_path": "tip", "layout": "chunked"}),
+    "parquet": ("parquet", {}),
+    "arrow": ("arrow", {}),
+}
+
+# Optional module each format needs; its cases are skipped where it is not installed
+OPTIONAL_DEPENDENCIES = {"arrow": "pyarrow"}
+
+CACHE_TABLES = ("contact_points", "indentations", "elspectra", "curve_results")
+
+@dataclass
+class BenchmarkContext:
+    """
+    One synthetic experiment stored in workdir/bench.db. The stage suites process
+    the first stage_curves curves, the exporters and file ingests the first
+    export_curves; direct ingests always take the whole experiment.
+    """
+    spec: SyntheticSpec
+    workdir: str
+    stage_curves: int
+    export_curves: int
+    db_path: str = ""
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.db_path = self.db_path or os.path.join(self.workdir, "bench.db")
+        self.metadata = self.metadata or self.spec.metadata()
+        self.stage_curves = min(self.stage_curves, self.spec.n_curves)
+        self.export_curves = min(self.export_curves, self.spec.n_curves)
+
+    def curve_ids(self, count: int) -> List[str]:
+        return [f"curve{i}" for i in range(count)]
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def _case(suite: str, name: str, curves: int, run: Callable[[], Any]) -> CaseResult:
+    with quiet():
+        return measure(suite, name, curves, run)
+
+def _skipped(suite: str, name: str, curves: int, extension: str) -> Optional[CaseResult]:
+    """A skipped result when the format's optional dependency is not installed, else None."""
+    module = OPTIONAL_DEPENDENCIES.get(extension)
+    if module and importlib.util.find_spec(module) is None:
+        return CaseResult(suite, name, curves, 0.0, 0.0, skipped=f"{module} is not installed")
+    return None
+
+def _ingest_chunks(chunks, db_path: str, storage_profile: str = "float64") -> int:
+    from storage.duckdb_storage import save_curve_chunks_to_duckdb
+    from transform.transform import transform_data
+    return save_curve_chunks_to_duckdb((transform_data(chunk) for chunk in chunks), db_path, name="benchmark", storage_profile=storage_profile)["curve_count"]
+
+def build_database(context: BenchmarkContext) -> CaseResult:
+    """Store the experiment as the dataset every other suite reads; timed as the direct ingest."""
+    _remove(context.db_path)
+    return _case("ingest", "synthetic", context.spec.n_curves, lambda: _ingest_chunks(iter_synthetic_chunks(context.spec), context.db_path))
+
+def _clear_caches(conn: duckdb.DuckDBPyConnection, keep_contact_points: bool = False) -> None:
+    from db import ensure_cache_tables
+    ensure_cache_tables(conn)
+    for table in CACHE_TABLES:
+        if keep_contact_points and table in ("contact_points", "indentations"):
+            continue
+        conn.execute(f"DELETE FROM {table}")
+
+def _fetch_all(context: BenchmarkContext, conn: duckdb.DuckDBPyConnection, filters: Dict, compute_elspectra: bool) -> None:
+    from db import fetch_curves_batch
+    curve_ids = context.curve_ids(context.stage_curves)
+    for start in range(0, len(curve_ids), FETCH_BATCH_CURVES):
+        fetch_curves_batch(
+            conn,
+            curve_ids[start:start + FETCH_BATCH_CURVES],
+            filters,
+            single=True,
+            metadata=context.metadata,
+            compute_elspectra=compute_elspectra,
+        )
+
+def _stage_filters(regular: Optional[Dict] = None, cp: Optional[str] = None, f_models: Optional[Dict] = None, e_models: Optional[Dict] = None) -> Dict:
+    return {
+        "regular": regular or {},
+        "cp_filters": {cp: {}} if cp else {},
+        "f_models": f_models or {},
+        "e_models": e_models or {},
+    }
+
+def _stage_cases(context: BenchmarkContext, suites: List[str]) -> Iterator[CaseResult]:
+    """Filters, CP methods, models and the whole pipeline, each from cold caches over the stage curves."""
+    from db import register_filters
+    from filters.filters.filter_registry import FILTER_REGISTRY
+    from filters.cpoints.cp_registry import CONTACT_POINT_REGISTRY
+    from filters.fmodels.fmodel_registry import FMODEL_REGISTRY
+    from filters.emodels.emodel_registry import EMODEL_REGISTRY
+
+    if not set(suites) & {"filters", "cpoints", "fmodels", "emodels", "pipeline"}:
+        return
+    count = context.stage_curves
+    conn = duckdb.connect(context.db_path)
+    try:
+        with quiet():
+            register_filters(conn)
+
+        def run(suite: str, name: str, filters: Dict, compute_elspectra: bool = False, warm_cp: bool = False) -> CaseResult:
+            _clear_caches(conn)
+            if warm_cp:
+                with quiet():
+                    _fetch_all(context, conn, _stage_filters(cp=REFERENCE_CP), False)
+                _clear_caches(conn, keep_contact_points=True)
+            return _case(suite, name, count, lambda: _fetch_all(context, conn, filters, compute_elspectra))
+
+        if "filters" in suites:
+            for name in sorted(FILTER_REGISTRY):
+                yield run("filters", name, _stage_filters(regular={name: {}}))
+        if "cpoints" in suites:
+            for name in sorted(CONTACT_POINT_REGISTRY):
+                yield run("cpoints", name, _stage_filters(cp=name))
+            yield run("cpoints", "elspectra", _stage_filters(cp=REFERENCE_CP), compute_elspectra=True, warm_cp=True)
+        if "fmodels" in suites:
+            for name in sorted(FMODEL_REGISTRY):
+                yield run("fmodels", name, _stage_filters(cp=REFERENCE_CP, f_models={name: {}}), warm_cp=True)
+        if "emodels" in suites:
+            # Emodels fit the elasticity spectra, so each case includes computing them
+            for name in sorted(EMODEL_REGISTRY):
+                yield run("emodels", name, _stage_filters(cp=REFERENCE_CP, e_models={name: {}}), compute_elspectra=True, warm_cp=True)
+        if "pipeline" in suites:
+            full = _stage_filters(regular={"savgolsmooth": {}}, cp=REFERENCE_CP, f_models={"hertz": {}}, e_models={"constant": {}})
+            yield run("pipeline", "fetch_curves_batch", full, compute_elspectra=True)
+            # Same request again: contact points and indentations come from the caches
+            yield _case("pipeline", "fetch_curves_batch_cached", count, lambda: _fetch_all(context, conn, full, True))
+    finally:
+        conn.close()
+
+def _export(context: BenchmarkContext, extension: str, output_path: str, **kwargs) -> int:
+    from exporters import get_exporter
+    curve_ids = list(range(context.export_curves))
+    return get_exporter(extension).export(context.db_path, output_path, curve_ids, metadata=context.metadata, **kwargs)
+
+def _exporter_cases(context: BenchmarkContext) -> Iterator[CaseResult]:
+    """Raw export to every format over the export curves, and the SoftMech CSV exports over the stage curves."""
+    from exporters import get_exporter
+    for name, (extension, options) in EXPORT_CASES.items():
+        skipped = _skipped("exporters", name, context.export_curves, extension)
+        if skipped:
+            yield skipped
+            continue
+        output_path = context.path(f"export.{extension}")
+        yield _case("exporters", name, context.export_curves, lambda: _export(context, extension, output_path, **options))
+        _remove(output_path)
+
+    stage_ids = list(range(context.stage_curves))
+    softmech = {
+        "average": {"export_type": "average", "dataset_type": "Force", "filters": _stage_filters(cp=REFERENCE_CP)},
+        "scatter": {"export_type": "scatter", "dataset_type": "Force Model", "filters": _stage_filters(cp=REFERENCE_CP, f_models={"hertz": {}})},
+    }
+    for name, kwargs in softmech.items():
+        with duckdb.connect(context.db_path) as conn:
+            _clear_caches(conn)
+        output_path = context.path(f"export_{name}.csv")
+        yield _case("exporters", f"csv_{name}", len(stage_ids), lambda: get_exporter("csv").export(context.db_path, output_path, stage_ids, metadata=context.metadata, **kwargs))
+        _remove(output_path)
+
+def _ingest_cases(context: BenchmarkContext) -> Iterator[CaseResult]:
+    """Every way curves enter a database: direct (both storage profiles), through each opener, and registered in place."""
+    from openers import get_opener
+    from storage.lazy_source import register_lazy_dataset
+
+    spec, meta = context.spec, context.metadata
+    target = context.path("ingest.db")
+
+    _remove(target)
+    yield _case("ingest", "synthetic_float32", spec.n_curves, lambda: _ingest_chunks(iter_synthetic_chunks(spec), target, "float32"))
+
+    hdf5_path = context.path("source.h5")
+    with quiet():
+        write_hdf5(spec, hdf5_path)
+    _remove(target)
+    yield _case("ingest", "hdf5", spec.n_curves, lambda: _ingest_chunks(get_opener("hdf5").process_chunks(hdf5_path, HDF5_FORCE_PATH, HDF5_Z_PATH, dict(meta)), target))
+    _remove(target)
+    yield _case("ingest", "hdf5_lazy", spec.n_curves, lambda: register_lazy_dataset(target, "hdf5", hdf5_path, HDF5_FORCE_PATH, HDF5_Z_PATH, dict(meta), name="benchmark"))
+    _remove(target, hdf5_path)
+
+    for extension, (force_path, z_path) in ROUNDTRIP_PATHS.items():
+        skipped = _skipped("ingest", extension, context.export_curves, extension)
+        if skipped:
+            yield skipped
+            continue
+        source_path = context.path(f"source.{extension}")
+        try:
+            with quiet():
+                _export(context, extension, source_path)
+        except Exception as e:  # The source file could not be written; the ingest case fails
+            yield CaseResult("ingest", extension, context.export_curves, 0.0, 0.0, f"{type(e).__name__}: {e}")
+            _remove(source_path)
+            continue
+        _remove(target)
+        yield _case("ingest", extension, context.export_curves, lambda: _ingest_chunks(get_opener(extension).process_chunks(source_path, force_path, z_path, dict(meta)), target))
+        if extension == "parquet":
+            _remove(target)
+            yield _case("ingest", "parquet_lazy", context.export_curves, lambda: register_lazy_dataset(target, "parquet", source_path, force_path, z_path, dict(meta), name="benchmark"))
+        _remove(target, source_path)
+
+def run_suites(context: BenchmarkContext, suites: List[str]) -> Iterator[CaseResult]:
+    """Build the experiment's database, then run the selected suites (in SUITES order), yielding each case as it finishes."""
+    unknown = sorted(set(suites) - set(SUITES))
+    if unknown:
+        raise ValueError(f"Unknown suites: {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+    os.makedirs(context.workdir, exist_ok=True)
+    built = build_database(context)
+    if built.error:
+        raise ValueError(f"Could not store the synthetic experiment: {built.error}")
+    if "ingest" in suites:
+        yield built
+        yield from _ingest_cases(context)
+    yield from _stage_cases(context, suites)
+    if "exporters" in suites:
+        yield from _exporter_cases(context)
@@ -0,0 +1,192 @@
+# Synthetic AFM indentation experiments with known ground truth, for benchmarks and numerical checks
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Tuple
+import h5py
+import numpy as np
+from models.force_curve import ForceCurve, Segment
+from openers.base import DEFAULT_CHUNK_SIZE
+
+# Experiment sizes the generator is meant for
+MIN_CURVES, MAX_CURVES = 10, 1_000_000
+MIN_POINTS, MAX_POINTS = 1_000, 100_000
+
+# Values generated per block: bounds the generator's memory whatever the curve length
+BLOCK_VALUES = 1 << 22
+
+# Layout of write_hdf5 files, as given to the HDF5 opener
+HDF5_FORCE_PATH = "curve0/segment0/force"
+HDF5_Z_PATH = "curve0/segment0/z"
+
+# Acquisition settings recorded with every curve
+SAMPLING_RATE = 1e5  # Hz
+VELOCITY = 1e-6  # m/s
+
+# Newton iterations solving for the indentation depth (quadratic convergence; 40 is never reached)
+MAX_NEWTON_STEPS = 40
+
+@dataclass
+class SyntheticSpec:
+    """
+    One synthetic experiment: n_curves spherical-indenter approach curves of
+    n_points samples each, in SI units. Every curve has its own contact point and
+    Young's modulus, a random baseline offset, a linear drift of the baseline, an
+    interference-like oscillation and white noise. Identical specs give identical
+    data.
+    """
+    n_curves: int = 100
+    n_points: int = 2000
+    seed: int = 0
+    spring_constant: float = 0.1  # N/m
+    tip_radius: float = 1e-5  # m
+    poisson: float = 0.5
+    youngs_modulus: float = 5e3  # Pa, median over the curves
+    modulus_spread: float = 0.3  # sigma of log(E)
+    z_range: float = 6e-6  # m of approach travel
+    contact_range: Tuple[float, float] = (0.4, 0.7)  # Where the contact lies along the travel
+    offset: float = 1e-9  # N, sigma of the baseline offset
+    drift: float = 2e-4  # N/m, sigma of the baseline slope
+    oscillation_amplitude: float = 3e-11  # N
+    oscillation_period: float = 1.2e-6  # m of travel
+    noise: float = 2e-11  # N, sigma of the white noise
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __post_init__(self):
+        if not MIN_CURVES <= self.n_curves <= MAX_CURVES:
+            raise ValueError(f"n_curves must be between {MIN_CURVES} and {MAX_CURVES}")
+        if not MIN_POINTS <= self.n_points <= MAX_POINTS:
+            raise ValueError(f"n_points must be between {MIN_POINTS} and {MAX_POINTS}")
+        low, high = self.contact_range
+        if not 0.0 < low <= high < 1.0:
+            raise ValueError("contact_range must lie strictly inside (0, 1)")
+        if self.spring_constant <= 0 or self.tip_radius <= 0 or self.z_range <= 0 or self.chunk_size <= 0:
+            raise ValueError("spring_constant, tip_radius, z_range and chunk_size must be positive")
+
+    @property
+    def block_size(self) -> int:
+        """Curves generated together; part of what makes the data reproducible."""
+        return max(1, min(self.chunk_size, BLOCK_VALUES // self.n_points))
+
+    def metadata(self) -> Dict[str, Any]:
+        """Import metadata matching the experiment, as the openers and the filter pipeline take it."""
+        return {
+            "file_id": f"synthetic-{self.seed}",
+            "date": "1970-01-01",
+            "instrument": "synthetic",
+            "sample": "hertzian",
+            "spring_constant": self.spring_constant,
+            "inv_ols": 1.0,
+            "tip_geometry": "sphere",
+            "tip_radius": self.tip_radius,
+            "sampling_rate": SAMPLING_RATE,
+            "velocity": VELOCITY,
+        }
+
+def _block_parameters(spec: SyntheticSpec, start: int, count: int) -> Dict[str, np.ndarray]:
+    """Per-curve parameters of the block of curves starting at start (drawn apart from the noise)."""
+    rng = np.random.default_rng([spec.seed, start, 0])
+    return {
+        "contact_z": spec.z_range * rng.uniform(*spec.contact_range, size=count),
+        "youngs_modulus": spec.youngs_modulus * np.exp(rng.normal(0.0, spec.modulus_spread, size=count)),
+        "offset": rng.normal(0.0, spec.offset, size=count),
+        "drift": rng.normal(0.0, spec.drift, size=count),
+        "phase": rng.uniform(0.0, 2.0 * math.pi, size=count),
+    }
+
+def _indentation_depth(travel: np.ndarray, stiffness: np.ndarray) -> np.ndarray:
+    """
+    Solve d + stiffness * d**1.5 = travel for the indentation depth d: past the
+    contact the piezo travel is shared between the sample and the cantilever.
+    Newton's method from d = travel converges monotonically (the left side is
+    convex and increasing).
+    """
+    depth = travel.copy()
+    for _ in range(MAX_NEWTON_STEPS):
+        root = np.sqrt(depth)
+        step = (depth + stiffness * depth * root - travel) / (1.0 + 1.5 * stiffness * root)
+        depth -= step
+        np.maximum(depth, 0.0, out=depth)
+        if not np.any(np.abs(step) > 1e-12 * np.maximum(depth, 1e-30)):
+            break
+    return depth
+
+def _generate_block(spec: SyntheticSpec, start: int, count: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """z (n_points,), force (count, n_points) and the parameters of one block of curves."""
+    params = _block_parameters(spec, start, count)
+    z = np.linspace(0.0, spec.z_range, spec.n_points)
+    contact = params["contact_z"][:, None]
+    # Hertz, sphere: F = 4/3 E / (1 - nu^2) sqrt(R) d^1.5, and the cantilever bends by F / k
+    hertz = 4.0 / 3.0 * params["youngs_modulus"] / (1.0 - spec.poisson ** 2) * math.sqrt(spec.tip_radius)
+    stiffness = (hertz / spec.spring_constant)[:, None]
+    depth = _indentation_depth(np.clip(z - contact, 0.0, None), stiffness)
+    force = spec.spring_constant * stiffness * depth ** 1.5
+    force += params["offset"][:, None] + params["drift"][:, None] * z
+    force += spec.oscillation_amplitude * np.sin(2.0 * math.pi * z / spec.oscillation_period + params["phase"][:, None])
+    force += np.random.default_rng([spec.seed, start, 1]).normal(0.0, spec.noise, size=force.shape)
+    return z, force, params
+
+def iter_blocks(spec: SyntheticSpec) -> Iterator[Tuple[int, np.ndarray, np.ndarray, Dict[str, np.ndarray]]]:
+    """Yield (first curve index, z, force, parameters) for each block of the experiment."""
+    for start in range(0, spec.n_curves, spec.block_size):
+        count = min(spec.block_size, spec.n_curves - start)
+        yield (start, *_generate_block(spec, start, count))
+
+def iter_synthetic_chunks(spec: SyntheticSpec) -> Iterator[Dict[str, ForceCurve]]:
+    """
+    Yield the experiment as opener-style chunks of ForceCurves (at most
+    spec.chunk_size each), ready for transform_data and storage. The true
+    contact point and modulus of each curve are in its analysis dict.
+    """
+    meta = spec.metadata()
+    chunk: Dict[str, ForceCurve] = {}
+    for start, z, force, params in iter_blocks(spec):
+        for offset in range(force.shape[0]):
+            contact_z = float(params["contact_z"][offset])
+            segment = Segment(
+                type="approach",
+                deflection=force[offset],
+                z_sensor=z.copy(),
+                sampling_rate=SAMPLING_RATE,
+                velocity=VELOCITY,
+                no_points=spec.n_points,
+            )
+            chunk[f"curve{start + offset}"] = ForceCurve(
+                file_id=meta["file_id"],
+                date=meta["date"],
+                instrument=meta["instrument"],
+                sample=meta["sample"],
+                spring_constant=spec.spring_constant,
+                inv_ols=meta["inv_ols"],
+                tip_geometry=meta["tip_geometry"],
+                tip_radius=spec.tip_radius,
+                segments=[segment],
+                analysis={
+                    "model": "hertz",
+                    "youngs_modulus": float(params["youngs_modulus"][offset]),
+                    "contact_point": [contact_z, float(np.interp(contact_z, z, force[offset]))],
+                },
+            )
+            if len(chunk) == spec.chunk_size:
+                yield chunk
+                chunk = {}
+    if chunk:
+        yield chunk
+
+def synthetic_truth(spec: SyntheticSpec) -> Dict[str, np.ndarray]:
+    """True contact z (m) and Young's modulus (Pa) of every curve, indexed by curve id, without generating the curves."""
+    blocks = [
+        _block_parameters(spec, start, min(spec.block_size, spec.n_curves - start))
+        for start in range(0, spec.n_curves, spec.block_size)
+    ]
+    return {key: np.concatenate([block[key] for block in blocks]) for key in ("contact_z", "youngs_modulus")}
+
+def write_hdf5(spec: SyntheticSpec, path: str) -> int:
+    """Write the experiment as an HDF5 file in the HDF5_FORCE_PATH / HDF5_Z_PATH layout. Returns the number of curves."""
+    force_name, z_name = HDF5_FORCE_PATH.split("/", 1)[1], HDF5_Z_PATH.split("/", 1)[1]
+    with h5py.File(path, "w") as f:
+        for start, z, force, _ in iter_blocks(spec):
+            for offset in range(force.shape[0]):
+                group = f.create_group(f"curve{start + offset}")
+                group.create_dataset(force_name, data=force[offset])
+                group.create_dataset(z_name, data=z)
+    return spec.n_curves
@@ -0,0 +1,3 @@
+# Unit tests live in tests/ and run from back/: python -m pytest
+# test_softmech_export.py drives a running server by hand and is not collected
+collect_ignore = ["test_softmech_export.py"]
@@ -7,14 +7,26 @@ from filters.cpoints.apply_contact_point_filters import apply_cp_filters
 from filters.fmodels.apply_fmodels import apply_fmodels
 from filters.emodels.apply_emodels import apply_emodels
 from filters.register_all import register_filters
+from models.curve_batch import CurveBatch
+from storage.lazy_source import lazy_curve_scope
+from metrics import record_cache, time_stage
 import pandas as pd  # Ensure pandas is imported
 import hashlib
 import json
+import logging
 import math
+import os
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
-# Stores absolute DuckDB database path for analysis queries
-DB_PATH = "data/all.db"
+logger = logging.getLogger(__name__)
+
+# Experiment database: ingested datasets, caches and stored fit results (curve_results).
+# Every router, the job manager and the bulk endpoints open this one file.
+DB_PATH = "data/experiment.db"
+
+# Tip half-angle (degrees) the elasticity spectra are computed with
+ELSPECTRA_TIP_ANGLE = 30.0
 
 # Provide stable hash strings for filter dictionaries
 def _hash_dict(d: Dict) -> str:
@@ -101,6 +113,417 @@ def _ensure_extended_cache_tables(conn: duckdb.DuckDBPyConnection):
         )
     """)
 
+    # Create per-curve fit results table (fmodel / emodel parameters)
+    # e_modulus holds the first fitted parameter (E for Hertz / Constant models)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS curve_results (
+            dataset_fp VARCHAR,
+            curve_id INTEGER,
+            stage_hash VARCHAR,
+            stage VARCHAR,
+            model_name VARCHAR,
+            e_modulus DOUBLE,
+            params DOUBLE[],
+            PRIMARY KEY (dataset_fp, curve_id, stage_hash)
+        )
+    """)
+
+# Identify the dataset currently stored in force_vs_z so persisted results never leak across imports
+def get_dataset_fingerprint(conn: duckdb.DuckDBPyConnection) -> str:
+    """
+    Return the fingerprint of the dataset loaded in force_vs_z.
+    Uses the fingerprint recorded at ingest time (dataset_info) and falls back to
+    a cheap aggregate over force_vs_z for databases created before it existed.
+    """
+    try:
+        row = conn.execute("SELECT fingerprint FROM dataset_info LIMIT 1").fetchone()
+        if row and row[0]:
+            return row[0]
+    except duckdb.Error:
+        pass
+
+    try:
+        row = conn.execute("""
+            SELECT COUNT(*), SUM(no_points), MIN(curve_id), MAX(curve_id),
+                   SUM(force_values[1]), SUM(z_values[-1]),
+                   string_agg(DISTINCT file_id, ',')
+            FROM force_vs_z
+        """).fetchone()
+    except duckdb.Error:
+        return "no_dataset"
+    return _json_hash([str(v) for v in row])
+
+def _stage_metadata(metadata: Optional[Dict]) -> Dict:
+    """Subset of request metadata that influences CP, indentation and model results."""
+    meta = metadata or {}
+    return {
+        "spring_constant": meta.get("spring_constant"),
+        "tip_radius": meta.get("tip_radius"),
+        "tip_geometry": meta.get("tip_geometry"),
+    }
+
+def fmodel_stage_hash(filters: Dict, metadata: Optional[Dict] = None, force_model_params: Optional[Dict] = None, set_zero_force: bool = True) -> str:
+    """
+    Hash of every input that determines a force-model fit.
+    Regular filters are excluded: the CP -> indentation -> model path reads raw force_values.
+    """
+    if force_model_params is None:
+        force_model_params = {"maxInd": 800, "minInd": 0, "poisson": 0.5}
+    return _json_hash({
+        "stage": "fmodel",
+        "cp_filters": filters.get("cp_filters", {}),
+        "f_models": filters.get("f_models", {}),
+        "force_model_params": force_model_params,
+        "metadata": _stage_metadata(metadata),
+        "set_zero_force": bool(set_zero_force),
+    })
+
+def emodel_stage_hash(filters: Dict, metadata: Optional[Dict] = None, elasticity_params: Optional[Dict] = None, elastic_model_params: Optional[Dict] = None, set_zero_force: bool = True) -> str:
+    """Hash of every input that determines an elasticity-model fit (elspectra settings included)."""
+    if elastic_model_params is None:
+        elastic_model_params = {"maxInd": 800, "minInd": 0}
+    elasticity_params = elasticity_params or {}
+    return _json_hash({
+        "stage": "emodel",
+        "cp_filters": filters.get("cp_filters", {}),
+        "e_models": filters.get("e_models", {}),
+        "elastic_model_params": elastic_model_params,
+        "window": elasticity_params.get("window", 61),
+        "order": elasticity_params.get("order", 2),
+        "interpolate": elasticity_params.get("interpolate", True),
+        "metadata": _stage_metadata(metadata),
+        "set_zero_force": bool(set_zero_force),
+    })
+
+def contact_point_key(conn: duckdb.DuckDBPyConnection, cp_filters: Dict, metadata: Optional[Dict] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (method, params_hash) under which contact points of the active CP filter (the first
+    entry of cp_filters) are cached; (None, None) without a CP filter.
+    """
+    for name, cfg in (cp_filters or {}).items():
+        # treat any present cp filter as active; tweak if you have an 'enabled' flag
+        # hash includes params + metadata that influence CP
+        cp_hash_payload = {
+            "method": name,  # e.g., 'autothresh' / 'gofsphere'
+            "params": cfg,  # whole dict is okay; contains param array
+            "spring_constant": metadata.get("spring_constant") if metadata else None,
+            "tip_radius": metadata.get("tip_radius") if metadata else None,
+            "tip_geometry": metadata.get("tip_geometry") if metadata else None,
+            # contact_points is shared by every stored dataset
+            "dataset_fp": get_dataset_fingerprint(conn),
+        }
+        return name, _json_hash(cp_hash_payload)
+    return None, None
+
+def indentation_key(dataset_fp: str, cp_values) -> str:
+    """
+    cp_hash under which an indentation is cached: the contact point it was computed
+    from, within one dataset (curve ids restart at 0 in every stored dataset).
+    """
+    return _json_hash({"cp_values": cp_values, "dataset_fp": dataset_fp})
+
+def elspectra_key(dataset_fp: str, cp_values, metadata: Optional[Dict], win: int, order: int, interp: bool, tip_angle: float = ELSPECTRA_TIP_ANGLE) -> str:
+    """spec_hash under which the elasticity spectrum computed from this contact point is cached."""
+    return _json_hash({
+        "cp_hash": _json_hash(cp_values) if cp_values is not None else None,
+        # elspectra is shared by every stored dataset
+        "dataset_fp": dataset_fp,
+        "win": win,
+        "order": order,
+        "interp": interp,
+        "tip_geometry": metadata.get("tip_geometry") if metadata else None,
+        "tip_radius": metadata.get("tip_radius") if metadata else None,
+        "tip_angle": tip_angle,
+    })
+
+def _cached_contact_points(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], cp_filters: Dict, metadata: Optional[Dict]) -> List[Tuple]:
+    """(curve_id, cp_values) of the requested curves whose contact point is cached for these CP settings."""
+    cp_method, cp_params_hash = contact_point_key(conn, cp_filters, metadata)
+    numeric_ids = _numeric_curve_ids(curve_ids)
+    if cp_method is None or not numeric_ids:
+        return []
+    return conn.execute(
+        "SELECT curve_id, cp_values FROM contact_points WHERE method = ? AND params_hash = ? AND curve_id IN ({})".format(",".join(numeric_ids)),
+        [cp_method, cp_params_hash],
+    ).fetchall()
+
+def _cached_pair_extents(conn: duckdb.DuckDBPyConnection, table: str, key_column: str, x: str, y: str, channel: str, keys: Dict[int, str]) -> Dict[int, Tuple[float, float, int]]:
+    """
+    {curve_id: (min, max, n)} of channel over the pairs of table's x / y arrays the
+    average export keeps (both finite), for the rows keyed by keys; n is the number
+    of distinct x among those pairs. The y extrema still count the values of repeated
+    x, which the export drops. Curves without such pairs get (nan, nan, 0).
+    """
+    if channel not in (x, y):
+        raise ValueError(f"channel must be {x!r} or {y!r}")
+    if not keys:
+        return {}
+    frame = pd.DataFrame({
+        "curve_id": pd.Series(list(keys), dtype="int32"),
+        "cache_key": list(keys.values()),
+    })
+    conn.register("_extent_keys", frame)
+    try:
+        rows = conn.execute(f"""
+            SELECT curve_id,
+                   list_min(list_transform(kept, j -> {channel}[j])),
+                   list_max(list_transform(kept, j -> {channel}[j])),
+                   len(list_distinct(list_transform(kept, j -> {x}[j])))
+            FROM (
+                SELECT c.curve_id, c.{x}, c.{y},
+                       list_filter(generate_series(1, least(len(c.{x}), len(c.{y}))), j -> isfinite(c.{x}[j]) AND isfinite(c.{y}[j])) AS kept
+                FROM {table} c
+                JOIN _extent_keys k ON k.curve_id = c.curve_id AND k.cache_key = c.{key_column}
+            )
+        """).fetchall()
+    finally:
+        conn.unregister("_extent_keys")
+    return {
+        int(cid): (float("nan"), float("nan"), 0) if lo is None or hi is None else (lo, hi, int(n))
+        for cid, lo, hi, n in rows
+    }
+
+def load_indentation_extents(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], cp_filters: Dict, metadata: Optional[Dict] = None, channel: str = "zi") -> Dict[int, Tuple[float, float, int]]:
+    """
+    {curve_id: (min, max, n)} of channel ("zi" or "fi") over the finite (zi, fi) pairs
+    of every requested curve whose contact point and indentation are both cached for
+    these CP settings; n is the number of distinct zi among them. Only these figures
+    leave DuckDB, never the curves.
+    """
+    cp_rows = _cached_contact_points(conn, curve_ids, cp_filters, metadata)
+    if not cp_rows:
+        return {}
+    dataset_fp = get_dataset_fingerprint(conn)
+    # Indentations are keyed by the hash of the contact point they were computed from
+    keys = {int(cid): indentation_key(dataset_fp, cp_values) for cid, cp_values in cp_rows}
+    return _cached_pair_extents(conn, "indentations", "cp_hash", "zi", "fi", channel, keys)
+
+def load_elspectra_extents(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], cp_filters: Dict, metadata: Optional[Dict] = None, channel: str = "ze", elasticity_params: Optional[Dict] = None) -> Dict[int, Tuple[float, float, int]]:
+    """
+    As load_indentation_extents, for the elasticity spectra (ze, ee) cached for these
+    CP settings and elasticity parameters (fetch_curves_batch defaults when None).
+    """
+    cp_rows = _cached_contact_points(conn, curve_ids, cp_filters, metadata)
+    if not cp_rows:
+        return {}
+    dataset_fp = get_dataset_fingerprint(conn)
+    params = elasticity_params or {}
+    win, order, interp = params.get("window", 61), params.get("order", 2), params.get("interpolate", True)
+    keys = {int(cid): elspectra_key(dataset_fp, cp_values, metadata, win, order, interp) for cid, cp_values in cp_rows}
+    return _cached_pair_extents(conn, "elspectra", "spec_hash", "ze", "ee", channel, keys)
+
+def _fit_params(result) -> Optional[List[float]]:
+    """Parameters of a model UDF result [x, y, params]; None for models that only return the fitted curve [x, y]."""
+    if result is None or len(result) < 3 or not isinstance(result[2], (list, tuple)):
+        return None
+    return result[2]
+
+def save_curve_results(conn: duckdb.DuckDBPyConnection, rows: List[Tuple]) -> None:
+    """
+    Persist fit results, ignoring rows that already exist.
+    Each row is (dataset_fp, curve_id, stage_hash, stage, model_name, params).
+    A failed write is logged and re-raised; callers that can do without the
+    stored rows (they only save recomputation) catch duckdb.Error themselves.
+    """
+    if not rows:
+        return
+    try:
+        conn.executemany(
+            """
+            INSERT INTO curve_results (dataset_fp, curve_id, stage_hash, stage, model_name, e_modulus, params)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dataset_fp, curve_id, stage_hash) DO NOTHING
+            """,
+            [
+                (fp, int(cid), stage_hash, stage, model_name,
+                 float(params[0]) if params else None, [float(p) for p in params])
+                for fp, cid, stage_hash, stage, model_name, params in rows
+            ],
+        )
+    except duckdb.Error as e:
+        logger.error(f"Failed to persist {len(rows)} curve results: {e}")
+        raise
+
+def load_curve_results(conn: duckdb.DuckDBPyConnection, dataset_fp: str, stage_hash: str, curve_ids: Optional[List[str]] = None) -> Dict[int, List[float]]:
+    """
+    Return {curve_id: params} for stored results of one pipeline stage.
+    curve_ids accepts "curve0" or "0" style ids; None loads every stored curve.
+    """
+    query = "SELECT curve_id, params FROM curve_results WHERE dataset_fp = ? AND stage_hash = ?"
+    if curve_ids is not None:
+        numeric_ids = _numeric_curve_ids(curve_ids)
+        if not numeric_ids:
+            return {}
+        query += " AND curve_id IN ({})".format(",".join(numeric_ids))
+    try:
+        rows = conn.execute(query, [dataset_fp, stage_hash]).fetchall()
+    except duckdb.Error as e:
+        logger.warning(f"Failed to read curve results: {e}")
+        return {}
+    return {int(cid): list(params) for cid, params in rows}
+
+def split_cached_curves(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], dataset_fp: str, stage_hash: str) -> Tuple[Dict[int, List[float]], List[str]]:
+    """
+    Partition curve_ids into stored results and ids that still need computing.
+
+    Returns:
+        Tuple of ({curve_id: params} for stored curves, list of missing ids in input order)
+    """
+    cached = load_curve_results(conn, dataset_fp, stage_hash, curve_ids)
+    missing = []
+    for cid in curve_ids:
+        numeric = _numeric_curve_ids([cid])
+        if not numeric or int(numeric[0]) not in cached:
+            missing.append(cid)
+    record_cache("curve_results", len(curve_ids) - len(missing), len(missing))
+    return cached, missing
+
+def result_curve_id(entry: Dict) -> Optional[int]:
+    """Numeric curve id of an fparam ("5_hertz") or elasticity ("curve5") result entry."""
+    raw = str(entry.get("curve_id", ""))
+    raw = raw.split("_")[0]
+    if raw.startswith("curve"):
+        raw = raw[5:]
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+def make_fparam_entry(curve_id: int, params: List[float], curve_index: int) -> Dict:
+    """Build an fparam entry in the shape produced by fetch_curves_batch."""
+    return {"curve_id": f"{curve_id}_hertz", "params": params, "curve_index": curve_index, "fparam": params}
+
+def make_elasticity_entry(curve_id: int, params: List[float], curve_index: int) -> Dict:
+    """Build an elasticity-param entry in the shape produced by fetch_curves_batch."""
+    return {"curve_id": f"curve{curve_id}", "curve_index": curve_index, "elasticity_param": params}
+
+# Metadata columns of force_vs_z that fit statistics may be grouped by
+RESULT_GROUP_COLUMNS = ("sample", "file_id", "instrument")
+
+def resolve_result_stage_hash(conn: duckdb.DuckDBPyConnection, dataset_fp: str, stage: str, model_name: Optional[str] = None) -> Optional[str]:
+    """Return the stage hash with the most stored curves for this dataset and stage (None if nothing is stored)."""
+    query = "SELECT stage_hash FROM curve_results WHERE dataset_fp = ? AND stage = ?"
+    params = [dataset_fp, stage]
+    if model_name:
+        query += " AND model_name = ?"
+        params.append(model_name.lower())
+    query += " GROUP BY stage_hash ORDER BY COUNT(*) DESC LIMIT 1"
+    row = conn.execute(query, params).fetchone()
+    return row[0] if row else None
+
+def _result_values_cte(log_scale: bool = False) -> str:
+    """CTE selecting one finite fit parameter per curve; binds (param_index, dataset_fp, stage_hash)."""
+    value = "list_extract(params, ?)"
+    return f"""
+        vals AS (
+            SELECT curve_id, {'log10(v)' if log_scale else 'v'} AS x
+            FROM (
+                SELECT curve_id, {value} AS v
+                FROM curve_results
+                WHERE dataset_fp = ? AND stage_hash = ?
+            )
+            WHERE v IS NOT NULL AND isfinite(v){' AND v > 0' if log_scale else ''}
+        )
+    """
+
+def summarize_curve_results(conn: duckdb.DuckDBPyConnection, dataset_fp: str, stage_hash: str, param_index: int = 0, quantiles: Optional[List[float]] = None) -> Dict:
+    """
+    Count, mean, std, min, max and quantiles of one fit parameter, computed in DuckDB.
+    param_index is 0-based (0 -> E for Hertz / Constant models).
+    """
+    quantiles = quantiles or [0.05, 0.25, 0.5, 0.75, 0.95]
+    q_list = "[" + ", ".join(str(float(q)) for q in quantiles) + "]"
+    row = conn.execute(f"""
+        WITH {_result_values_cte()}
+        SELECT COUNT(x), AVG(x), STDDEV_SAMP(x), MIN(x), MAX(x),
+               CASE WHEN COUNT(x) > 0 THEN quantile_cont(x, {q_list}) END
+        FROM vals
+    """, [param_index + 1, dataset_fp, stage_hash]).fetchone()
+    count, mean, std, vmin, vmax, qvalues = row
+    return {
+        "count": int(count),
+        "mean": mean,
+        "std": std,
+        "min": vmin,
+        "max": vmax,
+        "quantiles": dict(zip([str(q) for q in quantiles], qvalues or [None] * len(quantiles))),
+    }
+
+def histogram_curve_results(conn: duckdb.DuckDBPyConnection, dataset_fp: str, stage_hash: str, param_index: int = 0, bins: int = 50, log_scale: bool = False, value_range: Optional[List[float]] = None) -> Dict:
+    """
+    Fixed-width histogram of one fit parameter, binned in DuckDB.
+    With log_scale the edges are log10 values and non-positive values are dropped.
+    value_range ([lo, hi]) clips the histogram; otherwise the data range is used.
+    """
+    bins = max(1, int(bins))
+    if value_range:
+        bounds_sql = "SELECT CAST(? AS DOUBLE) AS lo, CAST(? AS DOUBLE) AS hi"
+        bounds_params = [float(value_range[0]), float(value_range[1])]
+    else:
+        bounds_sql = "SELECT MIN(x) AS lo, MAX(x) AS hi FROM vals"
+        bounds_params = []
+
+    rows = conn.execute(f"""
+        WITH {_result_values_cte(log_scale)},
+        bounds AS ({bounds_sql})
+        SELECT
+            CASE WHEN hi > lo
+                 THEN LEAST(CAST(floor((x - lo) / (hi - lo) * {bins}) AS INTEGER), {bins - 1})
+                 ELSE 0 END AS bin,
+            COUNT(*) AS n,
+            ANY_VALUE(lo), ANY_VALUE(hi)
+        FROM vals, bounds
+        WHERE x >= lo AND x <= hi
+        GROUP BY bin
+        ORDER BY bin
+    """, [param_index + 1, dataset_fp, stage_hash] + bounds_params).fetchall()
+
+    if not rows:
+        return {"edges": [], "counts": [], "log_scale": log_scale}
+    lo, hi = rows[0][2], rows[0][3]
+    counts = [0] * bins
+    for b, n, _, _ in rows:
+        counts[b] = int(n)
+    width = (hi - lo) / bins if hi > lo else 0.0
+    edges = [lo + width * i for i in range(bins + 1)]
+    return {"edges": edges, "counts": counts, "log_scale": log_scale}
+
+def group_curve_results(conn: duckdb.DuckDBPyConnection, dataset_fp: str, stage_hash: str, group_by: str, param_index: int = 0) -> List[Dict]:
+    """Per-group count, mean, std and median of one fit parameter, grouped by a force_vs_z metadata column."""
+    if group_by not in RESULT_GROUP_COLUMNS:
+        raise ValueError(f"group_by must be one of: {', '.join(RESULT_GROUP_COLUMNS)}")
+    rows = conn.execute(f"""
+        WITH {_result_values_cte()},
+        curve_meta AS (
+            SELECT curve_id, ANY_VALUE({group_by}) AS grp
+            FROM force_vs_z
+            GROUP BY curve_id
+        )
+        SELECT m.grp, COUNT(v.x), AVG(v.x), STDDEV_SAMP(v.x), MEDIAN(v.x)
+        FROM vals v
+        JOIN curve_meta m ON m.curve_id = v.curve_id
+        GROUP BY m.grp
+        ORDER BY m.grp
+    """, [param_index + 1, dataset_fp, stage_hash]).fetchall()
+    return [
+        {"group": grp, "count": int(n), "mean": mean, "std": std, "median": median}
+        for grp, n, mean, std, median in rows
+    ]
+
+def _numeric_curve_ids(curve_ids: List[str]) -> List[str]:
+    """Convert "curve0" style ids to numeric strings, skipping malformed entries."""
+    numeric_curve_ids = []
+    for cid in curve_ids:
+        cid = str(cid)
+        if cid.startswith('curve'):
+            try:
+                numeric_curve_ids.append(str(int(cid[5:])))
+            except ValueError:
+                continue
+        else:
+            numeric_curve_ids.append(cid)
+    return numeric_curve_ids
+
 def get_metadata_for_curves(conn: duckdb.DuckDBPyConnection, curve_ids: List[str]) -> Dict:
     """
     Retrieve metadata (spring_constant, tip_radius, tip_geometry) for the given curves.
@@ -164,7 +587,7 @@ def get_metadata_for_curves(conn: duckdb.DuckDBPyConnection, curve_ids: List[str
 
 
 
-def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], filters: Dict, single = False, metadata: Dict = None, set_zero_force: bool = True, elasticity_params: Dict = None, elastic_model_params: Dict = None, force_model_params: Dict = None, compute_elspectra: bool = True) -> Tuple[List[Dict], Dict]:
+def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], filters: Dict, single = False, metadata: Dict = None, set_zero_force: bool = True, elasticity_params: Dict = None, elastic_model_params: Dict = None, force_model_params: Dict = None, compute_elspectra: bool = True, result_rows: Optional[List[Tuple]] = None) -> Tuple[List[Dict], Dict]:
     """
     Fetches a batch of curve data from DuckDB and applies filters dynamically in SQL.
     
@@ -179,6 +602,9 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
         elastic_model_params: Dictionary containing elastic model parameters
         force_model_params: Dictionary containing force model parameters
         compute_elspectra: Whether to compute elasticity spectra (skip if only fparams needed)
+        result_rows: If given, fit results are appended here as save_curve_results rows for the
+            caller to persist (e.g. from a read-only connection) instead of being saved. Rows are
+            keyed by fmodel_stage_hash / emodel_stage_hash of exactly these metadata and parameters.
     
     Returns:
         Tuple containing:
@@ -186,6 +612,27 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
         - graph_force_indentation: Dict with curves and domain for Force vs Indentation
         - graph_elspectra: Dict with curves and domain for Elspectra
     """
+    # A dataset registered in place gets the requested curves' values read from its source file
+    with lazy_curve_scope(conn, _integer_curve_ids(curve_ids)):
+        return _fetch_curves_batch(
+            conn, curve_ids, filters, single, metadata, set_zero_force,
+            elasticity_params, elastic_model_params, force_model_params, compute_elspectra, result_rows,
+        )
+
+
+def _integer_curve_ids(curve_ids: List[str]) -> List[int]:
+    """Numeric ids of "curveN" / "N" curve ids; anything else is skipped."""
+    numeric_ids = []
+    for cid in curve_ids:
+        try:
+            numeric_ids.append(int(cid[5:] if cid.startswith("curve") else cid))
+        except ValueError:
+            continue
+    return numeric_ids
+
+
+def _fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], filters: Dict, single = False, metadata: Dict = None, set_zero_force: bool = True, elasticity_params: Dict = None, elastic_model_params: Dict = None, force_model_params: Dict = None, compute_elspectra: bool = True, result_sink: Optional[List[Tuple]] = None) -> Tuple[List[Dict], Dict]:
+    """Body of fetch_curves_batch, run with force_vs_z holding the requested curves' values."""
     # Stores request metadata overrides ensuring fallbacks for indentation defaults
     meta = metadata or {}
 
@@ -252,25 +699,7 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
     # ---- CACHING SETUP ----
     
     # Identify the active CP UDF + params (pick first enabled entry)
-    active_cp = None
-    cp_method = None
-    cp_params_hash = None
-    
-    if cp_filters:
-        for name, cfg in cp_filters.items():
-            # treat any present cp filter as active; tweak if you have an 'enabled' flag
-            active_cp = (name, cfg)
-            cp_method = name  # e.g., 'autothresh' / 'gofsphere'
-            # hash includes params + metadata that influence CP
-            cp_hash_payload = {
-                "method": cp_method,
-                "params": cfg,  # whole dict is okay; contains param array
-                "spring_constant": metadata.get("spring_constant") if metadata else None,
-                "tip_radius": metadata.get("tip_radius") if metadata else None,
-                "tip_geometry": metadata.get("tip_geometry") if metadata else None,
-            }
-            cp_params_hash = _json_hash(cp_hash_payload)
-            break
+    cp_method, cp_params_hash = contact_point_key(conn, cp_filters, metadata)
     
     base_query = """
         SELECT curve_id, z_values, force_values 
@@ -280,19 +709,16 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
 
     # --- Graph 1: Force vs Z (Regular Filters) ---
     query_regular = apply(base_query, regular_filters, curve_ids)
-    result_regular = conn.execute(query_regular).fetchall()
-    
-    curves_regular = [
-        {
-            "curve_id": f"curve{row[0]}",
-            "x": row[1],
-            "y": row[2]
-        }
-        for row in result_regular
-    ]
-    # print("graphgorcevsz",curves_regular)
-    domain_regular = compute_domain(conn, curves_regular, "curves_temp_regular")
-    graph_force_vs_z = {"curves": curves_regular, "domain": domain_regular}
+    result_regular = conn.execute(query_regular).fetchnumpy()
+    batch_regular = CurveBatch.from_arrays(
+        result_regular["curve_id"], z=result_regular["z_values"], force=result_regular["force_values"]
+    )
+    with time_stage("domain"):
+        domain_regular = batch_regular.domain("z", "force")
+    graph_force_vs_z = {
+        "curves": batch_regular.to_graph_curves("z", "force"),
+        "domain": domain_regular,
+    }
     
     # --- Graph 2: Force vs Indentation and Elspectra (CP Filters, if active) ---
     # print("graph_force_vs_z")
@@ -313,19 +739,31 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
               AND curve_id IN ({ids_csv})
         )
         """
+        cached_cp_ids = {
+            row[0] for row in conn.execute(f"""
+                SELECT DISTINCT curve_id FROM contact_points
+                WHERE method = '{cp_method}' AND params_hash = '{cp_params_hash}' AND curve_id IN ({ids_csv})
+            """).fetchall()
+        }
+        record_cache("contact_points", len(cached_cp_ids), len(numeric_curve_ids) - len(cached_cp_ids))
         
-        # 2) generate the original CP query for computing misses
-        query_cp = apply_cp_filters(base_query, cp_filters, curve_ids, metadata)
-        # print(f"Generated cp query: {query_cp}")
-        
-        # 3) compute rows only for missing curve_ids
-        query_cp_miss = f"""
-            WITH base AS ({query_cp})
-            SELECT curve_id, z_values, force_values,
-                   cp_values, spring_constant, tip_radius, tip_geometry
-            FROM base
-            WHERE curve_id NOT IN (SELECT curve_id FROM cp_cached)
-        """
+        # 2) generate the original CP query for computing misses; it gets only the uncached
+        #    curves, since filtering its rows afterwards still runs the CP UDF on every curve
+        missing_cp_ids = [cid for cid in numeric_curve_ids if int(cid) not in cached_cp_ids]
+        if missing_cp_ids:
+            query_cp = apply_cp_filters(base_query, cp_filters, missing_cp_ids, metadata)
+            # print(f"Generated cp query: {query_cp}")
+            
+            # 3) compute rows only for missing curve_ids
+            query_cp_miss = f"""
+                WITH base AS ({query_cp})
+                SELECT curve_id, z_values, force_values,
+                       cp_values, spring_constant, tip_radius, tip_geometry
+                FROM base
+                WHERE curve_id NOT IN (SELECT curve_id FROM cp_cached)
+            """
+        else:
+            query_cp_miss = "SELECT * FROM cp_cached WHERE FALSE"
         cp_compute_cte = f"cp_compute AS ({query_cp_miss})"
         
         # 4) unified cp_data = cached ∪ computed (need z_values and force_values for indentation)
@@ -363,7 +801,7 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
         # Log force model parameters  
         print(f"🔧 Using force model parameters: maxInd={force_model_params.get('maxInd', 800)}, minInd={force_model_params.get('minInd', 0)}, poisson={force_model_params.get('poisson', 0.5)}")
         
-        tip_angle = 30.0
+        tip_angle = ELSPECTRA_TIP_ANGLE
         
         # Define defaults for model parameters
         # model = 'hertz'
@@ -482,6 +920,13 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
         cp_cache_rows = []
         # Collect indentation rows for deferred cache writes
         indent_cache_rows = []
+        # Collect fit parameters for the persistent curve_results store
+        result_rows = []
+        # Indentation, elspectra and fit results are all stored per dataset
+        dataset_fp = get_dataset_fingerprint(conn)
+        if fmodels or emodels:
+            fmodel_hash = fmodel_stage_hash(filters, metadata, force_model_params, set_zero_force) if fmodels else None
+            emodel_hash = emodel_stage_hash(filters, metadata, elasticity_params, elastic_model_params, set_zero_force) if emodels else None
         # print("result batch", result_batch)
         # print("emodels:", emodels)
         # print("single:", single)
@@ -490,8 +935,8 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
             # print("indentation_result",indentation_result)
             # print("elspectra_result", elspectra_result)
             # print("elastic_result", elastic_result)
-            # --- Cache contact point, if present ---
-            if cp_values is not None and cp_method is not None and cp_params_hash is not None:
+            # --- Cache contact point, if present and not cached yet ---
+            if cp_values is not None and cp_method is not None and cp_params_hash is not None and int(curve_id) not in cached_cp_ids:
                 cp_cache_rows.append(
                     (
                         int(curve_id),
@@ -510,7 +955,7 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                 # --- Cache indentation: indentations(curve_id, cp_hash, zi, fi) ---
                 # Prevent cache hashing failures from crashing batch processing
                 try:
-                    cp_hash = _json_hash(cp_values) if cp_values is not None else None
+                    cp_hash = indentation_key(dataset_fp, cp_values) if cp_values is not None else None
                 except Exception:
                     cp_hash = None
 
@@ -525,9 +970,15 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                     "y": fi
                 })
                 
+                fparam = _fit_params(hertz_result)
+                if fparam is not None and fmodels:
+                    result_rows.append(
+                        (dataset_fp, curve_id, fmodel_hash, "fmodel", next(iter(fmodels)), fparam)
+                    )
+
                 if hertz_result is not None and fmodels and single:
                     # print("hertz_result", len(hertz_result))
-                    x, y, fparam = hertz_result
+                    x, y = hertz_result[0], hertz_result[1]
                     # print(len(x),len(y))
                     curves_cp.append({
                         "curve_id": f"{curve_id}_hertz",
@@ -535,12 +986,13 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                         "y": y
                     })
                     # 👉 Append fparam with curve index - return all parameters
-                    curves_fparam.append({
-                        "curve_id": f"{curve_id}_hertz",
-                        "params": fparam,
-                        "curve_index": i,
-                        "fparam": fparam  # Preserve legacy fields for frontend compatibility
-                    })
+                    if fparam is not None:
+                        curves_fparam.append({
+                            "curve_id": f"{curve_id}_hertz",
+                            "params": fparam,
+                            "curve_index": i,
+                            "fparam": fparam  # Preserve legacy fields for frontend compatibility
+                        })
             
             
             if elspectra_result is not None:
@@ -554,22 +1006,7 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                 
                 # Cache elspectra result using spec_hash
                 try:
-                    # Compute cp_hash from cp_values if available
-                    cp_hash = None
-                    if cp_values is not None:
-                        cp_hash = _json_hash(cp_values)
-                    
-                    # Build spec_payload with cp_hash and elasticity params
-                    spec_payload = {
-                        "cp_hash": cp_hash,
-                        "win": win if need_elspectra else None,
-                        "order": order if need_elspectra else None,
-                        "interp": interp if need_elspectra else None,
-                        "tip_geometry": metadata.get("tip_geometry") if metadata else None,
-                        "tip_radius": metadata.get("tip_radius") if metadata else None,
-                        "tip_angle": tip_angle,
-                    }
-                    spec_hash = _json_hash(spec_payload)
+                    spec_hash = elspectra_key(dataset_fp, cp_values, metadata, win, order, interp, tip_angle)
                     
                     # Insert into cache (check first since DuckDB doesn't support ON CONFLICT)
                     existing = conn.execute("""
@@ -585,19 +1022,26 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                 except Exception as cache_err:
                     # Log but don't fail the main query if cache insert fails
                     print(f"Warning: Failed to cache elspectra for curve {curve_id}: {cache_err}")
+                elasticity_param = _fit_params(elastic_result)
+                if elasticity_param is not None and emodels:
+                    result_rows.append(
+                        (dataset_fp, curve_id, emodel_hash, "emodel", next(iter(emodels)), elasticity_param)
+                    )
                 if elastic_result is not None and emodels and single:
                     # print("elastic_result", elastic_result)
-                    x, y, elasticity_param = elastic_result
+                    x, y = elastic_result[0], elastic_result[1]
                     curves_el.append({
                         "curve_id": f"{curve_id}_elastic",
                         "x": x,
                         "y": y
                     })
                     # 👉 Append elasticity_param with curve index
-                    curves_elasticity_param.append({
-                        "curve_index": i,
-                        "elasticity_param": elasticity_param
-                    })
+                    if elasticity_param is not None:
+                        curves_elasticity_param.append({
+                            "curve_id": f"curve{curve_id}",
+                            "curve_index": i,
+                            "elasticity_param": elasticity_param
+                        })
         
         # --- Persist caches (ignore duplicates) ---
         if cp_cache_rows:
@@ -620,6 +1064,15 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                 indent_cache_rows,
             )
 
+        if result_sink is not None:
+            result_sink.extend(result_rows)
+        else:
+            try:
+                save_curve_results(conn, result_rows)
+            except duckdb.Error:
+                # Already logged; a missing stored fit only costs recomputation later
+                pass
+
         print("cp filters applied, batch indentation and elspectra calculated")
         print("curves_elasticity_param count:", len(curves_elasticity_param))
         all_curves_data = {
@@ -628,11 +1081,13 @@ def fetch_curves_batch(conn: duckdb.DuckDBPyConnection, curve_ids: List[str], fi
                 "curves_elasticity_param": curves_elasticity_param
             }
         if curves_cp:
-            domain_cp = compute_domain(conn, curves_cp, "curves_temp_cp")
+            with time_stage("domain"):
+                domain_cp = compute_domain(curves_cp, "zi", "fi")
             graph_force_indentation = {"curves": all_curves_data, "domain": domain_cp}
         
         if curves_el:
-            domain_el = compute_domain(conn, curves_el, "curves_temp_el")
+            with time_stage("domain"):
+                domain_el = compute_domain(curves_el, "ze", "ee")
             # For elspectra, keep curves as a flat array for frontend compatibility
             # but include elasticity parameters separately if they exist
             graph_elspectra = {"curves": curves_el, "domain": domain_el}
@@ -665,110 +1120,172 @@ def _select_curve_ids(conn, filters: Dict, num_curves: Optional[int] = None) ->
     return [f"curve{row[0]}" if isinstance(row[0], int) else str(row[0]) for row in result]
 
 
+def _elasticity_selection(
+    conn,
+    filters: Dict,
+    num_curves: Optional[int],
+    elasticity_params: Optional[Dict],
+    elastic_model_params: Optional[Dict],
+) -> Tuple[List[str], Optional[str], Optional[Dict], Optional[str]]:
+    """
+    (curve_ids, dataset_fp, metadata, stage_hash) of a batched elasticity run, on a
+    worker thread like the batches themselves. The rest is None when no curves match.
+    """
+    cursor = conn.cursor()
+    try:
+        curve_ids = _select_curve_ids(cursor, filters, num_curves)
+        if not curve_ids:
+            return curve_ids, None, None, None
+        dataset_fp = get_dataset_fingerprint(cursor)
+        # One metadata for the whole selection, used for computing and for the stage hash alike
+        metadata = get_metadata_for_curves(cursor, curve_ids)
+        stage_hash = emodel_stage_hash(filters, metadata, elasticity_params, elastic_model_params)
+        return curve_ids, dataset_fp, metadata, stage_hash
+    finally:
+        cursor.close()
+
+
+def _elasticity_params_for_batch(
+    conn,
+    batch_ids: List[str],
+    positions: Dict[int, int],
+    dataset_fp: str,
+    filters: Dict,
+    metadata: Dict,
+    stage_hash: str,
+    elasticity_params: Optional[Dict],
+    elastic_model_params: Optional[Dict],
+) -> List[Dict]:
+    """
+    Elasticity-param rows for one batch, run on a worker thread.
+    Uses its own cursor so batches don't share a connection; UDFs registered
+    on the parent connection are visible to its cursors.
+    """
+    cursor = conn.cursor()
+    try:
+        # Serve previously fitted curves from the results store
+        cached, missing_ids = split_cached_curves(cursor, batch_ids, dataset_fp, stage_hash)
+        rows = [make_elasticity_entry(cid, params, positions[cid]) for cid, params in cached.items()]
+
+        # Compute elasticity params for the remaining curves using existing pipeline
+        g_el = None
+        if missing_ids:
+            g_fvz, g_fi, g_el = fetch_curves_batch(
+                cursor,
+                missing_ids,
+                filters,
+                single=True,
+                metadata=metadata,
+                compute_elspectra=True,
+                elasticity_params=elasticity_params,
+                elastic_model_params=elastic_model_params
+            )
+
+        # Extract elasticity params from result, with curve_index relative to the whole selection
+        if g_el and isinstance(g_el, dict):
+            for param_dict in g_el.get("curves_elasticity_param", []):
+                cid = result_curve_id(param_dict)
+                if cid not in positions:
+                    # Not one of the selected curves; it has no place in the selection
+                    continue
+                elasticity_param = param_dict.get("elasticity_param", [])
+                rows.append(make_elasticity_entry(cid, elasticity_param, positions[cid]))
+        return rows
+    finally:
+        cursor.close()
+
+
 async def compute_elasticity_params_batched(
     conn, 
     filters: Dict, 
     num_curves: Optional[int] = None, 
     batch_size: int = 50,
     elasticity_params: Optional[Dict] = None,
-    elastic_model_params: Optional[Dict] = None
+    elastic_model_params: Optional[Dict] = None,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
 ) -> AsyncGenerator[Tuple[int, int, int, int, List[Dict]], None]:
     """
     Async generator yielding batches of elasticity parameters with progress.
+
+    The curve selection and every batch run on a thread pool without blocking
+    the event loop. At most max_in_flight batches (default 2 * max_workers) are
+    queued or running; new ones are only submitted as the consumer pulls
+    results, so a slow consumer throttles computation instead of buffering rows.
+    Batches are yielded in completion order. When the consumer stops early
+    (aclose), queued batches are dropped and running ones are waited for, so
+    nothing is left writing through conn once the generator has closed.
     
-    Yields: (batch_idx, total_batches, done_so_far, total_curves, rows_for_this_batch)
+    Yields: (batches_completed, total_batches, done_so_far, total_curves, rows_for_this_batch)
     
     Each row is a dict with:
-        - curve_index: int
+        - curve_id: str ("curve<N>")
+        - curve_index: int (position within the whole selection)
         - elasticity_param: List[float] (parameter values)
     """
-    # Select curve IDs
-    curve_ids = _select_curve_ids(conn, filters, num_curves)
-    total = len(curve_ids)
-    
-    if total == 0:
-        # Yield empty batch to let stream finish gracefully
-        yield (0, 0, 0, 0, [])
-        return
-    
-    total_batches = math.ceil(total / batch_size)
-    done = 0
-    metadata_cache = {}  # Cache metadata per curve
-    
-    for i in range(total_batches):
-        batch_ids = curve_ids[i * batch_size:(i + 1) * batch_size]
-        
-        # Get metadata for this batch
-        metadata = get_metadata_for_curves(conn, batch_ids)
-        
-        # Compute elasticity params for this batch using existing pipeline
-        g_fvz, g_fi, g_el = fetch_curves_batch(
-            conn,
-            batch_ids,
-            filters,
-            single=True,
-            metadata=metadata,
-            compute_elspectra=True,
-            elasticity_params=elasticity_params,
-            elastic_model_params=elastic_model_params
+    max_workers = max_workers or min(8, os.cpu_count() or 2)
+    max_in_flight = max(1, max_in_flight or 2 * max_workers)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    try:
+        # Select curve IDs
+        curve_ids, dataset_fp, metadata, stage_hash = await loop.run_in_executor(
+            executor, _elasticity_selection, conn, filters, num_curves, elasticity_params, elastic_model_params
         )
-        
-        # Extract elasticity params from result
-        rows = []
-        if g_el and isinstance(g_el, dict):
-            elasticity_params_list = g_el.get("curves_elasticity_param", [])
-            for param_dict in elasticity_params_list:
-                # Convert to expected format
-                curve_idx = param_dict.get("curve_index", 0)
-                elasticity_param = param_dict.get("elasticity_param", [])
-                rows.append({
-                    "curve_index": curve_idx,
-                    "elasticity_param": elasticity_param
-                })
-        
-        done += len(batch_ids)
-        # Yield progress + rows
-        yield (i + 1, total_batches, done, total, rows)
-        # Let the event loop breathe so SSE flushes
-        await asyncio.sleep(0)
-               
-def compute_domain(conn: duckdb.DuckDBPyConnection, curves: List[Dict], table_name: str) -> Dict:
+        total = len(curve_ids)
+
+        if total == 0:
+            # Yield empty batch to let stream finish gracefully
+            yield (0, 0, 0, 0, [])
+            return
+
+        total_batches = math.ceil(total / batch_size)
+        positions = {int(cid): idx for idx, cid in enumerate(_numeric_curve_ids(curve_ids))}
+        batches = [curve_ids[i * batch_size:(i + 1) * batch_size] for i in range(total_batches)]
+        next_batch = 0
+        completed = 0
+        done = 0
+        while next_batch < total_batches or pending:
+            # Refill the in-flight window
+            while next_batch < total_batches and len(pending) < max_in_flight:
+                batch_ids = batches[next_batch]
+                future = loop.run_in_executor(
+                    executor, _elasticity_params_for_batch, conn, batch_ids, positions,
+                    dataset_fp, filters, metadata, stage_hash, elasticity_params, elastic_model_params
+                )
+                pending[future] = len(batch_ids)
+                next_batch += 1
+
+            finished, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+            for future in finished:
+                done += pending.pop(future)
+                completed += 1
+                # Suspends here until the consumer asks for more (backpressure)
+                yield (completed, total_batches, done, total, future.result())
+    finally:
+        # Drop batches that haven't started, then wait for the running ones
+        executor.shutdown(wait=False, cancel_futures=True)
+        if pending:
+            await asyncio.wait(pending.keys())
+            for future in pending:
+                if not future.cancelled() and future.exception() is not None:
+                    logger.warning(f"Elasticity batch failed after the stream stopped: {future.exception()}")
+
+
+def compute_domain(curves: List[Dict], x_channel: str = "z", y_channel: str = "force") -> Dict:
     """
     Compute domain ranges (min/max) for x and y values in a list of curves.
     
     Args:
-        conn: DuckDB connection object
         curves: List of dictionaries containing 'x' and 'y' values
-        table_name: Temporary table name for registration
+        x_channel, y_channel: CurveBatch channels the x and y values are packed into
     
     Returns:
         Dictionary with xMin, xMax, yMin, yMax values
     """
-    if not curves:
-        return {"xMin": None, "xMax": None, "yMin": None, "yMax": None}
-    
-    curves_df = pd.DataFrame(curves)
-    conn.register(table_name, curves_df)
-    
-    domain_query = f"""
-        WITH unnested AS (
-            SELECT 
-                unnest(x) AS x_value,
-                unnest(y) AS y_value
-            FROM {table_name}
-        )
-        SELECT 
-            APPROX_QUANTILE(x_value, 0) AS xMin,
-            APPROX_QUANTILE(x_value, 1) AS xMax,
-            APPROX_QUANTILE(y_value, 0) AS yMin,
-            APPROX_QUANTILE(y_value, 1) AS yMax
-        FROM unnested
-    """
-    domain_result = conn.execute(domain_query).fetchone()
-    
-    return {
-        "xMin": float(domain_result[0]) if domain_result[0] is not None else None,
-        "xMax": float(domain_result[1]) if domain_result[1] is not None else None,
-        "yMin": float(domain_result[2]) if domain_result[2] is not None else None,
-        "yMax": float(domain_result[3]) if domain_result[3] is not None else None,
-    }
\ No newline at end of file
+    batch = CurveBatch.from_arrays(
+        [curve["curve_id"] for curve in curves],
+        **{x_channel: [curve["x"] for curve in curves], y_channel: [curve["y"] for curve in curves]},
+    )
+    return batch.domain(x_channel, y_channel)
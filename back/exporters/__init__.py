@@ -3,6 +3,8 @@ from .hdf5_exporter import HDF5Exporter
 from .json_exporter import JSONExporter
 from .csv_exporter import CSVExporter  # New
 from .txt_exporter import TXTExporter  # New
+from .parquet_exporter import ParquetExporter
+from .arrow_exporter import ArrowExporter
 
 def get_exporter(file_type: str) -> Exporter:
     if file_type == "json":
@@ -13,5 +15,9 @@ def get_exporter(file_type: str) -> Exporter:
         return CSVExporter()
     elif file_type == "txt":
         return TXTExporter()
+    elif file_type == "parquet":
+        return ParquetExporter()
+    elif file_type == "arrow":
+        return ArrowExporter()
     else:
         raise ValueError(f"Unsupported export type: {file_type}")
\ No newline at end of file
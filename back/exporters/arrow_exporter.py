@@ -0,0 +1,24 @@
+from typing import Dict, Any, List, Optional
+import logging
+from file_types.parquet import export_from_duckdb_to_arrow, EXPORT_CONTENTS
+from .base import Exporter
+
+logger = logging.getLogger(__name__)
+
+class ArrowExporter(Exporter):
+    def validate_params(self, data: Dict[str, Any]) -> None:
+        if "export_path" not in data or not isinstance(data["export_path"], str) or not data["export_path"].strip():
+            raise ValueError("export_path must be a non-empty string")
+        if data.get("content", "curves") not in EXPORT_CONTENTS:
+            raise ValueError(f"content must be one of: {', '.join(EXPORT_CONTENTS)}")
+        if not isinstance(data.get("metadata", {}), dict):
+            raise ValueError("metadata must be provided as a dictionary")
+
+    def export(self, db_path: str, output_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> int:
+        return export_from_duckdb_to_arrow(
+            db_path=db_path,
+            output_path=output_path,
+            curve_ids=curve_ids,
+            content=kwargs.get("content") or "curves",
+            metadata=kwargs.get("metadata") or {}
+        )
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
 class Exporter(ABC):
     @abstractmethod
@@ -13,3 +13,10 @@ class Exporter(ABC):
         """Export curves from DuckDB to the specified format."""
         pass
 
+    def iter_chunks(self, db_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> Iterator[str]:
+        """
+        Yield the export's content as text chunks for a streamed response, without
+        writing a file. Raises ValueError (before the first chunk) when nothing
+        can be exported; formats that cannot be produced incrementally don't override this.
+        """
+        raise ValueError(f"{type(self).__name__} does not support streamed exports")
@@ -1,16 +1,42 @@
 # Coordinates CSV export responsibilities across raw dumps, averaged curves, and scatter datasets for SoftMech-compatible tooling.
 import csv
-from typing import Dict, Any, List, Optional, Tuple
+import io
+import time
+from itertools import chain
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import duckdb
 import numpy as np
 from scipy.interpolate import interp1d
 from scipy.signal import savgol_filter
 from .base import Exporter
+from models.curve_batch import CurveBatch
+from file_types.export_stream import iter_curve_rows, write_chunks
 from filters.calculate_elasticity import calc_elspectra
 
 logger = logging.getLogger(__name__)
 
+# Curves fetched and interpolated at a time by the average export
+AVERAGE_BATCH_CURVES = 512
+
+# Curves per batch, and batches run concurrently, when scatter parameters must be computed
+SCATTER_BATCH_CURVES = 100
+SCATTER_MAX_WORKERS = 4
+
+# Metadata preview: at most this many curves without stored results are computed, in
+# batches of PREVIEW_SAMPLE_BATCH, and no new batch starts after the time budget
+PREVIEW_MAX_SAMPLE = 64
+PREVIEW_SAMPLE_BATCH = 8
+PREVIEW_TIME_BUDGET_S = 1.5
+
+def _drain(buffer: io.StringIO) -> str:
+    """Text written to buffer since the last drain."""
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
+
 class CSVExporter(Exporter):
     def validate_params(self, data: Dict[str, Any]) -> None:
         # Enhanced CSV-specific validations for SoftMech-style export
@@ -48,66 +74,7 @@ class CSVExporter(Exporter):
         # Prevent exporter crash if underlying DuckDB access or file IO fails during raw dump.
         # Prevent exporter crash if curve aggregation or downstream file handling encounters invalid data.
         try:
-            with duckdb.connect(db_path) as conn:
-                query = """
-                    SELECT curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-                           tip_geometry, tip_radius, segment_type, force_values AS deflection,
-                           z_values AS z_sensor, sampling_rate, velocity, no_points
-                    FROM force_vs_z
-                """
-                params = None
-                if curve_ids:
-                    query += " WHERE curve_id IN ({})".format(",".join("?" for _ in curve_ids))
-                    params = curve_ids
-                
-                results = conn.execute(query, params or []).fetchall()
-                if not results:
-                    logger.error("No curves found in database")
-                    raise ValueError("No curves found in database")
-
-            with open(output_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                
-                # Represents request-level metadata combining legacy `metadata` and new `softmech_metadata`.
-                metadata_payload = kwargs.get("metadata") or kwargs.get("softmech_metadata") or {}
-                for key, value in metadata_payload.items():
-                    writer.writerow([key, value])
-                
-                num_exported = 0
-                for row in results:
-                    (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-                     tip_geometry, tip_radius, segment_type, deflection, z_sensor,
-                     sampling_rate, velocity, no_points) = row
-                    
-                    # Row-specific metadata
-                    writer.writerow(["curve_id", curve_id])
-                    writer.writerow(["file_id", file_id])
-                    writer.writerow(["date", date])
-                    writer.writerow(["instrument", instrument])
-                    writer.writerow(["sample", sample])
-                    writer.writerow(["spring_constant", spring_constant])
-                    writer.writerow(["inv_ols", inv_ols])
-                    writer.writerow(["tip_geometry", tip_geometry])
-                    writer.writerow(["tip_radius", tip_radius])
-                    writer.writerow(["segment_type", segment_type])
-                    writer.writerow(["sampling_rate", sampling_rate])
-                    writer.writerow(["velocity", velocity])
-                    writer.writerow(["no_points", no_points])
-                    
-                    # Headers
-                    writer.writerow(["index", "Z (m)", "Force (N)"])
-                    
-                    # Data
-                    deflection_arr = np.asarray(deflection) if deflection is not None else np.empty(0)
-                    z_sensor_arr = np.asarray(z_sensor) if z_sensor is not None else np.empty(0)
-                    min_length = min(len(deflection_arr), len(z_sensor_arr))
-                    if min_length:
-                        idx = np.arange(min_length)[:, None]
-                        block = np.concatenate([idx, z_sensor_arr[:min_length, None], deflection_arr[:min_length, None]], axis=1)
-                        # write in one go
-                        np.savetxt(f, block, delimiter=",", fmt="%.17g")
-                    num_exported += 1
-
+            num_exported = write_chunks(output_path, self._iter_raw_chunks(db_path, curve_ids, **kwargs), newline="")
             logger.info(f"Exported {num_exported} raw curves to CSV file at {output_path}")
             return num_exported
 
@@ -115,6 +82,61 @@ class CSVExporter(Exporter):
             logger.error(f"Failed to export raw data to CSV file {output_path}: {str(e)}")
             raise
 
+    def _iter_raw_chunks(self, db_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> Iterator[str]:
+        """Raw export as text chunks: request metadata first, then one chunk per curve. Returns the curve count."""
+        rows = iter_curve_rows(db_path, curve_ids)
+        first_row = next(rows)  # Raises before any output when there is nothing to export
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        # Represents request-level metadata combining legacy `metadata` and new `softmech_metadata`.
+        metadata_payload = kwargs.get("metadata") or kwargs.get("softmech_metadata") or {}
+        for key, value in metadata_payload.items():
+            writer.writerow([key, value])
+        yield _drain(out)
+
+        num_exported = 0
+        for row in chain([first_row], rows):
+            (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
+             tip_geometry, tip_radius, segment_type, deflection, z_sensor,
+             sampling_rate, velocity, no_points) = row
+            
+            # Row-specific metadata
+            writer.writerow(["curve_id", curve_id])
+            writer.writerow(["file_id", file_id])
+            writer.writerow(["date", date])
+            writer.writerow(["instrument", instrument])
+            writer.writerow(["sample", sample])
+            writer.writerow(["spring_constant", spring_constant])
+            writer.writerow(["inv_ols", inv_ols])
+            writer.writerow(["tip_geometry", tip_geometry])
+            writer.writerow(["tip_radius", tip_radius])
+            writer.writerow(["segment_type", segment_type])
+            writer.writerow(["sampling_rate", sampling_rate])
+            writer.writerow(["velocity", velocity])
+            writer.writerow(["no_points", no_points])
+            
+            # Headers
+            writer.writerow(["index", "Z (m)", "Force (N)"])
+            
+            # Data
+            deflection_arr = np.asarray(deflection) if deflection is not None else np.empty(0)
+            z_sensor_arr = np.asarray(z_sensor) if z_sensor is not None else np.empty(0)
+            min_length = min(len(deflection_arr), len(z_sensor_arr))
+            if min_length:
+                idx = np.arange(min_length)[:, None]
+                block = np.concatenate([idx, z_sensor_arr[:min_length, None], deflection_arr[:min_length, None]], axis=1)
+                # write in one go
+                np.savetxt(out, block, delimiter=",", fmt="%.17g")
+            num_exported += 1
+            yield _drain(out)
+        return num_exported
+
+    def iter_chunks(self, db_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> Iterator[str]:
+        if kwargs.get("export_type", "raw") != "raw":
+            raise ValueError("Only raw CSV exports can be streamed")
+        return self._iter_raw_chunks(db_path, curve_ids, **kwargs)
+
     # ---------- AVERAGE ----------
 
     def _export_average_curves(self, db_path: str, output_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> int:
@@ -142,6 +164,8 @@ class CSVExporter(Exporter):
             else:
                 # Prevent accidental full-table scans; remove if you want "all curves"
                 raise ValueError("No curve_ids provided for average export to avoid full-table processing.")
+            if dataset_type not in ("Force", "Elasticity", "El from F"):
+                raise ValueError(f"Unsupported dataset_type: {dataset_type}")
 
             filters_config = {
                 "regular": regular_filters,
@@ -156,10 +180,57 @@ class CSVExporter(Exporter):
                 from filters.register_all import register_filters
                 register_filters(conn)
 
-                from db import fetch_curves_batch
-                graph_force_vs_z, graph_force_indentation, graph_elspectra = fetch_curves_batch(
-                    conn, curve_id_strings, filters_config, single=True
-                )
+                from db import ensure_cache_tables, fetch_curves_batch, get_metadata_for_curves, load_elspectra_extents, load_indentation_extents
+                ensure_cache_tables(conn)
+                # One metadata for every batch, so stored fit results carry one stage hash
+                metadata = get_metadata_for_curves(conn, curve_id_strings)
+                # Elasticity averages the spectra; Force and "El from F" average F-d curves
+                elasticity = dataset_type == "Elasticity"
+                x_channel, y_channel = ("ze", "ee") if elasticity else ("zi", "fi")
+                load_extents = load_elspectra_extents if elasticity else load_indentation_extents
+                # First Hertz parameter of every fitted curve, for the header
+                hertz_E: Dict[str, float] = {}
+
+                def curve_extents(batch_ids: List[str], channel: str) -> Iterable[Tuple[float, float, int]]:
+                    if not cp_filters:
+                        return []
+                    extents = load_extents(conn, batch_ids, cp_filters, metadata, channel)
+                    missing = [cid for cid in batch_ids if int(cid[5:]) not in extents]
+                    if missing:
+                        # Only the stages the extents come from (no fits); fetch_curves_batch caches them
+                        fetch_curves_batch(
+                            conn, missing, {**filters_config, "f_models": {}, "e_models": {}},
+                            metadata=metadata, compute_elspectra=elasticity
+                        )
+                        extents.update(load_extents(conn, missing, cp_filters, metadata, channel))
+                    return extents.values()
+
+                def fetch_batch(batch_ids: List[str]) -> CurveBatch:
+                    _, graph_force_indentation, graph_elspectra = fetch_curves_batch(
+                        conn, batch_ids, filters_config, single=True, metadata=metadata,
+                        compute_elspectra=elasticity
+                    )
+                    if elasticity:
+                        curves = (graph_elspectra or {}).get("curves") or []
+                    else:
+                        curves_data = (graph_force_indentation or {}).get("curves") or {}
+                        for fp in curves_data.get("curves_fparam") or []:
+                            if fp.get("params"):
+                                hertz_E[fp["curve_id"]] = fp["params"][0]
+                        curves = curves_data.get("curves_cp", [])
+                    # Measured curves only, as curve_extents saw them; not the fitted "5_hertz" / "5_elastic" overlays
+                    return self._collect_xy([c for c in curves if str(c.get("curve_id")).startswith("curve")], x_channel, y_channel)
+
+                id_batches = [
+                    curve_id_strings[i:i + AVERAGE_BATCH_CURVES]
+                    for i in range(0, len(curve_id_strings), AVERAGE_BATCH_CURVES)
+                ]
+                averaged = self._average_batches(fetch_batch, curve_extents, id_batches, x_channel, y_channel, direction, loose, grid_points)
+                if averaged is None:
+                    raise ValueError({
+                        "Force": "No valid Force data found",
+                        "Elasticity": "No valid Elasticity data found",
+                    }.get(dataset_type, "No force data available for elasticity calculation"))
 
                 # Cache schema once
                 cols = [c[0] for c in conn.execute("DESCRIBE force_vs_z").fetchall()]
@@ -223,57 +294,17 @@ class CSVExporter(Exporter):
                     tip_geometry = 'sphere'
 
             # ---- Extract per dataset type ----
-            xall, yall = [], []
-            if dataset_type == "Force":
-                curves_data = (graph_force_indentation or {}).get("curves", {})
-                for curve in curves_data.get("curves_cp", []):
-                    if "x" in curve and "y" in curve:
-                        pair = self._sanitize_xy_pair(curve["x"], curve["y"])
-                        if pair is not None:
-                            x_data, y_data = pair
-                            xall.append(x_data)
-                            yall.append(y_data)
-
-                if not xall:
-                    raise ValueError("No valid Force data found")
-                x, y, std = self._average_all(xall, yall, direction, loose, grid_points)
-
-            elif dataset_type == "Elasticity":
-                curves = (graph_elspectra or {}).get("curves", [])
-                for curve in curves:
-                    if "x" in curve and "y" in curve:
-                        pair = self._sanitize_xy_pair(curve["x"], curve["y"])
-                        if pair is not None:
-                            x_data, y_data = pair
-                            xall.append(x_data)
-                            yall.append(y_data)
-
-                if not xall:
-                    raise ValueError("No valid Elasticity data found")
-                x, y, std = self._average_all(xall, yall, direction, loose, grid_points)
-
-            elif dataset_type == "El from F":
+            if dataset_type in ("Force", "Elasticity"):
+                x, y, std = averaged
+
+            else:
                 # average Force first
-                curves_data = (graph_force_indentation or {}).get("curves", {})
-                for curve in curves_data.get("curves_cp", []):
-                    if "x" in curve and "y" in curve:
-                        pair = self._sanitize_xy_pair(curve["x"], curve["y"])
-                        if pair is not None:
-                            x_data, y_data = pair
-                            xall.append(x_data)
-                            yall.append(y_data)
-
-                if not xall:
-                    raise ValueError("No force data available for elasticity calculation")
-
-                x2, y2, std = self._average_all(xall, yall, direction, loose, grid_points)
+                x2, y2, std = averaged
                 # then compute E from averaged F–d
                 x, y = self._calc_elspectra(x2, y2, tip_geometry, tip_radius, tip_angle, **kwargs)
                 if x is None or y is None:
                     # fallback to force if elasticity fails
                     x, y = x2, y2
-            else:
-                raise ValueError(f"Unsupported dataset_type: {dataset_type}")
 
             # ---- SoftMech-style metadata (REQUEST-ONLY, no DB) ----
 
@@ -369,18 +400,9 @@ class CSVExporter(Exporter):
                 # --- Hertz metadata (unchanged, still computed from curves & force_model_params) ---
                 if dataset_type == "Force":
                     try:
-                        curves_dict = (graph_force_indentation or {}).get("curves") or {}
-                        if "curves_fparam" in curves_dict:
-                            fparams = curves_dict["curves_fparam"]
-                            if fparams:
-                                E_values = [
-                                    fp["params"][0]
-                                    for fp in fparams
-                                    if fp.get("params")
-                                ]
-                                if E_values:
-                                    avg_E = float(np.average(E_values))
-                                    header += f"#Average Hertz modulus [Pa]: {avg_E}\n"
+                        if hertz_E:
+                            avg_E = float(np.average(list(hertz_E.values())))
+                            header += f"#Average Hertz modulus [Pa]: {avg_E}\n"
 
                         force_model_params = kwargs.get("force_model_params") or {}
                         max_ind_param = force_model_params.get("maxInd")
@@ -446,30 +468,43 @@ class CSVExporter(Exporter):
                 "e_models": e_models
             }
 
+            force_model = dataset_type == "Force Model"
+
             with duckdb.connect(db_path) as conn:
                 conn.execute("PRAGMA threads=4")
-                from filters.register_all import register_filters
-                register_filters(conn)
-
-                from db import fetch_curves_batch
-                graph_force_vs_z, graph_force_indentation, graph_elspectra = fetch_curves_batch(
-                    conn, curve_id_strings, filters_config, single=True
+                from db import (
+                    ensure_cache_tables, get_dataset_fingerprint, get_metadata_for_curves,
+                    fmodel_stage_hash, emodel_stage_hash, split_cached_curves,
                 )
-
-            # Extract model parameters
-            param_data = []
+                ensure_cache_tables(conn)
+
+                # Results of the same pipeline (default model settings) are reused; missing curves are
+                # computed with the metadata the stage hash was derived from
+                metadata = get_metadata_for_curves(conn, curve_id_strings)
+                stage_hash = fmodel_stage_hash(filters_config, metadata) if force_model else emodel_stage_hash(filters_config, metadata)
+                params_by_curve, missing_ids = split_cached_curves(conn, curve_id_strings, get_dataset_fingerprint(conn), stage_hash)
+                logger.info(f"Scatter export: {len(params_by_curve)} curves from stored results, {len(missing_ids)} to compute")
+
+                if missing_ids:
+                    from filters.register_all import register_filters
+                    register_filters(conn)
+                    batches = [
+                        missing_ids[i:i + SCATTER_BATCH_CURVES]
+                        for i in range(0, len(missing_ids), SCATTER_BATCH_CURVES)
+                    ]
+                    with ThreadPoolExecutor(max_workers=min(SCATTER_MAX_WORKERS, len(batches))) as executor:
+                        futures = [
+                            executor.submit(self._scatter_params_for_batch, conn, batch_ids, filters_config, metadata, force_model)
+                            for batch_ids in batches
+                        ]
+                        for future in futures:
+                            params_by_curve.update(future.result())
+
+            # Model parameters in selection order
+            selection = [int(cid[5:]) for cid in curve_id_strings]
+            param_data = [params_by_curve[cid] for cid in selection if cid in params_by_curve]
             model_name = dataset_type
 
-            if dataset_type == "Force Model":
-                curves_data = (graph_force_indentation or {}).get("curves", {})
-                for param_info in curves_data.get("curves_fparam", []):
-                    if "fparam" in param_info:
-                        param_data.append(param_info["fparam"])
-            else:
-                for param_info in (graph_elspectra or {}).get("curves_elasticity_param", []):
-                    if "elasticity_param" in param_info:
-                        param_data.append(param_info["elasticity_param"])
-
             if len(param_data) == 0:
                 raise ValueError(f"No valid {dataset_type} parameters found")
 
@@ -511,6 +546,38 @@ class CSVExporter(Exporter):
 
     # ---------- HELPERS ----------
 
+    def _scatter_params_for_batch(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        batch_ids: List[str],
+        filters: Dict[str, Any],
+        metadata: Dict[str, Any],
+        force_model: bool
+    ) -> Dict[int, List[float]]:
+        """
+        Fit parameters of one batch of curves missing from the results store, run on a
+        worker thread with its own cursor. fetch_curves_batch stores them for next time.
+        """
+        from db import fetch_curves_batch, result_curve_id
+        cursor = conn.cursor()
+        try:
+            _, graph_force_indentation, graph_elspectra = fetch_curves_batch(
+                cursor, batch_ids, filters, single=True, metadata=metadata, compute_elspectra=not force_model
+            )
+        finally:
+            cursor.close()
+        if force_model:
+            entries = ((graph_force_indentation or {}).get("curves") or {}).get("curves_fparam", [])
+            key = "fparam"
+        else:
+            entries = (graph_elspectra or {}).get("curves_elasticity_param", [])
+            key = "elasticity_param"
+        return {
+            result_curve_id(entry): entry[key]
+            for entry in entries
+            if key in entry and result_curve_id(entry) is not None
+        }
+
     def _sanitize_xy_pair(self, x_raw, y_raw):
         """
         Convert x/y to float64 arrays while keeping them aligned.
@@ -560,36 +627,62 @@ class CSVExporter(Exporter):
 
         return x_arr, y_arr
 
-    def _average_all(
+    def _collect_xy(self, curves: List[Dict[str, Any]], x_channel: str, y_channel: str) -> CurveBatch:
+        """Sanitized x/y of every usable curve, packed into one CurveBatch"""
+        curve_ids, xs, ys = [], [], []
+        for curve in curves:
+            if "x" in curve and "y" in curve:
+                pair = self._sanitize_xy_pair(curve["x"], curve["y"])
+                if pair is not None:
+                    curve_ids.append(curve.get("curve_id"))
+                    xs.append(pair[0])
+                    ys.append(pair[1])
+        return CurveBatch.from_arrays(curve_ids, **{x_channel: xs, y_channel: ys})
+
+    def _average_batches(
         self,
-        xall: List[np.ndarray],
-        yall: List[np.ndarray],
+        fetch_batch: Callable[[List[str]], CurveBatch],
+        curve_extents: Callable[[List[str], str], Iterable[Tuple[float, float, int]]],
+        id_batches: List[List[str]],
+        x_channel: str,
+        y_channel: str,
         direction: str,
         loose: int = 100,
         grid_points: Optional[int] = None
-    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Calculate average curves with interpolation (SoftMech-like, but bounded grid)"""
-        if not xall:
-            raise ValueError("Empty input to _average_all")
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Calculate average curves with interpolation (SoftMech-like, but bounded grid)
+        in two passes over id_batches. The first finds the common range from
+        curve_extents(batch_ids, channel), the (min, max, distinct x count) of every
+        curve of the batch over the pairs _collect_xy keeps, without fetching curves.
+        The second interpolates each batch fetch_batch returns onto the grid and folds
+        it into a running (Welford) mean and variance, so memory is one batch plus the
+        grid however many curves are averaged. Returns None when no curve is usable.
+        """
+        if direction == 'H':
+            dset = y_channel
+            ddep = x_channel
+        else:
+            dset = x_channel
+            ddep = y_channel
+
+        # ---- pass 1: bounds ----
+        N_raw = 0
+        mins, maxs = [], []
+        for batch_ids in id_batches:
+            for lo, hi, n in curve_extents(batch_ids, dset):
+                if n < 2:  # _collect_xy drops curves with fewer points
+                    continue
+                N_raw = max(N_raw, n)
+                mins.append(lo)
+                maxs.append(hi)
+        if not N_raw:
+            return None
 
-        N_raw = int(np.max([len(x) for x in xall]))
         if grid_points is None:
             grid_points = 4096
         N = max(2, min(N_raw, int(grid_points)))
 
-        if direction == 'H':
-            dset = yall
-            ddep = xall
-        else:
-            dset = xall
-            ddep = yall
-
-        # overlap
-        mins = [np.min(d) for d in dset if d is not None and len(d)]
-        maxs = [np.max(d) for d in dset if d is not None and len(d)]
-        if not mins or not maxs:
-            raise ValueError("Invalid data ranges for averaging")
-
         inf = np.max(mins)
         if loose >= 100:
             sup = np.min(maxs)
@@ -600,20 +693,28 @@ class CSVExporter(Exporter):
             raise ValueError("Non-overlapping ranges for averaging")
 
         newax = np.linspace(inf, sup, N)
-        neway = []
-        for x, y in zip(dset, ddep):
-            if len(x) < 2 or len(y) < 2 or len(x) != len(y):
-                continue  # skip malformed series
-            # only curves spanning the upper bound contribute (like SoftMech guard)
-            if np.max(x) >= sup:
-                neway.append(np.interp(newax, x, y))
-
-        if not neway:
-            raise ValueError("No curves contribute to averaged range")
 
-        neway = np.asarray(neway)
-        newyavg = np.mean(neway, axis=0)
-        newstd = np.std(neway, axis=0)
+        # ---- pass 2: interpolate and accumulate ----
+        count = 0
+        newyavg = np.zeros(N)
+        m2 = np.zeros(N)
+        for batch_ids in id_batches:
+            batch = fetch_batch(batch_ids)
+            if not len(batch):
+                continue
+            # skip malformed series; only curves spanning the upper bound contribute (like SoftMech guard)
+            lengths = batch.lengths(dset)
+            contributing = (lengths >= 2) & (lengths == batch.lengths(ddep)) & (batch.curve_max(dset) >= sup)
+            for i in np.flatnonzero(contributing):
+                neway = np.interp(newax, batch.curve(dset, i), batch.curve(ddep, i))
+                count += 1
+                delta = neway - newyavg
+                newyavg += delta / count
+                m2 += delta * (neway - newyavg)
+
+        if not count:
+            raise ValueError("No curves contribute to averaged range")
+        newstd = np.sqrt(m2 / count)
 
         if direction == 'H':
             return newyavg, newax, newstd
@@ -731,4 +832,88 @@ class CSVExporter(Exporter):
             
         except (ValueError, TypeError, OverflowError) as e:
             logger.warning(f"Failed to convert data to float array: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+def preview_hertz_metadata(
+    conn: duckdb.DuckDBPyConnection,
+    curve_ids: List[int],
+    filters: Dict[str, Any],
+    direction: str,
+    loose: int,
+    force_model_params: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Average Hertz modulus and Hertz max indentation as the average export writes
+    them (for the SoftMech metadata preview), from stored fit results and cached indentation curves. Curves found in
+    neither are computed for an evenly spread sample within the preview budget;
+    "exact" is False whenever the figures rest on a sample or an approximation.
+    """
+    from db import (
+        ensure_cache_tables, get_dataset_fingerprint, get_metadata_for_curves, fmodel_stage_hash,
+        split_cached_curves, load_indentation_extents, fetch_curves_batch, result_curve_id,
+    )
+    ensure_cache_tables(conn)
+    filters_config = {key: filters.get(key) or {} for key in ("regular", "cp_filters", "f_models", "e_models")}
+    curve_id_strings = [f"curve{cid}" for cid in curve_ids]
+    fitted = bool(filters_config["f_models"])
+    max_ind = (force_model_params or {}).get("maxInd")
+    # The same metadata the average export computes with
+    metadata = get_metadata_for_curves(conn, curve_id_strings)
+
+    # What the pipeline already produced for these settings (same inputs as the average export)
+    moduli: Dict[int, float] = {}
+    missing = set()
+    if fitted:
+        stored, missing_fit = split_cached_curves(
+            conn, curve_id_strings, get_dataset_fingerprint(conn), fmodel_stage_hash(filters_config, metadata)
+        )
+        moduli = {cid: params[0] for cid, params in stored.items() if params}
+        missing.update(missing_fit)
+    extents: Dict[int, Tuple[float, float, int]] = {}
+    if max_ind is None:
+        extents = load_indentation_extents(conn, curve_id_strings, filters_config["cp_filters"], metadata)
+        missing.update(cid for cid in curve_id_strings if int(cid[5:]) not in extents)
+
+    # Compute a bounded sample of the rest; fetch_curves_batch caches what it computes
+    missing_ids = [cid for cid in curve_id_strings if cid in missing]
+    sampled = 0
+    if missing_ids and filters_config["cp_filters"]:
+        sample = missing_ids[::max(1, len(missing_ids) // PREVIEW_MAX_SAMPLE)][:PREVIEW_MAX_SAMPLE]
+        from filters.register_all import register_filters
+        register_filters(conn)
+        deadline = time.monotonic() + PREVIEW_TIME_BUDGET_S
+        while sampled < len(sample) and (not sampled or time.monotonic() < deadline):
+            batch_ids = sample[sampled:sampled + PREVIEW_SAMPLE_BATCH]
+            _, graph_force_indentation, _ = fetch_curves_batch(
+                conn, batch_ids, filters_config, single=True, metadata=metadata, compute_elspectra=False
+            )
+            curves_data = (graph_force_indentation or {}).get("curves") or {}
+            for fp in curves_data.get("curves_fparam", []):
+                if fp.get("params"):
+                    moduli[result_curve_id(fp)] = fp["params"][0]
+            sampled += len(batch_ids)
+        if max_ind is None:
+            extents.update(load_indentation_extents(conn, sample[:sampled], filters_config["cp_filters"], metadata))
+
+    average_hertz_modulus_pa = float(np.average(list(moduli.values()))) if moduli else 0.0
+    if max_ind is not None:
+        hertz_max_indentation_nm = float(max_ind)
+    elif any(n >= 2 for _, _, n in extents.values()):
+        # Upper end of the averaging grid, chosen as in _average_batches
+        maxs = np.array([hi for _, hi, n in extents.values() if n >= 2])
+        sup = np.min(maxs) if loose >= 100 else np.percentile(maxs, 100 - loose)
+        hertz_max_indentation_nm = float(sup) * 1e9
+    else:
+        hertz_max_indentation_nm = 0.0
+
+    # Without maxInd the export takes the averaged curve's end, which horizontal
+    # averaging moves away from the common indentation range
+    exact = sampled == len(missing_ids) and (max_ind is not None or direction == 'V')
+    return {
+        "average_hertz_modulus_pa": average_hertz_modulus_pa,
+        "hertz_max_indentation_nm": hertz_max_indentation_nm,
+        "exact": exact,
+        "sampled_curves": sampled,
+        "unresolved_curves": len(missing_ids) - sampled,
+    }
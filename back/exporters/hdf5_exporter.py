@@ -1,7 +1,7 @@
 import re
 from typing import Dict, Any, List, Optional
 import logging
-from file_types.hdf5 import  export_from_duckdb_to_hdf5
+from file_types.hdf5 import  export_from_duckdb_to_hdf5, HDF5_EXPORT_LAYOUTS, HDF5_EXPORT_COMPRESSIONS
 from .base import Exporter
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,10 @@ class HDF5Exporter(Exporter):
         if not dataset_path:
             raise ValueError("Missing dataset_path for HDF5")
         self.validate_hdf5_path(dataset_path)
+        if data.get("layout", "per_curve") not in HDF5_EXPORT_LAYOUTS:
+            raise ValueError(f"layout must be one of: {', '.join(HDF5_EXPORT_LAYOUTS)}")
+        if data.get("compression", "gzip") not in HDF5_EXPORT_COMPRESSIONS:
+            raise ValueError("compression must be one of: gzip, lzf, or null")
         metadata_path = data.get("metadata_path", "")
         if metadata_path:
             self.validate_hdf5_path(metadata_path)
@@ -41,6 +45,8 @@ class HDF5Exporter(Exporter):
             dataset_path=kwargs.get("dataset_path"),
             level_names=kwargs.get("level_names"),
             metadata_path=kwargs.get("metadata_path"),
-            metadata=kwargs.get("metadata")
+            metadata=kwargs.get("metadata"),
+            layout=kwargs.get("layout") or "per_curve",
+            compression=kwargs.get("hdf5_compression", "gzip")
         )
         return num_exported
\ No newline at end of file
@@ -1,7 +1,7 @@
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 import logging
-from file_types.json import export_from_duckdb_to_json
+from file_types.json import export_from_duckdb_to_json, iter_json_export
 from .base import Exporter
 
 logger = logging.getLogger(__name__)
@@ -31,4 +31,7 @@ class JSONExporter(Exporter):
             curve_ids=curve_ids,
             metadata=kwargs.get("metadata")
         )
-        return num_exported
\ No newline at end of file
+        return num_exported
+
+    def iter_chunks(self, db_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> Iterator[str]:
+        return iter_json_export(db_path, curve_ids, kwargs.get("metadata") or {})
@@ -0,0 +1,27 @@
+from typing import Dict, Any, List, Optional
+import logging
+from file_types.parquet import export_from_duckdb_to_parquet, EXPORT_CONTENTS, PARQUET_COMPRESSIONS
+from .base import Exporter
+
+logger = logging.getLogger(__name__)
+
+class ParquetExporter(Exporter):
+    def validate_params(self, data: Dict[str, Any]) -> None:
+        if "export_path" not in data or not isinstance(data["export_path"], str) or not data["export_path"].strip():
+            raise ValueError("export_path must be a non-empty string")
+        if data.get("content", "curves") not in EXPORT_CONTENTS:
+            raise ValueError(f"content must be one of: {', '.join(EXPORT_CONTENTS)}")
+        if data.get("compression", "zstd") not in PARQUET_COMPRESSIONS:
+            raise ValueError(f"compression must be one of: {', '.join(PARQUET_COMPRESSIONS)}")
+        if not isinstance(data.get("metadata", {}), dict):
+            raise ValueError("metadata must be provided as a dictionary")
+
+    def export(self, db_path: str, output_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> int:
+        return export_from_duckdb_to_parquet(
+            db_path=db_path,
+            output_path=output_path,
+            curve_ids=curve_ids,
+            content=kwargs.get("content") or "curves",
+            compression=kwargs.get("compression") or "zstd",
+            metadata=kwargs.get("metadata") or {}
+        )
@@ -1,6 +1,6 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 import logging
-from file_types.txt import export_from_duckdb_to_txt
+from file_types.txt import export_from_duckdb_to_txt, iter_txt_export
 import duckdb
 import numpy as np
 
@@ -24,4 +24,7 @@ class TXTExporter(Exporter):
             output_path=output_path,
             curve_ids=curve_ids,
             metadata=kwargs.get("metadata", {})
-        )
\ No newline at end of file
+        )
+
+    def iter_chunks(self, db_path: str, curve_ids: Optional[List[int]] = None, **kwargs) -> Iterator[str]:
+        return iter_txt_export(db_path, curve_ids, kwargs.get("metadata") or {})
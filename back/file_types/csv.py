@@ -1,9 +1,10 @@
 import csv
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
 import duckdb
 import numpy as np
 from models.force_curve import ForceCurve, Segment
+from file_types.delimited import DEFAULT_CHUNK_ROWS, iter_delimited_curves
 
 
 logger = logging.getLogger(__name__)
@@ -32,47 +33,17 @@ def get_csv_structure(file_path: str) -> Dict[str, Any]:
                 break
     return structure
 
-def process_csv(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
-    # Parse the CSV: metadata first, then data
-    file_metadata = {}
-    deflection = []
-    z_sensor = []
-    force_col_idx = None
-    z_col_idx = None
-
-    with open(file_path, "r") as f:
-        reader = csv.reader(f)
-        data_started = False
-        for row in reader:
-            if not data_started:
-                if len(row) == 2 and row[0].strip() != "index":
-                    key, value = row[0].strip(), row[1].strip()
-                    file_metadata[key] = value
-                else:
-                    # Headers line
-                    headers = [col.strip() for col in row]
-                    try:
-                        force_col_idx = headers.index(force_path)
-                        z_col_idx = headers.index(z_path)
-                    except ValueError as e:
-                        raise ValueError(f"Column not found: {e}")
-                    data_started = True
-            else:
-                # Data rows
-                if len(row) > max(force_col_idx, z_col_idx):
-                    try:
-                        deflection.append(float(row[force_col_idx]))
-                        z_sensor.append(float(row[z_col_idx]))
-                    except ValueError:
-                        continue  # Skip invalid rows
+def _split_csv_line(text: str) -> List[str]:
+    return [col.strip() for col in next(csv.reader([text]), [])]
 
-    deflection = np.array(deflection)
-    z_sensor = np.array(z_sensor)
-    min_length = min(len(deflection), len(z_sensor))
-
-    if min_length == 0:
-        raise ValueError("No valid data in CSV")
+def _parse_csv_metadata(text: str) -> Optional[Tuple[str, str]]:
+    # key,value lines before the header; the header itself may have two columns
+    row = _split_csv_line(text)
+    if len(row) == 2 and row[0] != "index":
+        return row[0], row[1]
+    return None
 
+def _build_csv_curve(file_metadata: Dict[str, str], metadata: Dict[str, Any], deflection: np.ndarray, z_sensor: np.ndarray) -> ForceCurve:
     # Merge file_metadata with provided metadata (provided overrides file)
     combined_metadata = {**file_metadata, **metadata}
 
@@ -83,16 +54,15 @@ def process_csv(file_path: str, force_path: str, z_path: str, metadata: Dict[str
     segments = [
         Segment(
             type="approach",
-            deflection=deflection[:min_length],
-            z_sensor=z_sensor[:min_length],
+            deflection=deflection,
+            z_sensor=z_sensor,
             sampling_rate=sampling_rate,
             velocity=velocity,
-            no_points=min_length
+            no_points=len(deflection)
         )
     ]
 
-    curves = {}
-    curves["curve0"] = ForceCurve(
+    return ForceCurve(
         file_id=combined_metadata.get("file_id", "file_0"),
         date=combined_metadata.get("date", "2025-05-20"),
         instrument=combined_metadata.get("instrument", "unknown"),
@@ -104,6 +74,26 @@ def process_csv(file_path: str, force_path: str, z_path: str, metadata: Dict[str
         segments=segments
     )
 
+def iter_csv_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[str, ForceCurve]]:
+    """
+    Yield (curve_name, ForceCurve) for each curve in the CSV: one per metadata/header/data
+    block, and one per force/z column pair when the header repeats the selected columns.
+    """
+    curves = iter_delimited_curves(
+        file_path, force_path, z_path,
+        delimiter=",",
+        split_line=_split_csv_line,
+        split_header=_split_csv_line,
+        parse_metadata=_parse_csv_metadata,
+        chunk_rows=chunk_rows,
+    )
+    for curve_idx, (file_metadata, deflection, z_sensor) in enumerate(curves):
+        yield f"curve{curve_idx}", _build_csv_curve(file_metadata, metadata, deflection, z_sensor)
+
+def process_csv(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    curves = dict(iter_csv_curves(file_path, force_path, z_path, metadata))
+    if not curves:
+        raise ValueError("No valid data in CSV")
     return curves
     
 def export_from_duckdb_to_csv(
@@ -124,9 +114,10 @@ def export_from_duckdb_to_csv(
     Returns:
         Number of curves exported.
     """
+    from storage.lazy_source import lazy_curve_scope  # Deferred: storage.lazy_source imports file_types
     try:
         # Connect to DuckDB
-        with duckdb.connect(db_path) as conn:
+        with duckdb.connect(db_path) as conn, lazy_curve_scope(conn, curve_ids or None):
             query = """
                 SELECT curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
                        tip_geometry, tip_radius, segment_type, force_values AS deflection,
@@ -0,0 +1,155 @@
+# Vectorized parsing of delimited force-curve text files (CSV/TXT), including multi-curve files
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numeric rows parsed per np.loadtxt call; bounds the raw text held in memory
+DEFAULT_CHUNK_ROWS = 200_000
+
+_NUMERIC_START = frozenset("0123456789+-.")
+_SPECIAL_NUMBERS = frozenset(("nan", "inf", "+inf", "-inf", "infinity", "+infinity", "-infinity"))
+
+
+def _is_data_line(text: str, split_line: Callable[[str], List[str]]) -> bool:
+    if text.lstrip('"')[:1] in _NUMERIC_START:
+        return True
+    fields = split_line(text)
+    return bool(fields) and fields[0].lower() in _SPECIAL_NUMBERS
+
+
+def _pair_columns(headers: List[str], force_path: str, z_path: str) -> List[Tuple[int, int]]:
+    """
+    (force, z) column index pairs. Files holding several curves side by side repeat
+    the selected column names; the k-th force column pairs with the k-th z column.
+    """
+    force_cols = [i for i, name in enumerate(headers) if name == force_path]
+    z_cols = [i for i, name in enumerate(headers) if name == z_path]
+    if not force_cols or not z_cols:
+        missing = force_path if not force_cols else z_path
+        raise ValueError(f"Column not found: '{missing}' is not in list")
+    return list(zip(force_cols, z_cols))
+
+
+# Below this many rows a failing chunk is parsed row by row
+_ROWWISE_ROWS = 64
+
+
+def _parse_rows(
+    rows: List[str],
+    usecols: List[int],
+    delimiter: Optional[str],
+    split_line: Callable[[str], List[str]],
+) -> np.ndarray:
+    """
+    Parse numeric rows with the C parser. A chunk containing malformed rows is
+    bisected so only the small pieces holding them fall back to Python, where
+    rows that don't parse are skipped as before.
+    """
+    try:
+        return np.loadtxt(rows, delimiter=delimiter, usecols=usecols, ndmin=2, quotechar='"', dtype=np.float64)
+    except ValueError:
+        pass
+    if len(rows) > _ROWWISE_ROWS:
+        mid = len(rows) // 2
+        return np.concatenate([
+            _parse_rows(rows[:mid], usecols, delimiter, split_line),
+            _parse_rows(rows[mid:], usecols, delimiter, split_line),
+        ])
+    values = []
+    for row in rows:
+        fields = [field.strip('"') for field in split_line(row)]
+        try:
+            values.append([float(fields[i]) for i in usecols])
+        except (ValueError, IndexError):
+            continue
+    return np.array(values, dtype=np.float64).reshape(-1, len(usecols))
+
+
+def iter_delimited_curves(
+    file_path: str,
+    force_path: str,
+    z_path: str,
+    delimiter: Optional[str],
+    split_line: Callable[[str], List[str]],
+    split_header: Callable[[str], List[str]],
+    parse_metadata: Callable[[str], Optional[Tuple[str, str]]],
+    is_annotation: Optional[Callable[[str], bool]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[Tuple[Dict[str, str], np.ndarray, np.ndarray]]:
+    """
+    Yield (metadata, deflection, z_sensor) for each curve of a delimited text file.
+
+    A block is a run of metadata lines, a header line (the last non-numeric line
+    before the data) and the numeric rows below it. Exports with several curves
+    repeat the block; metadata carries over from earlier blocks unless overridden.
+    Within a block, repeated force/z column names hold one curve per column pair.
+    Numeric rows go to np.loadtxt chunk_rows at a time.
+
+    is_annotation, when given, marks which non-numeric lines may be metadata or
+    headers; any other text line is ignored (e.g. free text in a TXT body).
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be a positive integer")
+    metadata: Dict[str, str] = {}
+    pending: List[str] = []
+    pairs: List[Tuple[int, int]] = []
+    usecols: List[int] = []
+    rows: List[str] = []
+    parts: List[np.ndarray] = []
+
+    def flush_rows():
+        if rows:
+            parts.append(_parse_rows(rows, usecols, delimiter, split_line))
+            rows.clear()
+
+    def start_block():
+        nonlocal pairs, usecols
+        if not pending:
+            raise ValueError("No header line found before data rows")
+        for text in pending[:-1]:
+            entry = parse_metadata(text)
+            if entry:
+                metadata[entry[0]] = entry[1]
+        headers = split_header(pending[-1])
+        pairs = _pair_columns(headers, force_path, z_path)
+        usecols = [col for pair in pairs for col in pair]
+        pending.clear()
+
+    def finish_block():
+        flush_rows()
+        values = np.concatenate(parts) if parts else np.empty((0, len(usecols)))
+        parts.clear()
+        if not len(values):
+            return
+        for k in range(len(pairs)):
+            yield dict(metadata), np.ascontiguousarray(values[:, 2 * k]), np.ascontiguousarray(values[:, 2 * k + 1])
+
+    in_body = False
+    with open(file_path, "r") as f:
+        for line in f:
+            text = line.strip()
+            if not text:
+                continue
+            if text[0] in _NUMERIC_START or _is_data_line(text, split_line):
+                if not in_body:
+                    start_block()
+                    in_body = True
+                rows.append(text)
+                if len(rows) >= chunk_rows:
+                    flush_rows()
+            elif is_annotation is None or is_annotation(text):
+                if in_body:
+                    yield from finish_block()
+                    in_body = False
+                pending.append(text)
+    if in_body:
+        yield from finish_block()
+    elif pending:
+        # Header/metadata without any data rows: still validate the column selection
+        for text in pending:
+            entry = parse_metadata(text)
+            if entry is None:
+                _pair_columns(split_header(text), force_path, z_path)
+                break
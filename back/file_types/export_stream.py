@@ -0,0 +1,74 @@
+# Helpers for exports produced as a sequence of text chunks, written to a file or streamed to the client
+import zlib
+import logging
+from typing import Any, Iterator, List, Optional, Tuple
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from DuckDB per step while producing an export
+EXPORT_FETCH_ROWS = 256
+
+# Compression level for gzip-encoded export responses (favours throughput over ratio)
+EXPORT_GZIP_LEVEL = 6
+
+# Columns of every raw export row, in this order
+CURVE_ROW_COLUMNS = """
+    curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
+    tip_geometry, tip_radius, segment_type, force_values AS deflection,
+    z_values AS z_sensor, sampling_rate, velocity, no_points
+"""
+
+def iter_curve_rows(db_path: str, curve_ids: Optional[List[int]] = None) -> Iterator[Tuple[Any, ...]]:
+    """
+    Raw export rows (CURVE_ROW_COLUMNS) of the requested curves, all when curve_ids is
+    empty, fetched EXPORT_FETCH_ROWS at a time. Raises ValueError on the first
+    next() when there is nothing to export.
+    """
+    from storage.lazy_source import lazy_curve_scope  # Deferred: storage.lazy_source imports file_types
+    with duckdb.connect(db_path) as conn, lazy_curve_scope(conn, curve_ids or None):
+        query = f"SELECT {CURVE_ROW_COLUMNS} FROM force_vs_z"
+        params = []
+        if curve_ids:
+            query += " WHERE curve_id IN ({})".format(",".join("?" for _ in curve_ids))
+            params = curve_ids
+        result = conn.execute(query, params)
+        rows = result.fetchmany(EXPORT_FETCH_ROWS)
+        if not rows:
+            logger.error("No curves found in database")
+            raise ValueError("No curves found in database")
+        while rows:
+            yield from rows
+            rows = result.fetchmany(EXPORT_FETCH_ROWS)
+
+def write_chunks(output_path: str, chunks: Iterator[str], newline: Optional[str] = None) -> int:
+    """
+    Write an export's chunks to output_path; returns the generator's result (the
+    number of curves). The file is only created once the first chunk exists, so a
+    failing export leaves nothing behind.
+    """
+    first_chunk = next(chunks)
+    with open(output_path, "w", newline=newline, encoding="utf-8") as f:
+        f.write(first_chunk)
+        while True:
+            try:
+                f.write(next(chunks))
+            except StopIteration as stop:
+                return stop.value
+
+def gzip_chunks(chunks: Iterator[str], level: int = EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """
+    Gzip-encode a chunk stream on the fly. The first chunk is flushed right away so
+    the client sees bytes immediately; after that compressed output is emitted as
+    zlib produces it.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    first = True
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if first:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if data:
+            yield data
+    yield compressor.flush()
@@ -3,7 +3,9 @@ import numpy as np
 from models.force_curve import ForceCurve, Segment
 import logging
 import os
-from typing import Dict, List, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 
 def get_hdf5_structure(file_path: str) -> Dict[str, Any]:
     """Return the HDF5 file structure as a nested dictionary for frontend display."""
@@ -91,97 +93,211 @@ def validate_dataset(dataset: h5py.Dataset, path: str) -> None:
     if len(dataset.shape) != 1:
         raise ValueError(f"Dataset {path} must be 1D, got shape {dataset.shape}")
 
-def process_hdf5(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
-    """Process all curves in HDF5 file with validation and error handling."""
+# Curve groups read per task, and the group count below which reading stays in-process
+HDF5_READ_BATCH = 256
+HDF5_PARALLEL_MIN_GROUPS = 1024
+
+def _read_dataset(file_id: h5py.h5f.FileID, dataset_path: str, path: str) -> np.ndarray:
+    """
+    Read a 1D dataset straight into a preallocated buffer of its own dtype.
+    Uses the low-level API: resolving high-level Group/Dataset objects costs
+    more than the read itself for typical curve sizes.
+    """
+    dataset_id = h5py.h5d.open(file_id, dataset_path.encode("utf-8"))
+    if len(dataset_id.shape) != 1:
+        raise ValueError(f"Dataset {path} must be 1D, got shape {dataset_id.shape}")
+    if dataset_id.shape[0] == 0:
+        raise ValueError(f"Dataset {path} is empty")
+    buffer = np.empty(dataset_id.shape, dtype=dataset_id.dtype)
+    dataset_id.read(h5py.h5s.ALL, h5py.h5s.ALL, buffer)
+    return buffer
+
+def _read_hdf5_groups(
+    curve_names: List[str],
+    file_path: str,
+    force_path: str,
+    z_path: str,
+    force_relative_path: str,
+    z_relative_path: str,
+    validated_metadata: Dict[str, Any],
+) -> List[Tuple[str, ForceCurve]]:
+    """Read and validate a batch of curve groups. Runs in a worker process for large files."""
+    curves = []
+    with h5py.File(file_path, "r") as f:
+        for curve_name in curve_names:
+            try:
+                deflection = _read_dataset(f.id, f"{curve_name}/{force_relative_path}", force_path)
+                z_sensor = _read_dataset(f.id, f"{curve_name}/{z_relative_path}", z_path)
+                min_length = min(len(deflection), len(z_sensor))
+                if min_length == 0:
+                    logger.warning(f"Skipping {curve_name}: Empty Force or Z data")
+                    continue
+                deflection = deflection[:min_length]
+                z_sensor = z_sensor[:min_length]
+
+                # Validate segment data
+                if not (np.isfinite(deflection).all() and np.isfinite(z_sensor).all()):
+                    logger.warning(f"Skipping {curve_name}: Invalid data (non-finite values)")
+                    continue
+
+                segments = [
+                    Segment(
+                        type="approach",
+                        deflection=deflection,
+                        z_sensor=z_sensor,
+                        sampling_rate=float(validated_metadata.get("sampling_rate", 1e5)),
+                        velocity=float(validated_metadata.get("velocity", 1e-6)),
+                        no_points=min_length
+                    )
+                ]
+                curves.append((curve_name, ForceCurve(
+                    file_id=validated_metadata["file_id"],
+                    date=validated_metadata["date"],
+                    instrument=validated_metadata["instrument"],
+                    sample=validated_metadata["sample"],
+                    spring_constant=float(validated_metadata["spring_constant"]),
+                    inv_ols=float(validated_metadata["inv_ols"]),
+                    tip_geometry=validated_metadata["tip_geometry"],
+                    tip_radius=float(validated_metadata["tip_radius"]),
+                    segments=segments
+                )))
+            except KeyError as e:
+                logger.warning(f"Skipping {curve_name} due to missing dataset: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error processing {curve_name}: {str(e)}")
+                continue
+    return curves
+
+def _curve_layout(file_path: str, force_path: str, z_path: str) -> Tuple[List[str], str, str]:
+    """Curve group names in file order, and the force/z dataset paths relative to a curve group."""
+    with h5py.File(file_path, "r") as f:
+        # Validate curve groups
+        curve_names = [name for name, item in f.items() if isinstance(item, h5py.Group)]
+    if not curve_names:
+        logger.error("No curve groups found in HDF5 file")
+        raise ValueError("No curve groups found in HDF5")
+
+    # Validate dataset paths
+    sample_curve_name = curve_names[0]
+    if not (force_path.startswith(f"{sample_curve_name}/") and z_path.startswith(f"{sample_curve_name}/")):
+        logger.error(f"Invalid paths: force_path={force_path}, z_path={z_path} must start with {sample_curve_name}/")
+        raise ValueError("Selected paths must belong to a curve group")
+
+    force_relative_path = force_path[len(sample_curve_name) + 1:]
+    z_relative_path = z_path[len(sample_curve_name) + 1:]
+    logger.info(f"Using relative paths: Force={force_relative_path}, Z={z_relative_path}")
+    return curve_names, force_relative_path, z_relative_path
+
+def iter_hdf5_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], max_workers: Optional[int] = None) -> Iterator[Tuple[str, ForceCurve]]:
+    """
+    Yield (curve_name, ForceCurve) for each valid curve in the HDF5 file, in file order.
+    Files with many curve groups are read in batches by worker processes; at most
+    2 * max_workers batches are read ahead of the consumer.
+    """
     # Validate file
     if not os.path.exists(file_path):
         logger.error(f"File not found: {file_path}")
         raise ValueError(f"File not found: {file_path}")
     
-    curves = {}
     try:
-        with h5py.File(file_path, "r") as f:
-            # Validate curve groups
-            curve_groups = [(name, item) for name, item in f.items() if isinstance(item, h5py.Group)]
-            if not curve_groups:
-                logger.error("No curve groups found in HDF5 file")
-                raise ValueError("No curve groups found in HDF5")
-
-            # Validate dataset paths
-            sample_curve_name = curve_groups[0][0]
-            if not (force_path.startswith(f"{sample_curve_name}/") and z_path.startswith(f"{sample_curve_name}/")):
-                logger.error(f"Invalid paths: force_path={force_path}, z_path={z_path} must start with {sample_curve_name}/")
-                raise ValueError("Selected paths must belong to a curve group")
-
-            force_relative_path = force_path[len(sample_curve_name) + 1:]
-            z_relative_path = z_path[len(sample_curve_name) + 1:]
-            logger.info(f"Using relative paths: Force={force_relative_path}, Z={z_relative_path}")
-
-            # Process each curve
-            for curve_name, curve_group in curve_groups:
-                try:
-                    # Validate datasets
-                    force_dataset = curve_group[force_relative_path]
-                    z_dataset = curve_group[z_relative_path]
-                    validate_dataset(force_dataset, force_path)
-                    validate_dataset(z_dataset, z_path)
-
-                    # Validate data compatibility
-                    deflection = np.array(force_dataset[()])
-                    z_sensor = np.array(z_dataset[()])
-                    min_length = min(len(deflection), len(z_sensor))
-                    if min_length == 0:
-                        logger.warning(f"Skipping {curve_name}: Empty Force or Z data")
-                        continue
-
-                    # Validate metadata
-                    validated_metadata = validate_and_fill_metadata(metadata, curve_name)
-
-                    # Create segment
-                    segments = [
-                        Segment(
-                            type="approach",
-                            deflection=deflection[:min_length],
-                            z_sensor=z_sensor[:min_length],
-                            sampling_rate=float(validated_metadata.get("sampling_rate", 1e5)),
-                            velocity=float(validated_metadata.get("velocity", 1e-6)),
-                            no_points=min_length
-                        )
-                    ]
-
-                    # Validate segment data
-                    if not all(np.isfinite(segments[0].deflection)) or not all(np.isfinite(segments[0].z_sensor)):
-                        logger.warning(f"Skipping {curve_name}: Invalid data (non-finite values)")
-                        continue
-
-                    curves[curve_name] = ForceCurve(
-                        file_id=validated_metadata["file_id"],
-                        date=validated_metadata["date"],
-                        instrument=validated_metadata["instrument"],
-                        sample=validated_metadata["sample"],
-                        spring_constant=float(validated_metadata["spring_constant"]),
-                        inv_ols=float(validated_metadata["inv_ols"]),
-                        tip_geometry=validated_metadata["tip_geometry"],
-                        tip_radius=float(validated_metadata["tip_radius"]),
-                        segments=segments
-                    )
-                    logger.info(f"Processed curve: {curve_name}")
-                except KeyError as e:
-                    logger.warning(f"Skipping {curve_name} due to missing dataset: {e}")
-                    continue
-                except Exception as e:
-                    logger.error(f"Error processing {curve_name}: {str(e)}")
-                    continue
-
-        if not curves:
-            logger.error("No valid Force and Z datasets found in HDF5")
-            raise ValueError("No valid Force and Z datasets found in HDF5")
-
-        logger.info(f"Processed {len(curves)} curves: {list(curves.keys())[:5]}{'...' if len(curves) > 5 else ''}")
-        return curves
+        curve_names, force_relative_path, z_relative_path = _curve_layout(file_path, force_path, z_path)
+
+        # Metadata is shared by every curve in the file, so validate it once
+        validated_metadata = validate_and_fill_metadata(metadata, curve_names[0])
+        read_args = (file_path, force_path, z_path, force_relative_path, z_relative_path, validated_metadata)
+        batches = [curve_names[i:i + HDF5_READ_BATCH] for i in range(0, len(curve_names), HDF5_READ_BATCH)]
+
+        max_workers = max_workers or min(4, os.cpu_count() or 1)
+        if max_workers == 1 or len(curve_names) < HDF5_PARALLEL_MIN_GROUPS:
+            for batch in batches:
+                yield from _read_hdf5_groups(batch, *read_args)
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            window = deque()
+            for batch in batches:
+                window.append(executor.submit(_read_hdf5_groups, batch, *read_args))
+                if len(window) >= 2 * max_workers:
+                    yield from window.popleft().result()
+            while window:
+                yield from window.popleft().result()
     except Exception as e:
         logger.error(f"Failed to process HDF5 file {file_path}: {str(e)}")
         raise
+
+def scan_hdf5_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Index the curves of an HDF5 file without reading their values: one entry per
+    curve group holding both datasets (curve_name, force_location, z_location,
+    no_points), in file order, plus the validated metadata. Curves that
+    iter_hdf5_curves would skip for missing or empty datasets are left out; values
+    are not checked for non-finite samples, since that would mean reading them.
+    """
+    if not os.path.exists(file_path):
+        logger.error(f"File not found: {file_path}")
+        raise ValueError(f"File not found: {file_path}")
+
+    curve_names, force_relative_path, z_relative_path = _curve_layout(file_path, force_path, z_path)
+    validated_metadata = validate_and_fill_metadata(metadata, curve_names[0])
+    entries = []
+    with h5py.File(file_path, "r") as f:
+        for curve_name in curve_names:
+            force_location = f"{curve_name}/{force_relative_path}"
+            z_location = f"{curve_name}/{z_relative_path}"
+            try:
+                force_shape = h5py.h5d.open(f.id, force_location.encode("utf-8")).shape
+                z_shape = h5py.h5d.open(f.id, z_location.encode("utf-8")).shape
+            except KeyError as e:
+                logger.warning(f"Skipping {curve_name} due to missing dataset: {e}")
+                continue
+            if len(force_shape) != 1 or len(z_shape) != 1 or min(force_shape[0], z_shape[0]) == 0:
+                logger.warning(f"Skipping {curve_name}: Force and Z must be non-empty 1D datasets")
+                continue
+            entries.append({
+                "curve_name": curve_name,
+                "force_location": force_location,
+                "z_location": z_location,
+                "no_points": min(force_shape[0], z_shape[0]),
+            })
+    return entries, validated_metadata
+
+def _read_mapped(file_id: h5py.h5f.FileID, file_map: np.ndarray, location: str) -> np.ndarray:
+    """
+    A 1D dataset's values. Contiguous datasets are returned as a view of the
+    memory-mapped file, so only their own pages are read; chunked, compressed or
+    virtual ones fall back to a regular read.
+    """
+    dataset_id = h5py.h5d.open(file_id, location.encode("utf-8"))
+    offset = dataset_id.get_offset()
+    dtype = dataset_id.dtype
+    if offset is not None and dataset_id.get_create_plist().get_layout() == h5py.h5d.CONTIGUOUS and dtype.kind == "f":
+        return file_map[offset:offset + dataset_id.shape[0] * dtype.itemsize].view(dtype)
+    buffer = np.empty(dataset_id.shape, dtype=dtype)
+    dataset_id.read(h5py.h5s.ALL, h5py.h5s.ALL, buffer)
+    return buffer
+
+def read_hdf5_curve_values(file_path: str, locations: List[Tuple[str, str, int]]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Force and z values for (force_location, z_location, no_points) entries of scan_hdf5_curves."""
+    if not os.path.exists(file_path):
+        raise ValueError(f"Source file not found: {file_path}")
+    file_map = np.memmap(file_path, dtype=np.uint8, mode="r")
+    forces, zs = [], []
+    with h5py.File(file_path, "r") as f:
+        for force_location, z_location, no_points in locations:
+            forces.append(_read_mapped(f.id, file_map, force_location)[:no_points])
+            zs.append(_read_mapped(f.id, file_map, z_location)[:no_points])
+    return forces, zs
+
+def process_hdf5(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    """Process all curves in HDF5 file with validation and error handling."""
+    curves = dict(iter_hdf5_curves(file_path, force_path, z_path, metadata))
+    if not curves:
+        logger.error("No valid Force and Z datasets found in HDF5")
+        raise ValueError("No valid Force and Z datasets found in HDF5")
+
+    logger.info(f"Processed {len(curves)} curves: {list(curves.keys())[:5]}{'...' if len(curves) > 5 else ''}")
+    return curves
     
     
     
@@ -228,6 +344,119 @@ def validate_and_fill_metadata(metadata: Dict, curve_name: str) -> Dict:
 
 
 import duckdb
+from models.curve_batch import CurveBatch
+
+# Export layouts: two datasets per curve, or every curve in shared chunked datasets
+HDF5_EXPORT_LAYOUTS = ("per_curve", "chunked")
+HDF5_EXPORT_COMPRESSIONS = ("gzip", "lzf", None)
+# Samples per HDF5 chunk of the chunked layout's value datasets (512 KiB of float64)
+HDF5_EXPORT_CHUNK_SAMPLES = 1 << 16
+# DuckDB vectors (2048 rows each) fetched per write batch
+HDF5_EXPORT_BATCH_VECTORS = 4
+
+# Row of the chunked layout's curve table, one per exported segment
+_CURVE_TABLE_DTYPE = np.dtype([
+    ("curve_id", np.int64),
+    ("segment_type", h5py.string_dtype()),
+    ("file_id", h5py.string_dtype()),
+    ("date", h5py.string_dtype()),
+    ("instrument", h5py.string_dtype()),
+    ("sample", h5py.string_dtype()),
+    ("spring_constant", np.float64),
+    ("inv_ols", np.float64),
+    ("tip_geometry", h5py.string_dtype()),
+    ("tip_radius", np.float64),
+    ("sampling_rate", np.float64),
+    ("velocity", np.float64),
+    ("no_points", np.int64),
+])
+
+def _curve_table(chunk) -> np.ndarray:
+    """Curve table rows for a fetched DataFrame chunk; NULL text becomes "", NULL numbers NaN."""
+    table = np.empty(len(chunk), dtype=_CURVE_TABLE_DTYPE)
+    for name in _CURVE_TABLE_DTYPE.names:
+        column = chunk[name]
+        if _CURVE_TABLE_DTYPE[name].kind == "O":
+            table[name] = column.fillna("").astype(str).to_numpy()
+        elif _CURVE_TABLE_DTYPE[name].kind == "i":
+            table[name] = column.fillna(0).to_numpy()
+        else:
+            table[name] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    return table
+
+def _append(dataset: h5py.Dataset, values: np.ndarray) -> None:
+    start = dataset.shape[0]
+    dataset.resize((start + len(values),))
+    dataset[start:] = values
+
+def _write_chunked_batch(datasets: Dict[str, h5py.Dataset], batch: CurveBatch, table: np.ndarray) -> None:
+    """Append one batch of curves; runs on the writer thread, where HDF5 compresses the chunks."""
+    end = datasets["offsets"][-1]
+    _append(datasets["force"], batch.values("force"))
+    _append(datasets["z"], batch.values("z"))
+    _append(datasets["offsets"], end + batch.offsets("force")[1:])
+    _append(datasets["curves"], table)
+
+def _export_chunked_hdf5(
+    conn: duckdb.DuckDBPyConnection,
+    f: h5py.File,
+    curve_ids: Optional[List[int]],
+    dataset_path: str,
+    metadata_path: str,
+    metadata: Dict[str, Any],
+    compression: Optional[str]
+) -> int:
+    """
+    Write every curve into four datasets under dataset_path: force and z hold the
+    samples of all curves back to back (chunked and compressed), offsets[i]:offsets[i + 1]
+    is curve i's span in both, and curves is a compound table with one metadata row
+    per curve. Batches are fetched from DuckDB while the previous one is being
+    compressed and written on a background thread. Returns the number of curves written.
+    """
+    query = """
+        SELECT curve_id, segment_type, force_values, z_values, file_id, date, instrument, sample,
+               spring_constant, inv_ols, tip_geometry, tip_radius, sampling_rate, velocity, no_points
+        FROM force_vs_z
+    """
+    params = []
+    if curve_ids:
+        query += " WHERE curve_id IN ({})".format(",".join("?" for _ in curve_ids))
+        params = curve_ids
+    result = conn.execute(query + " ORDER BY curve_id, segment_type", params)
+
+    group = f.require_group(dataset_path)
+    group.attrs["layout"] = "chunked"
+    values = {"chunks": (HDF5_EXPORT_CHUNK_SAMPLES,), "maxshape": (None,), "compression": compression, "shuffle": compression is not None}
+    datasets = {
+        "force": group.create_dataset("force", shape=(0,), dtype=np.float64, **values),
+        "z": group.create_dataset("z", shape=(0,), dtype=np.float64, **values),
+        "offsets": group.create_dataset("offsets", data=np.zeros(1, dtype=np.int64), chunks=True, maxshape=(None,)),
+        "curves": group.create_dataset("curves", shape=(0,), dtype=_CURVE_TABLE_DTYPE, chunks=True, maxshape=(None,), compression=compression),
+    }
+
+    num_exported = 0
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        while True:
+            chunk = result.fetch_df_chunk(HDF5_EXPORT_BATCH_VECTORS)
+            if chunk.empty:
+                break
+            batch = CurveBatch.from_arrays(chunk["curve_id"].to_numpy(), force=chunk["force_values"], z=chunk["z_values"])
+            if not np.array_equal(batch.lengths("force"), batch.lengths("z")):
+                raise ValueError("Force and Z values must have the same length for the chunked layout")
+            table = _curve_table(chunk)
+            if pending is not None:
+                pending.result()  # At most one batch in flight
+            pending = writer.submit(_write_chunked_batch, datasets, batch, table)
+            num_exported += len(batch)
+        if pending is not None:
+            pending.result()
+
+    group.attrs["curve_count"] = num_exported
+    metadata_group = f.require_group(metadata_path) if metadata_path else group
+    for key, value in metadata.items():
+        metadata_group.attrs[key] = value
+    return num_exported
 
 def export_from_duckdb_to_hdf5(
     db_path: str,
@@ -236,7 +465,9 @@ def export_from_duckdb_to_hdf5(
     dataset_path: str = "dataset",
     level_names: List[str] = ["curve0", "segment0"],
     metadata_path: str = "tip",
-    metadata: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {},
+    layout: str = "per_curve",
+    compression: Optional[str] = "gzip"
 ) -> int:
     """
     Export transformed curves from DuckDB to an HDF5 file with specified dataset and metadata paths.
@@ -249,13 +480,39 @@ def export_from_duckdb_to_hdf5(
         level_names: List of group level names (e.g., ["curve0", "segment0"]).
         metadata_path: HDF5 path for storing metadata (e.g., "curve0/segment0/tip").
         metadata: Dictionary of metadata to store as attributes.
+        layout: "per_curve" (two datasets per curve) or "chunked" (see _export_chunked_hdf5).
+        compression: HDF5 filter for the chunked layout's datasets ("gzip", "lzf" or None).
     
     Returns:
         Number of curves exported.
     """
+    from storage.lazy_source import lazy_curve_scope  # Deferred: storage.lazy_source imports file_types
+    if layout not in HDF5_EXPORT_LAYOUTS:
+        raise ValueError(f"layout must be one of: {', '.join(HDF5_EXPORT_LAYOUTS)}")
+    if compression not in HDF5_EXPORT_COMPRESSIONS:
+        raise ValueError("compression must be one of: gzip, lzf, or null")
+    if layout == "chunked":
+        if os.path.exists(output_path):
+            error_msg = f"File already exists: {output_path}. Please choose a different filename or remove the existing file manually."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        try:
+            with duckdb.connect(db_path) as conn, lazy_curve_scope(conn, curve_ids or None), h5py.File(output_path, "w") as f:
+                num_exported = _export_chunked_hdf5(conn, f, curve_ids, dataset_path, metadata_path, metadata or {}, compression)
+            if not num_exported:
+                logger.error("No curves found in database")
+                raise ValueError("No curves found in database")
+            logger.info(f"Exported {num_exported} curves from DuckDB to chunked HDF5 file at {output_path}")
+            return num_exported
+        except Exception as e:
+            if os.path.exists(output_path):
+                os.remove(output_path)  # Never leave a partial file behind
+            logger.error(f"Failed to export to HDF5 file {output_path}: {str(e)}")
+            raise
+
     try:
         # Connect to DuckDB
-        with duckdb.connect(db_path) as conn:
+        with duckdb.connect(db_path) as conn, lazy_curve_scope(conn, curve_ids or None):
             query = """
                 SELECT curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
                        tip_geometry, tip_radius, segment_type, force_values AS deflection,
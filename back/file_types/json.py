@@ -1,7 +1,9 @@
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from models.force_curve import ForceCurve, Segment
+from file_types.json_stream import iter_json_datasets, read_json_member, VALUE_ARRAY, VALUE_SHAPE
 import os  # If needed for file validation
+from functools import lru_cache
 import logging
 import json
 
@@ -15,110 +17,187 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+def _dataset_alias(dataset: Dict[str, Any]) -> str:
+    """First alias of a dataset entry, normalized without leading/trailing slashes."""
+    alias = dataset.get("alias", [""])
+    alias = alias[0] if isinstance(alias, list) and alias else ""
+    return alias.strip("/") if isinstance(alias, str) else ""
+
+def _add_structure_dataset(structure: Dict[str, Any], alias: str, length: int, attributes: List[Dict[str, Any]]) -> None:
+    """Place one dataset (by alias and value length) into the nested structure for frontend display."""
+    parts = alias.split("/")
+    current = structure["groups"]
+    path = ""
+
+    # Build group hierarchy and collect datasets/attributes
+    for i, part in enumerate(parts):
+        path = f"{path}/{part}" if path else part
+        if i == len(parts) - 1:
+            # Dataset (e.g., Force, Z, or tip)
+            if part in ["Force", "Z"] or part == "tip":
+                shape = [length] if length else [0]
+                dtype = "float64" if length else "unknown"
+                dataset_info = {
+                    "path": path,
+                    "name": part,
+                    "shape": shape,
+                    "dtype": dtype,
+                    "attributes": {}
+                }
+                # Collect attributes
+                for attr in attributes:
+                    attr_name = attr.get("name")
+                    attr_value = attr.get("value")
+                    try:
+                        if isinstance(attr_value, (list, tuple)):
+                            attr_value = np.array(attr_value).tolist()
+                        elif isinstance(attr_value, (int, float)):
+                            pass
+                        elif isinstance(attr_value, bytes):
+                            attr_value = attr_value.decode('utf-8')
+                        elif isinstance(attr_value, str):
+                            pass
+                        dataset_info["attributes"][attr_name] = attr_value
+                    except Exception as e:
+                        logger.warning(f"Skipping attribute {attr_name} at {path}: {e}")
+                current.setdefault("datasets", []).append(dataset_info)
+        else:
+            # Group (e.g., curve0, segment0)
+            if part not in current:
+                current[part] = {"groups": {}, "datasets": [], "attributes": {}}
+            current = current[part]["groups"]
+
 def get_json_structure(json_data: Dict[str, Any]) -> Dict[str, Any]:
     """Extract JSON dataset structure as a nested dictionary for frontend display."""
     if "datasets" not in json_data:
         raise ValueError("JSON file must contain a 'datasets' key")
 
     structure = {"groups": {}, "datasets": [], "attributes": {}}
-
     for dataset_id, dataset in json_data["datasets"].items():
-        alias = dataset.get("alias", [""])[0]
+        alias = _dataset_alias(dataset)
         if not alias:
             continue
-        # Normalize alias by removing leading/trailing slashes
-        alias = alias.strip("/")
-        parts = alias.split("/")
-        current = structure["groups"]
-        path = ""
-
-        # Build group hierarchy and collect datasets/attributes
-        for i, part in enumerate(parts):
-            path = f"{path}/{part}" if path else part
-            if i == len(parts) - 1:
-                # Dataset (e.g., Force, Z, or tip)
-                if part in ["Force", "Z"] or part == "tip":
-                    shape = [len(dataset.get("value", []))] if dataset.get("value") else [0]
-                    dtype = "float64" if dataset.get("value") else "unknown"
-                    dataset_info = {
-                        "path": path,
-                        "name": part,
-                        "shape": shape,
-                        "dtype": dtype,
-                        "attributes": {}
-                    }
-                    # Collect attributes
-                    for attr in dataset.get("attributes", []):
-                        attr_name = attr.get("name")
-                        attr_value = attr.get("value")
-                        try:
-                            if isinstance(attr_value, (list, tuple)):
-                                attr_value = np.array(attr_value).tolist()
-                            elif isinstance(attr_value, (int, float)):
-                                pass
-                            elif isinstance(attr_value, bytes):
-                                attr_value = attr_value.decode('utf-8')
-                            elif isinstance(attr_value, str):
-                                pass
-                            dataset_info["attributes"][attr_name] = attr_value
-                        except Exception as e:
-                            logger.warning(f"Skipping attribute {attr_name} at {path}: {e}")
-                    current.setdefault("datasets", []).append(dataset_info)
-            else:
-                # Group (e.g., curve0, segment0)
-                if part not in current:
-                    current[part] = {"groups": {}, "datasets": [], "attributes": {}}
-                current = current[part]["groups"]
+        value = dataset.get("value")
+        _add_structure_dataset(structure, alias, len(value) if value else 0, dataset.get("attributes", []))
+    return structure
 
+def get_json_file_structure(file_path: str) -> Dict[str, Any]:
+    """
+    Same structure as get_json_structure, read incrementally from the file: only aliases,
+    attributes and array lengths are kept, values are skipped without being parsed.
+    """
+    structure = {"groups": {}, "datasets": [], "attributes": {}}
+    try:
+        for dataset_id, dataset in iter_json_datasets(file_path, value_mode=lambda dataset: VALUE_SHAPE):
+            alias = _dataset_alias(dataset)
+            if not alias:
+                continue
+            _add_structure_dataset(structure, alias, dataset.get("value_length") or 0, dataset.get("attributes", []))
+    except ValueError as e:
+        logger.error(f"Failed to read JSON structure from {file_path}: {e}")
+        raise
     return structure
 
-def validate_data(data: List[float], path: str) -> None:
+def validate_data(data: Any, path: str) -> None:
     """Validate that data is non-empty and can be converted to 1D numpy array."""
-    if not isinstance(data, list) or not data:
+    if not isinstance(data, (list, np.ndarray)) or len(data) == 0:
         raise ValueError(f"Data at {path} is empty or not a list")
     try:
-        np_array = np.array(data)
+        np_array = np.asarray(data)
         if len(np_array.shape) != 1:
             raise ValueError(f"Data at {path} must be 1D, got shape {np_array.shape}")
     except Exception as e:
         raise ValueError(f"Invalid data at {path}: {e}")
 
-def process_json(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
-    """Process all curves in JSON file with validation and error handling."""
-    # Validate file
-    if not os.path.exists(file_path):
-        logger.error(f"File not found: {file_path}")
-        raise ValueError(f"File not found: {file_path}")
-    
+def _tip_radius_from_dataset(tip_dataset: Dict[str, Any], tip_radius: float) -> float:
+    """Tip radius in meters from a curve's tip dataset, falling back to tip_radius."""
+    for attr in tip_dataset.get("attributes", []):
+        if attr.get("name") == "value" and attr.get("type", {}).get("class") == "H5T_FLOAT":
+            unit = next((a["value"] for a in tip_dataset.get("attributes", []) if a.get("name") == "unit"), "um")
+            tip_radius = attr.get("value", 1e-6)
+            if unit == "um":
+                tip_radius /= 1e6
+            elif unit == "nm":
+                tip_radius /= 1e9
+    return tip_radius
+
+def _build_json_curve(curve_name: str, datasets: Dict[str, Dict[str, Any]], force_relative_path: str, z_relative_path: str, metadata: Dict[str, Any]) -> Optional[ForceCurve]:
+    """ForceCurve from one curve group's Force, Z and (optional) tip datasets, or None if it is skipped."""
     try:
-        with open(file_path, "r") as f:
-            json_data = json.load(f)
+        force_data = datasets["force"].get("value", [])
+        z_data = datasets["z"].get("value", [])
+
+        # Validate data
+        validate_data(force_data, f"{curve_name}/{force_relative_path}")
+        validate_data(z_data, f"{curve_name}/{z_relative_path}")
+
+        deflection = np.asarray(force_data, dtype=np.float64)
+        z_sensor = np.asarray(z_data, dtype=np.float64)
+        min_length = min(len(deflection), len(z_sensor))
+        if min_length == 0:
+            logger.warning(f"Skipping {curve_name} due to empty Force or Z data")
+            return None
+
+        # Validate data compatibility
+        if len(deflection) != len(z_sensor):
+            logger.warning(f"Truncating data for {curve_name} to min length {min_length} due to mismatch")
+
+        # Validate metadata
+        validated_metadata = validate_and_fill_metadata(metadata, curve_name)
+
+        # Extract tip metadata for this curve
+        tip_radius = float(validated_metadata.get("tip_radius", 1e-6))
+        tip_geometry = validated_metadata.get("tip_geometry", "pyramid")
+        if "tip" in datasets:
+            tip_radius = _tip_radius_from_dataset(datasets["tip"], tip_radius)
+
+        # Create segment
+        segments = [
+            Segment(
+                type="approach",  # Default, can be updated if segment type is available
+                deflection=deflection[:min_length],
+                z_sensor=z_sensor[:min_length],
+                sampling_rate=float(validated_metadata.get("sampling_rate", 1e5)),
+                velocity=float(validated_metadata.get("velocity", 1e-6)),
+                no_points=min_length
+            )
+        ]
+
+        # Validate segment data
+        if not (np.isfinite(segments[0].deflection).all() and np.isfinite(segments[0].z_sensor).all()):
+            logger.warning(f"Skipping {curve_name}: Invalid data (non-finite values)")
+            return None
+
+        curve = ForceCurve(
+            file_id=validated_metadata.get("file_id", f"{curve_name}_id"),
+            date=validated_metadata.get("date", "2025-05-20"),
+            instrument=validated_metadata.get("instrument", "unknown"),
+            sample=validated_metadata.get("sample", "unknown"),
+            spring_constant=float(validated_metadata.get("spring_constant", 0.1)),
+            inv_ols=float(validated_metadata.get("inv_ols", 22e-9)),
+            tip_geometry=tip_geometry,
+            tip_radius=tip_radius,
+            segments=segments
+        )
+        logger.info(f"Processed curve: {curve_name}")
+        return curve
     except Exception as e:
-        logger.error(f"Failed to load JSON file {file_path}: {e}")
-        raise ValueError(f"Failed to load JSON file: {e}")
-    
-    if "datasets" not in json_data:
-        logger.error("JSON file must contain a 'datasets' key")
-        raise ValueError("JSON file must contain a 'datasets' key")
-
-    curves = {}
-    # Extract curve names (e.g., curve0, curve1)
-    curve_names = set()
-    for dataset_id, dataset in json_data["datasets"].items():
-        alias = dataset.get("alias", [""])[0]
-        if not alias:
-            continue
-        # Normalize alias
-        alias = alias.strip("/")
-        parts = alias.split("/")
-        if len(parts) >= 1:
-            curve_names.add(parts[0])
+        logger.error(f"Error processing {curve_name}: {str(e)}")
+        return None
 
-    if not curve_names:
-        logger.error("No curve groups found in JSON")
-        raise ValueError("No curve groups found in JSON")
+def iter_json_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+    """
+    Yield (curve_name, ForceCurve) for each valid curve in the JSON file.
 
-    logger.info(f"Curve names: {curve_names}")
+    The "datasets" mapping is read one entry at a time: only the selected Force/Z
+    arrays are converted (straight to float64 arrays) and a curve is yielded as soon
+    as its Force, Z and tip entries have all been seen. Curves without a tip entry
+    are yielded at the end of the file.
+    """
+    # Validate file
+    if not os.path.exists(file_path):
+        logger.error(f"File not found: {file_path}")
+        raise ValueError(f"File not found: {file_path}")
 
     # Extract curve name from force_path or z_path
     normalized_force_path = force_path.strip("/")
@@ -134,112 +213,72 @@ def process_json(file_path: str, force_path: str, z_path: str, metadata: Dict[st
     if sample_curve_name != z_parts[0]:
         logger.error(f"Force and Z paths must belong to the same curve group. Got {force_path} and {z_path}")
         raise ValueError(f"Force and Z paths must belong to the same curve group. Got {force_path} and {z_path}")
-    
-    if sample_curve_name not in curve_names:
-        logger.error(f"Selected curve group {sample_curve_name} not found in JSON data")
-        raise ValueError(f"Selected curve group {sample_curve_name} not found in JSON data")
 
     logger.info(f"Sample curve name: {sample_curve_name}")
     logger.info(f"Force path: {force_path}, Z path: {z_path}")
 
-    # Validate paths belong to the same curve group
-    if not (normalized_force_path.startswith(f"{sample_curve_name}/") and normalized_z_path.startswith(f"{sample_curve_name}/")):
-        logger.error(f"Selected paths must belong to a curve group. Expected paths starting with {sample_curve_name}/, got {force_path} and {z_path}")
-        raise ValueError(f"Selected paths must belong to a curve group. Expected paths starting with {sample_curve_name}/, got {force_path} and {z_path}")
-
     force_relative_path = normalized_force_path[len(sample_curve_name) + 1:]  # e.g., segment0/Force
     z_relative_path = normalized_z_path[len(sample_curve_name) + 1:]         # e.g., segment0/Z
     logger.info(f"Force relative path: {force_relative_path}, Z relative path: {z_relative_path}")
 
-    # Process each curve
-    for curve_name in curve_names:
-        try:
-            # Normalize curve name
-            curve_name = curve_name.strip("/")
-            # Find Force and Z datasets
-            force_data = None
-            z_data = None
-            for dataset_id, dataset in json_data["datasets"].items():
-                alias = dataset.get("alias", [""])[0].strip("/")
-                if alias == f"{curve_name}/{force_relative_path}":
-                    force_data = dataset.get("value", [])
-                elif alias == f"{curve_name}/{z_relative_path}":
-                    z_data = dataset.get("value", [])
-
-            if force_data is None or z_data is None:
-                logger.warning(f"Skipping {curve_name} due to missing Force or Z data")
-                continue
-
-            # Validate data
-            validate_data(force_data, f"{curve_name}/{force_relative_path}")
-            validate_data(z_data, f"{curve_name}/{z_relative_path}")
+    def dataset_role(alias: str) -> Tuple[str, Optional[str]]:
+        curve_name, _, relative_path = alias.partition("/")
+        if relative_path == force_relative_path:
+            return curve_name, "force"
+        if relative_path == z_relative_path:
+            return curve_name, "z"
+        if relative_path == "tip":
+            return curve_name, "tip"
+        return curve_name, None
+
+    def value_mode(dataset: Dict[str, Any]) -> str:
+        # Arrays of datasets that are not selected are skipped without being parsed
+        role = dataset_role(_dataset_alias(dataset))[1]
+        return VALUE_ARRAY if role in ("force", "z") or not dataset.get("alias") else VALUE_SHAPE
 
-            deflection = np.array(force_data)
-            z_sensor = np.array(z_data)
-            min_length = min(len(deflection), len(z_sensor))
-            if min_length == 0:
-                logger.warning(f"Skipping {curve_name} due to empty Force or Z data")
+    curve_names = set()
+    pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    try:
+        for dataset_id, dataset in iter_json_datasets(file_path, value_mode=value_mode):
+            alias = _dataset_alias(dataset)
+            if not alias:
+                continue
+            curve_name, role = dataset_role(alias)
+            if curve_name not in curve_names:
+                curve_names.add(curve_name)
+                pending[curve_name] = {}
+            if role is None or curve_name not in pending:
                 continue
+            pending[curve_name][role] = dataset
+            if len(pending[curve_name]) == 3:
+                datasets = pending.pop(curve_name)
+                curve = _build_json_curve(curve_name, datasets, force_relative_path, z_relative_path, metadata)
+                if curve is not None:
+                    yield curve_name, curve
+    except ValueError as e:
+        logger.error(f"Failed to load JSON file {file_path}: {e}")
+        raise ValueError(f"Failed to load JSON file: {e}")
 
-            # Validate data compatibility
-            if len(deflection) != len(z_sensor):
-                logger.warning(f"Truncating data for {curve_name} to min length {min_length} due to mismatch")
-
-            # Validate metadata
-            validated_metadata = validate_and_fill_metadata(metadata, curve_name)
-
-            # Extract tip metadata for this curve
-            tip_radius = float(validated_metadata.get("tip_radius", 1e-6))
-            tip_geometry = validated_metadata.get("tip_geometry", "pyramid")
-            for dataset_id, dataset in json_data["datasets"].items():
-                alias = dataset.get("alias", [""])[0].strip("/")
-                if alias == f"{curve_name}/tip":
-                    for attr in dataset.get("attributes", []):
-                        if attr.get("name") == "value" and attr.get("type", {}).get("class") == "H5T_FLOAT":
-                            unit = next((a["value"] for a in dataset.get("attributes", []) if a.get("name") == "unit"), "um")
-                            tip_radius = attr.get("value", 1e-6)
-                            if unit == "um":
-                                tip_radius /= 1e6
-                            elif unit == "nm":
-                                tip_radius /= 1e9
-                    break
-
-            # Create segment
-            segments = [
-                Segment(
-                    type="approach",  # Default, can be updated if segment type is available
-                    deflection=deflection[:min_length],
-                    z_sensor=z_sensor[:min_length],
-                    sampling_rate=float(validated_metadata.get("sampling_rate", 1e5)),
-                    velocity=float(validated_metadata.get("velocity", 1e-6)),
-                    no_points=min_length
-                )
-            ]
+    if not curve_names:
+        logger.error("No curve groups found in JSON")
+        raise ValueError("No curve groups found in JSON")
 
-            # Validate segment data
-            if not all(np.isfinite(segments[0].deflection)) or not all(np.isfinite(segments[0].z_sensor)):
-                logger.warning(f"Skipping {curve_name}: Invalid data (non-finite values)")
-                continue
+    if sample_curve_name not in curve_names:
+        logger.error(f"Selected curve group {sample_curve_name} not found in JSON data")
+        raise ValueError(f"Selected curve group {sample_curve_name} not found in JSON data")
 
-            curves[curve_name] = ForceCurve(
-                file_id=validated_metadata.get("file_id", f"{curve_name}_id"),
-                date=validated_metadata.get("date", "2025-05-20"),
-                instrument=validated_metadata.get("instrument", "unknown"),
-                sample=validated_metadata.get("sample", "unknown"),
-                spring_constant=float(validated_metadata.get("spring_constant", 0.1)),
-                inv_ols=float(validated_metadata.get("inv_ols", 22e-9)),
-                tip_geometry=tip_geometry,
-                tip_radius=tip_radius,
-                segments=segments
-            )
-            logger.info(f"Processed curve: {curve_name}")
-        except KeyError as e:
-            logger.warning(f"Skipping {curve_name} due to missing dataset: {e}")
-            continue
-        except Exception as e:
-            logger.error(f"Error processing {curve_name}: {str(e)}")
+    # Curve groups without a tip entry
+    for curve_name, datasets in pending.items():
+        if "force" not in datasets or "z" not in datasets:
+            logger.warning(f"Skipping {curve_name} due to missing Force or Z data")
             continue
+        curve = _build_json_curve(curve_name, datasets, force_relative_path, z_relative_path, metadata)
+        if curve is not None:
+            yield curve_name, curve
 
+def process_json(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    """Process all curves in JSON file with validation and error handling."""
+    curves = dict(iter_json_curves(file_path, force_path, z_path, metadata))
     if not curves:
         logger.error("No valid Force and Z datasets found in JSON")
         raise ValueError("No valid Force and Z datasets found in JSON")
@@ -247,6 +286,11 @@ def process_json(file_path: str, force_path: str, z_path: str, metadata: Dict[st
     logger.info(f"Processed {len(curves)} curves: {list(curves.keys())[:5]}{'...' if len(curves) > 5 else ''}")
     return curves
 
+@lru_cache(maxsize=16)
+def _json_file_member(file_path: str, name: str, mtime_ns: int) -> Any:
+    """Top-level JSON member, read once per file version rather than once per curve."""
+    return read_json_member(file_path, name)
+
 def validate_and_fill_metadata(metadata: Dict, curve_name: str) -> Dict:
     """Validate metadata and fill missing fields with defaults or inferred values."""
     defaults = {
@@ -280,10 +324,11 @@ def validate_and_fill_metadata(metadata: Dict, curve_name: str) -> Dict:
     # Optional: Infer sampling_rate from JSON attributes if available
     # Assuming JSON might have global attributes; adjust if needed
     try:
-        with open(metadata.get("file_path", ""), "r") as f:
-            json_data = json.load(f)
-            if "sampling_rate" in json_data and validated_metadata["sampling_rate"] == defaults["sampling_rate"]:
-                validated_metadata["sampling_rate"] = float(json_data["sampling_rate"])
+        if validated_metadata["sampling_rate"] == defaults["sampling_rate"]:
+            file_path = metadata.get("file_path", "")
+            sampling_rate = _json_file_member(file_path, "sampling_rate", os.stat(file_path).st_mtime_ns)
+            if sampling_rate is not None:
+                validated_metadata["sampling_rate"] = float(sampling_rate)
                 logger.info(f"Inferred sampling_rate for {curve_name}: {validated_metadata['sampling_rate']}")
     except Exception:
         pass  # Fallback to default if inference fails
@@ -291,13 +336,89 @@ def validate_and_fill_metadata(metadata: Dict, curve_name: str) -> Dict:
     return validated_metadata
 
 import json
-from typing import Dict, Any, List, Optional
+from itertools import chain
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
-import duckdb
 import numpy as np
+from file_types.export_stream import iter_curve_rows, write_chunks
 
 logger = logging.getLogger(__name__)
 
+def _json_value(value: Any) -> Any:
+    return value.tolist() if isinstance(value, np.ndarray) else value
+
+def _json_curve_datasets(row: Tuple[Any, ...], metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The Force, Z and tip datasets of one exported curve."""
+    (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
+     tip_geometry, tip_radius, segment_type, deflection, z_sensor,
+     sampling_rate, velocity, no_points) = row
+
+    # Convert curve_id and segment_type to strings
+    curve_id_str = f"curve{curve_id}" if curve_id is not None else f"curve_{id(row)}"
+    segment_type = str(segment_type) if segment_type is not None else "unknown"
+    return [
+        # Deflection dataset
+        {
+            "alias": [f"{curve_id_str}/{segment_type}/Force"],
+            "value": deflection if deflection else [],
+            "attributes": [
+                {"name": "unit", "value": "N"},
+                {"name": "sampling_rate", "value": float(sampling_rate or 1e5)},
+                {"name": "velocity", "value": float(velocity or 1e-6)},
+                {"name": "no_points", "value": int(no_points or 0)}
+            ]
+        },
+        # Z sensor dataset
+        {
+            "alias": [f"{curve_id_str}/{segment_type}/Z"],
+            "value": z_sensor if z_sensor else [],
+            "attributes": [
+                {"name": "unit", "value": "m"}
+            ]
+        },
+        # Tip/metadata dataset
+        {
+            "alias": [f"{curve_id_str}/tip"],
+            "attributes": [
+                {"name": "file_id", "value": file_id or ""},
+                {"name": "date", "value": date or ""},
+                {"name": "instrument", "value": instrument or ""},
+                {"name": "sample", "value": sample or ""},
+                {"name": "spring_constant", "value": float(spring_constant or 0.1)},
+                {"name": "inv_ols", "value": float(inv_ols or 1.0)},
+                {"name": "tip_geometry", "value": tip_geometry or "unknown"},
+                {"name": "tip_radius", "value": float(tip_radius or 1e-6)}
+            ] + [{"name": key, "value": value} for key, value in metadata.items()]
+        },
+    ]
+
+def iter_json_export(
+    db_path: str,
+    curve_ids: Optional[List[int]] = None,
+    metadata: Dict[str, Any] = {}
+) -> Iterator[str]:
+    """
+    The JSON export as text chunks, one per curve, laid out exactly as
+    json.dump(..., indent=4) would write the whole {"datasets": {...}} document.
+    Nothing is yielded (ValueError) when there are no curves; the generator's
+    return value is the number of curves exported.
+    """
+    rows = iter_curve_rows(db_path, curve_ids)
+    first_row = next(rows)  # Raises before any output when there is nothing to export
+    yield '{\n    "datasets": {'
+    num_exported = 0
+    dataset_id = 0
+    for row in chain([first_row], rows):
+        entries = []
+        for dataset in _json_curve_datasets(row, metadata):
+            entry = json.dumps(dataset, indent=4, default=_json_value).replace("\n", "\n        ")
+            entries.append(f'{"," if dataset_id else ""}\n        "{dataset_id}": {entry}')
+            dataset_id += 1
+        yield "".join(entries)
+        num_exported += 1
+    yield "\n    }\n}"
+    return num_exported
+
 def export_from_duckdb_to_json(
     db_path: str,
     output_path: str,
@@ -317,88 +438,10 @@ def export_from_duckdb_to_json(
         Number of curves exported.
     """
     try:
-        # Connect to DuckDB
-        with duckdb.connect(db_path) as conn:
-            query = """
-                SELECT curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-                       tip_geometry, tip_radius, segment_type, force_values AS deflection,
-                       z_values AS z_sensor, sampling_rate, velocity, no_points
-                FROM force_vs_z
-            """
-            params = None
-            if curve_ids:
-                query += " WHERE curve_id IN ({})".format(",".join("?" for _ in curve_ids))
-                params = curve_ids
-            
-            results = conn.execute(query, params or []).fetchall()
-            if not results:
-                logger.error("No curves found in database")
-                raise ValueError("No curves found in database")
-
-        # Prepare JSON structure
-        json_data = {
-            "datasets": {}
-        }
-        num_exported = 0
-        dataset_id = 0
-
-        for row in results:
-            (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-             tip_geometry, tip_radius, segment_type, deflection, z_sensor,
-             sampling_rate, velocity, no_points) = row
-
-            # Convert curve_id and segment_type to strings
-            curve_id_str = f"curve{curve_id}" if curve_id is not None else f"curve_{id(row)}"
-            segment_type = str(segment_type) if segment_type is not None else "unknown"
-
-            # Add deflection dataset
-            json_data["datasets"][str(dataset_id)] = {
-                "alias": [f"{curve_id_str}/{segment_type}/Force"],
-                "value": deflection if deflection else [],
-                "attributes": [
-                    {"name": "unit", "value": "N"},
-                    {"name": "sampling_rate", "value": float(sampling_rate or 1e5)},
-                    {"name": "velocity", "value": float(velocity or 1e-6)},
-                    {"name": "no_points", "value": int(no_points or 0)}
-                ]
-            }
-            dataset_id += 1
-
-            # Add z_sensor dataset
-            json_data["datasets"][str(dataset_id)] = {
-                "alias": [f"{curve_id_str}/{segment_type}/Z"],
-                "value": z_sensor if z_sensor else [],
-                "attributes": [
-                    {"name": "unit", "value": "m"}
-                ]
-            }
-            dataset_id += 1
-
-            # Add tip/metadata dataset
-            json_data["datasets"][str(dataset_id)] = {
-                "alias": [f"{curve_id_str}/tip"],
-                "attributes": [
-                    {"name": "file_id", "value": file_id or ""},
-                    {"name": "date", "value": date or ""},
-                    {"name": "instrument", "value": instrument or ""},
-                    {"name": "sample", "value": sample or ""},
-                    {"name": "spring_constant", "value": float(spring_constant or 0.1)},
-                    {"name": "inv_ols", "value": float(inv_ols or 1.0)},
-                    {"name": "tip_geometry", "value": tip_geometry or "unknown"},
-                    {"name": "tip_radius", "value": float(tip_radius or 1e-6)}
-                ] + [{"name": key, "value": value} for key, value in metadata.items()]
-            }
-            dataset_id += 1
-
-            num_exported += 1
-
-        # Write to JSON file
-        with open(output_path, "w") as f:
-            json.dump(json_data, f, indent=4, default=lambda o: o.tolist() if isinstance(o, np.ndarray) else o)
-
+        num_exported = write_chunks(output_path, iter_json_export(db_path, curve_ids, metadata))
         logger.info(f"Exported {num_exported} curves from DuckDB to JSON file at {output_path}")
         return num_exported
 
     except Exception as e:
         logger.error(f"Failed to export to JSON file {output_path}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,213 @@
+# Incremental reader for the JSON curve layout ({"datasets": {id: {"alias", "value", "attributes"}}})
+import json
+import re
+import warnings
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import numpy as np
+
+# Characters read from the file per refill; values larger than this grow the buffer as needed
+JSON_READ_CHUNK = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NESTED = re.compile(r'[\[\{"]')
+# Characters that may follow a complete value; anything else means it was cut at the buffer edge
+_VALUE_END = frozenset(",:]} \t\n\r")
+
+# How a dataset's "value" array is materialized: as a float64 array, or only its length
+VALUE_ARRAY = "array"
+VALUE_SHAPE = "shape"
+
+
+class JSONStream:
+    """
+    Pull parser over a text file holding one JSON object. Only the text of the entry
+    being decoded is buffered, so memory follows the largest single dataset rather
+    than the whole document.
+    """
+
+    def __init__(self, f, chunk_size: int = JSON_READ_CHUNK):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, min_chars: int = 0) -> bool:
+        """Append at least one chunk (or min_chars) of text; False once the file is exhausted."""
+        if self._eof:
+            return False
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        text = self._f.read(max(self._chunk_size, min_chars))
+        if not text:
+            self._eof = True
+            return False
+        self._buf += text
+        return True
+
+    def _offset_error(self, message: str) -> ValueError:
+        return ValueError(f"{message} (near: {self._buf[self._pos:self._pos + 40]!r})")
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._offset_error(f"Expected '{char}'")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A number cut by the buffer edge ("0." + "0123") parses as its prefix, so a value
+            # only counts as complete once the character after it is whitespace or a delimiter
+            if end is not None and ((end < len(self._buf) and self._buf[end] in _VALUE_END) or self._eof):
+                self._pos = end
+                return value
+            if not self._fill(len(self._buf) - self._pos):
+                if end is not None:
+                    self._pos = end
+                    return value
+                raise self._offset_error("Invalid JSON value")
+
+    def _flat_array_body(self) -> Optional[str]:
+        """Text between '[' and ']' if the next value is an array without nested arrays, objects or strings."""
+        if self.peek() != "[":
+            return None
+        start = self._pos + 1
+        search = start
+        while True:
+            end = self._buf.find("]", search)
+            if end != -1:
+                break
+            search = len(self._buf)
+            if not self._fill(len(self._buf) - self._pos):
+                raise ValueError("Unexpected end of JSON document")
+            start, search = 1, search - (start - 1)
+        body = self._buf[start:end]
+        if _NESTED.search(body):
+            return None
+        self._pos = end + 1
+        return body
+
+    def number_array(self) -> Any:
+        """Next value; a flat numeric array is parsed straight into a float64 buffer."""
+        body = self._flat_array_body()
+        if body is None:
+            return self.decode()
+        if not body.strip():
+            return np.empty(0, dtype=np.float64)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                values = np.fromstring(body, dtype=np.float64, sep=",")
+            if len(values) == body.count(",") + 1:
+                return values
+        except (ValueError, DeprecationWarning):
+            pass
+        # Not plain numbers (e.g. true/null): rewind to the '[' and decode normally
+        self._pos -= len(body) + 2
+        return self.decode()
+
+    def array_length(self) -> Optional[int]:
+        """Skip the next value; return its length if it is an array, else None."""
+        body = self._flat_array_body()
+        if body is not None:
+            return body.count(",") + 1 if body.strip() else 0
+        value = self.decode()
+        return len(value) if isinstance(value, list) else None
+
+    def items(self) -> Iterator[str]:
+        """
+        Iterate the keys of the next object. After each key is yielded the caller must
+        consume its value (decode, number_array or array_length) before resuming.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            if not isinstance(key, str):
+                raise self._offset_error("Expected an object key")
+            self.expect(":")
+            yield key
+            separator = self.peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                self._pos -= 1
+                raise self._offset_error("Expected ',' or '}'")
+
+    def read_dataset(self, value_mode: Callable[[Dict[str, Any]], str]) -> Dict[str, Any]:
+        """
+        Read one dataset entry. value_mode sees the keys decoded so far (normally the
+        alias) and picks VALUE_ARRAY or VALUE_SHAPE for the "value" array; with
+        VALUE_SHAPE the entry gets "value_length" instead of "value".
+        """
+        if self.peek() != "{":
+            return {"raw": self.decode()}
+        dataset: Dict[str, Any] = {}
+        for key in self.items():
+            if key != "value":
+                dataset[key] = self.decode()
+            elif value_mode(dataset) == VALUE_ARRAY:
+                dataset["value"] = self.number_array()
+            else:
+                dataset["value_length"] = self.array_length()
+        return dataset
+
+
+def iter_json_datasets(
+    file_path: str,
+    value_mode: Callable[[Dict[str, Any]], str] = lambda dataset: VALUE_ARRAY,
+    top_level: Optional[Dict[str, Any]] = None,
+    chunk_size: int = JSON_READ_CHUNK,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (dataset_id, dataset) from the top-level "datasets" mapping one entry at a time.
+    Other top-level members are decoded into top_level when a dict is given.
+    """
+    found = False
+    with open(file_path, "r") as f:
+        stream = JSONStream(f, chunk_size)
+        for key in stream.items():
+            if key == "datasets":
+                found = True
+                for dataset_id in stream.items():
+                    yield dataset_id, stream.read_dataset(value_mode)
+            elif top_level is not None:
+                top_level[key] = stream.decode()
+            else:
+                stream.decode()
+    if not found:
+        raise ValueError("JSON file must contain a 'datasets' key")
+
+
+def read_json_member(file_path: str, name: str) -> Any:
+    """Value of a top-level member other than "datasets", or None; stops reading once found."""
+    with open(file_path, "r") as f:
+        stream = JSONStream(f)
+        for key in stream.items():
+            if key == name:
+                return stream.decode()
+            if key == "datasets":
+                for _ in stream.items():
+                    stream.read_dataset(lambda dataset: VALUE_SHAPE)
+            else:
+                stream.decode()
+    return None
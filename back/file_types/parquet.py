@@ -0,0 +1,392 @@
+# Columnar curve files (Parquet, Arrow IPC): one row per curve segment, curve values as list columns
+import os
+import json
+import logging
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import duckdb
+import numpy as np
+from models.force_curve import ForceCurve, Segment
+from transform.transform import BASELINE_POINTS
+
+logger = logging.getLogger(__name__)
+
+# What an export holds: raw curves (with any pipeline outputs stored alongside them)
+# or the persisted fit results of the active dataset
+EXPORT_CONTENTS = ("curves", "results")
+PARQUET_COMPRESSIONS = ("zstd", "snappy", "gzip", "uncompressed")
+
+# Record batches streamed from DuckDB into an Arrow IPC file
+ARROW_BATCH_ROWS = 8192
+
+# Per-curve metadata picked up from same-named columns, with the defaults used at ingest.
+# Metadata given with the request overrides both.
+CURVE_METADATA_DEFAULTS = {
+    "file_id": "file_0",
+    "date": "2025-05-20",
+    "instrument": "unknown",
+    "sample": "unknown",
+    "spring_constant": 0.1,
+    "inv_ols": 22e-9,
+    "tip_geometry": "pyramid",
+    "tip_radius": 1e-6,
+    "tip_angle": 30.0,
+    "sampling_rate": 1e5,
+    "velocity": 1e-6,
+}
+_NUMERIC_METADATA = ("spring_constant", "inv_ols", "tip_radius", "tip_angle", "sampling_rate", "velocity")
+
+# DuckDB integer types a curve_id column read in place may have
+_INTEGER_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT")
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def _quote_literal(value: Any) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _relation_columns(conn: duckdb.DuckDBPyConnection, relation: str) -> Dict[str, str]:
+    return {row[0]: row[1] for row in conn.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()}
+
+def _check_curve_columns(columns: Dict[str, str], force_path: str, z_path: str) -> None:
+    for path in (force_path, z_path):
+        if path not in columns:
+            raise ValueError(f"Column not found: '{path}' is not in {list(columns)}")
+        if not columns[path].endswith("[]"):
+            raise ValueError(f"Column '{path}' must be a list column, got {columns[path]}")
+
+def _columnar_structure(conn: duckdb.DuckDBPyConnection, relation: str) -> Dict[str, Any]:
+    columns = _relation_columns(conn, relation)
+    return {
+        "columns": [{"name": name, "type": column_type} for name, column_type in columns.items()],
+        # Candidates for force_path / z_path
+        "list_columns": [name for name, column_type in columns.items() if column_type.endswith("[]")],
+        "num_rows": conn.execute(f"SELECT COUNT(*) FROM {relation}").fetchone()[0],
+    }
+
+
+# ---------- Reading ----------
+
+def _parquet_relation(file_path: str) -> str:
+    return f"read_parquet({_quote_literal(file_path)})"
+
+def get_parquet_structure(file_path: str) -> Dict[str, Any]:
+    """List columns, row count and key/value metadata of a Parquet file; reads only its footer."""
+    if not os.path.exists(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    with duckdb.connect() as conn:
+        structure = _columnar_structure(conn, _parquet_relation(file_path))
+        structure["metadata"] = {
+            key.decode("utf-8", "replace"): value.decode("utf-8", "replace")
+            for _, key, value in conn.execute("SELECT * FROM parquet_kv_metadata(?)", [file_path]).fetchall()
+        }
+    return structure
+
+def _build_columnar_curve(row_metadata: Dict[str, Any], metadata: Dict[str, Any], segments: List[Segment]) -> ForceCurve:
+    combined_metadata = {**CURVE_METADATA_DEFAULTS, **row_metadata, **metadata}
+    return ForceCurve(
+        file_id=str(combined_metadata["file_id"]),
+        date=str(combined_metadata["date"]),
+        instrument=str(combined_metadata["instrument"]),
+        sample=str(combined_metadata["sample"]),
+        spring_constant=float(combined_metadata["spring_constant"]),
+        inv_ols=float(combined_metadata["inv_ols"]),
+        tip_geometry=str(combined_metadata["tip_geometry"]),
+        tip_radius=float(combined_metadata["tip_radius"]),
+        segments=segments,
+    )
+
+def _curve_values(value: Any) -> Optional[np.ndarray]:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.ma.MaskedArray):
+        return value.astype(np.float64).filled(np.nan)
+    return np.asarray(value, dtype=np.float64)
+
+def _iter_columnar_curves(conn: duckdb.DuckDBPyConnection, relation: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+    """
+    Yield (curve_name, ForceCurve) from a relation with one row per segment. Rows
+    sharing a curve_id column value (consecutive) become segments of one curve;
+    without that column every row is a curve. Fetched in DuckDB vector chunks, so
+    memory follows the chunk rather than the file.
+    """
+    columns = _relation_columns(conn, relation)
+    _check_curve_columns(columns, force_path, z_path)
+    metadata_columns = [name for name in CURVE_METADATA_DEFAULTS if name in columns]
+    select = [f"{_quote_identifier(force_path)} AS _force", f"{_quote_identifier(z_path)} AS _z"]
+    select += [_quote_identifier(name) for name in metadata_columns]
+    has_curve_id = "curve_id" in columns
+    has_segment_type = "segment_type" in columns
+    if has_curve_id:
+        select.append("curve_id")
+    if has_segment_type:
+        select.append("segment_type")
+    result = conn.execute(f"SELECT {', '.join(select)} FROM {relation}")
+
+    curve_idx = 0
+    pending_key, pending_metadata, pending_segments = None, None, []
+    row_number = 0
+    while True:
+        chunk = result.fetch_df_chunk(1)
+        if chunk.empty:
+            break
+        for row in chunk.to_dict("records"):
+            key = row["curve_id"] if has_curve_id else row_number
+            row_number += 1
+            deflection, z_sensor = _curve_values(row["_force"]), _curve_values(row["_z"])
+            if deflection is None or z_sensor is None or min(len(deflection), len(z_sensor)) == 0:
+                logger.warning(f"Skipping row {row_number - 1}: Empty Force or Z data")
+                continue
+            min_length = min(len(deflection), len(z_sensor))
+            deflection, z_sensor = deflection[:min_length], z_sensor[:min_length]
+            if not (np.isfinite(deflection).all() and np.isfinite(z_sensor).all()):
+                logger.warning(f"Skipping row {row_number - 1}: Invalid data (non-finite values)")
+                continue
+            # Per-row metadata columns (NULL / NaN cells fall back to the defaults)
+            row_metadata = {name: row[name] for name in metadata_columns if row[name] is not None and row[name] == row[name]}
+            segment_metadata = {**CURVE_METADATA_DEFAULTS, **row_metadata, **metadata}
+            segment = Segment(
+                type=str(row["segment_type"]) if has_segment_type and row["segment_type"] else "approach",
+                deflection=deflection,
+                z_sensor=z_sensor,
+                sampling_rate=float(segment_metadata["sampling_rate"]),
+                velocity=float(segment_metadata["velocity"]),
+                no_points=min_length,
+            )
+            if pending_segments and key == pending_key:
+                pending_segments.append(segment)
+                continue
+            if pending_segments:
+                yield f"curve{curve_idx}", _build_columnar_curve(pending_metadata, metadata, pending_segments)
+                curve_idx += 1
+            pending_key, pending_metadata, pending_segments = key, row_metadata, [segment]
+    if pending_segments:
+        yield f"curve{curve_idx}", _build_columnar_curve(pending_metadata, metadata, pending_segments)
+
+def iter_parquet_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+    """Yield (curve_name, ForceCurve) for each curve in a Parquet file; force_path / z_path name list columns."""
+    if not os.path.exists(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    with duckdb.connect() as conn:
+        yield from _iter_columnar_curves(conn, _parquet_relation(file_path), force_path, z_path, metadata)
+
+def process_parquet(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    curves = dict(iter_parquet_curves(file_path, force_path, z_path, metadata))
+    if not curves:
+        raise ValueError("No valid Force and Z data in Parquet file")
+    return curves
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ValueError("Arrow IPC files require pyarrow to be installed")
+    return pa
+
+def _read_arrow_table(file_path: str):
+    """Arrow IPC file (or stream) as a table backed by a memory map of the file."""
+    if not os.path.exists(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    pa = _import_pyarrow()
+    source = pa.memory_map(file_path, "r")
+    try:
+        return pa.ipc.open_file(source).read_all()
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source).read_all()
+
+def get_arrow_structure(file_path: str) -> Dict[str, Any]:
+    """List columns, row count and schema metadata of an Arrow IPC file."""
+    arrow_table = _read_arrow_table(file_path)
+    with duckdb.connect() as conn:
+        conn.register("_arrow_source", arrow_table)
+        structure = _columnar_structure(conn, "_arrow_source")
+    structure["metadata"] = {
+        key.decode("utf-8", "replace"): value.decode("utf-8", "replace")
+        for key, value in (arrow_table.schema.metadata or {}).items()
+    }
+    return structure
+
+def iter_arrow_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+    """Yield (curve_name, ForceCurve) for each curve in an Arrow IPC file; force_path / z_path name list columns."""
+    arrow_table = _read_arrow_table(file_path)
+    with duckdb.connect() as conn:
+        conn.register("_arrow_source", arrow_table)
+        yield from _iter_columnar_curves(conn, "_arrow_source", force_path, z_path, metadata)
+
+def process_arrow(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    curves = dict(iter_arrow_curves(file_path, force_path, z_path, metadata))
+    if not curves:
+        raise ValueError("No valid Force and Z data in Arrow file")
+    return curves
+
+
+# ---------- Zero-ingest view ----------
+
+def count_lazy_parquet_curves(file_path: str, force_path: str, z_path: str) -> int:
+    """
+    Number of curves in a Parquet file to be read in place. The view of
+    lazy_parquet_columns numbers and filters curves in SQL, so files it would
+    present differently from an ingest are rejected with a ValueError: rows with
+    empty or non-finite Force / Z values (an ingest skips them), and a curve_id
+    column that is not the integers 0..N-1 in file order (an ingest renumbers).
+    Reads the whole file once.
+    """
+    relation = f"read_parquet({_quote_literal(os.path.abspath(file_path))}, file_row_number = true)"
+    with duckdb.connect() as conn:
+        columns = _relation_columns(conn, _parquet_relation(file_path))
+        _check_curve_columns(columns, force_path, z_path)
+        has_curve_id = "curve_id" in columns
+        if has_curve_id and columns["curve_id"] not in _INTEGER_TYPES:
+            raise ValueError(f"A Parquet file read in place needs an integer curve_id column, got {columns['curve_id']}; ingest it instead")
+        force, z = _quote_identifier(force_path), _quote_identifier(z_path)
+        length = f"least(len({force}), len({z}))"
+        finite = "coalesce(list_bool_and(list_transform({}[1:{}], x -> coalesce(isfinite(CAST(x AS DOUBLE)), false))), false)"
+        key = "curve_id" if has_curve_id else "file_row_number"
+        curve_count, invalid, misnumbered = conn.execute(f"""
+            SELECT coalesce(MAX(_index) + 1, 0), COUNT(*) FILTER (WHERE NOT valid), COUNT(*) FILTER (WHERE _key IS DISTINCT FROM _index)
+            FROM (
+                SELECT valid, _key, SUM(CAST(_key IS DISTINCT FROM _previous AS INTEGER)) OVER (ORDER BY file_row_number) - 1 AS _index
+                FROM (
+                    SELECT file_row_number, {key} AS _key, LAG({key}) OVER (ORDER BY file_row_number) AS _previous,
+                           coalesce({length} > 0, false) AND {finite.format(force, length)} AND {finite.format(z, length)} AS valid
+                    FROM {relation}
+                )
+            )
+        """).fetchone()
+        if invalid:
+            raise ValueError(f"{invalid} row(s) of the Parquet file have empty or non-finite Force / Z values and cannot be read in place; ingest it instead")
+        if misnumbered:
+            raise ValueError("The Parquet file's curve_id column is not numbered 0..N-1 in file order and cannot be read in place; ingest it instead")
+    return curve_count
+
+def lazy_parquet_columns(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Tuple[str, Dict[str, str]]:
+    """
+    (FROM clause, column -> SQL expression) presenting a Parquet file as force_vs_z
+    rows, read in place. Values are trimmed to the shorter of force/z and
+    baseline-corrected as transform_data does at ingest. curve_id is the file's
+    curve_id column, else the row number, so filters on it are pushed down into
+    the Parquet scan; count_lazy_parquet_curves admits only files for which that
+    gives the curves an ingest would store.
+    """
+    with duckdb.connect() as conn:
+        columns = _relation_columns(conn, _parquet_relation(file_path))
+    _check_curve_columns(columns, force_path, z_path)
+    force, z = _quote_identifier(force_path), _quote_identifier(z_path)
+    length = f"least(len({force}), len({z}))"
+    source = f"""(
+        SELECT *, list_avg(_force[1:{BASELINE_POINTS}]) AS _baseline FROM (
+            SELECT *,
+                   CAST({force}[1:{length}] AS DOUBLE[]) AS _force,
+                   CAST({z}[1:{length}] AS DOUBLE[]) AS _z
+            FROM read_parquet({_quote_literal(os.path.abspath(file_path))}, file_row_number = true)
+        ) WHERE len(_force) > 0
+    )"""
+    expressions = {
+        "curve_id": "CAST(curve_id AS INTEGER)" if "curve_id" in columns else "CAST(file_row_number AS INTEGER)",
+        "segment_type": "CAST(segment_type AS TEXT)" if "segment_type" in columns else "'approach'",
+        "force_values": "list_transform(_force, lambda x: x - _baseline)",
+        "z_values": "_z",
+        "no_points": "CAST(len(_force) AS INTEGER)",
+    }
+    for name, default in CURVE_METADATA_DEFAULTS.items():
+        column_type = "DOUBLE" if name in _NUMERIC_METADATA else "TEXT"
+        if metadata.get(name) is not None:
+            value = float(metadata[name]) if name in _NUMERIC_METADATA else metadata[name]
+            expressions[name] = f"CAST({_quote_literal(value)} AS {column_type})"
+        elif name in columns:
+            expressions[name] = f"COALESCE(CAST({_quote_identifier(name)} AS {column_type}), CAST({_quote_literal(default)} AS {column_type}))"
+        else:
+            expressions[name] = f"CAST({_quote_literal(default)} AS {column_type})"
+    return source, expressions
+
+
+# ---------- Export ----------
+
+def _export_query(conn: duckdb.DuckDBPyConnection, content: str, curve_ids: Optional[List[int]]) -> str:
+    if content not in EXPORT_CONTENTS:
+        raise ValueError(f"content must be one of: {', '.join(EXPORT_CONTENTS)}")
+    where = ""
+    if curve_ids:
+        where = " AND curve_id IN ({})".format(",".join(str(int(curve_id)) for curve_id in curve_ids))
+    if content == "curves":
+        return f"SELECT * FROM force_vs_z WHERE TRUE{where} ORDER BY curve_id, segment_type"
+    row = conn.execute("SELECT fingerprint FROM dataset_info LIMIT 1").fetchone()
+    if row is None:
+        raise ValueError("No dataset loaded")
+    return f"""
+        SELECT curve_id, stage, model_name, stage_hash, e_modulus, params
+        FROM curve_results
+        WHERE dataset_fp = {_quote_literal(row[0])}{where}
+        ORDER BY curve_id, stage
+    """
+
+def _curve_scope(conn: duckdb.DuckDBPyConnection, content: str, curve_ids: Optional[List[int]]):
+    from storage.lazy_source import lazy_curve_scope  # Deferred: storage.lazy_source imports file_types
+    return lazy_curve_scope(conn, curve_ids or None) if content == "curves" else nullcontext()
+
+def export_from_duckdb_to_parquet(
+    db_path: str,
+    output_path: str,
+    curve_ids: Optional[List[int]] = None,
+    content: str = "curves",
+    compression: str = "zstd",
+    metadata: Dict[str, Any] = {}
+) -> int:
+    """
+    Export curves or fit results to a Parquet file with DuckDB's COPY: columnar, list
+    columns kept as lists, and no per-row Python work. The content kind and the
+    request metadata are stored as key/value metadata. Returns the number of rows written.
+    """
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"compression must be one of: {', '.join(PARQUET_COMPRESSIONS)}")
+    try:
+        with duckdb.connect(db_path) as conn, _curve_scope(conn, content, curve_ids):
+            query = _export_query(conn, content, curve_ids)
+            kv_metadata = f"{{content: {_quote_literal(content)}, metadata: {_quote_literal(json.dumps(metadata or {}, default=str))}}}"
+            rows = conn.execute(f"""
+                COPY ({query}) TO {_quote_literal(output_path)}
+                (FORMAT PARQUET, COMPRESSION {compression.upper()}, KV_METADATA {kv_metadata})
+            """).fetchone()[0]
+        if not rows:
+            os.remove(output_path)
+            logger.error("No curves found in database")
+            raise ValueError("No curves found in database" if content == "curves" else "No fit results found for the active dataset")
+        logger.info(f"Exported {rows} {content} rows to Parquet file at {output_path}")
+        return rows
+    except Exception as e:
+        logger.error(f"Failed to export to Parquet file {output_path}: {str(e)}")
+        raise
+
+def export_from_duckdb_to_arrow(
+    db_path: str,
+    output_path: str,
+    curve_ids: Optional[List[int]] = None,
+    content: str = "curves",
+    metadata: Dict[str, Any] = {}
+) -> int:
+    """
+    Export curves or fit results to an Arrow IPC file, streaming DuckDB's record
+    batches straight into the writer. Returns the number of rows written.
+    """
+    pa = _import_pyarrow()
+    try:
+        rows = 0
+        with duckdb.connect(db_path) as conn, _curve_scope(conn, content, curve_ids):
+            reader = conn.execute(_export_query(conn, content, curve_ids)).fetch_record_batch(ARROW_BATCH_ROWS)
+            schema = reader.schema.with_metadata({"content": content, "metadata": json.dumps(metadata or {}, default=str)})
+            with pa.OSFile(output_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        if not rows:
+            os.remove(output_path)
+            logger.error("No curves found in database")
+            raise ValueError("No curves found in database" if content == "curves" else "No fit results found for the active dataset")
+        logger.info(f"Exported {rows} {content} rows to Arrow IPC file at {output_path}")
+        return rows
+    except Exception as e:
+        logger.error(f"Failed to export to Arrow IPC file {output_path}: {str(e)}")
+        raise
@@ -1,100 +1,61 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from itertools import chain
 import logging
 import duckdb
 import numpy as np
 from models.force_curve import ForceCurve, Segment
+from file_types.delimited import DEFAULT_CHUNK_ROWS, iter_delimited_curves
+from file_types.export_stream import iter_curve_rows, write_chunks
 
 
 logger = logging.getLogger(__name__)
 
+def _split_txt_line(text: str) -> List[str]:
+    return [col.strip() for col in text.split("\t") if col.strip()]
+
+def _split_txt_header(text: str) -> List[str]:
+    return _split_txt_line(text.lstrip("#"))
+
+def _parse_txt_metadata(text: str) -> Optional[Tuple[str, str]]:
+    # "# Key: Value" lines; a "#" line without ":" is the header
+    key_value = text[1:].split(":", 1)
+    if len(key_value) == 2:
+        return key_value[0].strip(), key_value[1].strip()
+    return None
+
+def _is_txt_annotation(text: str) -> bool:
+    return text.startswith("#")
+
 def get_txt_structure(file_path: str) -> Dict[str, Any]:
         # Parse metadata (lines starting with # Key: Value) and include headers as first in sample_rows
         structure = {"metadata": {}, "sample_rows": []}
-        with open(file_path, "r") as f:
-            lines = f.readlines()
         data_started = False
         headers_added = False
-        for line in lines:
-            line_strip = line.strip()
-            if line_strip.startswith("#"):
-                if ":" in line_strip:
-                    # Metadata
-                    key_value = line_strip[1:].split(":", 1)
-                    if len(key_value) == 2:
-                        key, value = key_value[0].strip(), key_value[1].strip()
-                        structure["metadata"][key] = value
-                elif not headers_added:
-                    # Headers line starting with # but no :
-                    headers_raw = line_strip[1:].strip().split("\t")
-                    headers = [col.strip() for col in headers_raw if col.strip()]
-                    if headers:
-                        structure["sample_rows"].append(headers)
-                        headers_added = True
-                        data_started = True
-            elif data_started and line_strip:
-                # Data rows
-                row_raw = line_strip.split("\t")
-                row = [col.strip() for col in row_raw if col.strip()]
-                if len(structure["sample_rows"]) < 6:  # 1 header + 5 data
-                    structure["sample_rows"].append(row)
-                else:
-                    break
+        with open(file_path, "r") as f:
+            for line in f:
+                line_strip = line.strip()
+                if line_strip.startswith("#"):
+                    if ":" in line_strip:
+                        # Metadata
+                        entry = _parse_txt_metadata(line_strip)
+                        if entry:
+                            structure["metadata"][entry[0]] = entry[1]
+                    elif not headers_added:
+                        # Headers line starting with # but no :
+                        headers = _split_txt_header(line_strip)
+                        if headers:
+                            structure["sample_rows"].append(headers)
+                            headers_added = True
+                            data_started = True
+                elif data_started and line_strip:
+                    # Data rows
+                    if len(structure["sample_rows"]) < 6:  # 1 header + 5 data
+                        structure["sample_rows"].append(_split_txt_line(line_strip))
+                    else:
+                        break
         return structure
 
-def process_txt(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
-    # Parse the TXT: metadata first (# lines), then header, then data
-    file_metadata = {}
-    deflection = []
-    z_sensor = []
-    force_col_idx = None
-    z_col_idx = None
-
-    with open(file_path, "r") as f:
-        lines = f.readlines()
-
-    data_started = False
-    headers_found = False
-    for line in lines:
-        line_strip = line.strip()
-        if not headers_found:
-            if line_strip.startswith("#"):
-                if ":" in line_strip:
-                    # Metadata
-                    key_value = line_strip[1:].split(":", 1)
-                    if len(key_value) == 2:
-                        key, value = key_value[0].strip(), key_value[1].strip()
-                        file_metadata[key] = value
-                else:
-                    # Headers
-                    headers_raw = line_strip[1:].strip().split("\t")
-                    headers = [col.strip() for col in headers_raw if col.strip()]
-                    if headers:
-                        try:
-                            force_col_idx = headers.index(force_path)
-                            z_col_idx = headers.index(z_path)
-                        except ValueError as e:
-                            raise ValueError(f"Column not found: {e}")
-                        headers_found = True
-                        data_started = True
-                        continue
-        elif data_started and line_strip:
-            # Data rows
-            columns_raw = line_strip.split("\t")
-            columns = [col.strip() for col in columns_raw if col.strip()]
-            if len(columns) > max(force_col_idx, z_col_idx):
-                try:
-                    deflection.append(float(columns[force_col_idx]))
-                    z_sensor.append(float(columns[z_col_idx]))
-                except ValueError:
-                    continue  # Skip invalid rows
-
-    deflection = np.array(deflection)
-    z_sensor = np.array(z_sensor)
-    min_length = min(len(deflection), len(z_sensor))
-
-    if min_length == 0:
-        raise ValueError("No valid data in TXT")
-
+def _build_txt_curve(file_metadata: Dict[str, str], metadata: Dict[str, Any], deflection: np.ndarray, z_sensor: np.ndarray) -> ForceCurve:
     # Merge file_metadata with provided metadata (provided overrides file)
     combined_metadata = {**file_metadata, **metadata}
 
@@ -105,16 +66,15 @@ def process_txt(file_path: str, force_path: str, z_path: str, metadata: Dict[str
     segments = [
         Segment(
             type=combined_metadata.get("Geometry", "approach"),
-            deflection=deflection[:min_length],
-            z_sensor=z_sensor[:min_length],
+            deflection=deflection,
+            z_sensor=z_sensor,
             sampling_rate=sampling_rate,
             velocity=velocity,
-            no_points=min_length
+            no_points=len(deflection)
         )
     ]
 
-    curves = {}
-    curves["curve0"] = ForceCurve(
+    return ForceCurve(
         file_id=combined_metadata.get("File Id", "file_0"),
         date=combined_metadata.get("Date", "2025-05-20"),
         instrument=combined_metadata.get("Instrument", "unknown"),
@@ -126,9 +86,78 @@ def process_txt(file_path: str, force_path: str, z_path: str, metadata: Dict[str
         segments=segments
     )
 
+def iter_txt_curves(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[str, ForceCurve]]:
+    """
+    Yield (curve_name, ForceCurve) for each curve in the TXT: one per "#" metadata/header/data
+    block, and one per force/z column pair when the header repeats the selected columns.
+    """
+    curves = iter_delimited_curves(
+        file_path, force_path, z_path,
+        delimiter=None,
+        split_line=_split_txt_line,
+        split_header=_split_txt_header,
+        parse_metadata=_parse_txt_metadata,
+        is_annotation=_is_txt_annotation,
+        chunk_rows=chunk_rows,
+    )
+    for curve_idx, (file_metadata, deflection, z_sensor) in enumerate(curves):
+        yield f"curve{curve_idx}", _build_txt_curve(file_metadata, metadata, deflection, z_sensor)
+
+def process_txt(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
+    curves = dict(iter_txt_curves(file_path, force_path, z_path, metadata))
+    if not curves:
+        raise ValueError("No valid data in TXT")
     return curves
 
 
+def _txt_curve(row: Tuple[Any, ...]) -> str:
+    """One exported curve: "# key: value" metadata lines, the header and tab-separated samples."""
+    (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
+     tip_geometry, tip_radius, segment_type, deflection, z_sensor,
+     sampling_rate, velocity, no_points) = row
+
+    # Row-specific metadata and headers
+    lines = [
+        f"# curve_id: {curve_id}\n",
+        f"# file_id: {file_id}\n",
+        f"# date: {date}\n",
+        f"# instrument: {instrument}\n",
+        f"# sample: {sample}\n",
+        f"# spring_constant: {spring_constant}\n",
+        f"# inv_ols: {inv_ols}\n",
+        f"# tip_geometry: {tip_geometry}\n",
+        f"# tip_radius: {tip_radius}\n",
+        f"# segment_type: {segment_type}\n",
+        f"# sampling_rate: {sampling_rate}\n",
+        f"# velocity: {velocity}\n",
+        f"# no_points: {no_points}\n",
+        "# Index\tZ (m)\tForce (N)\n",
+    ]
+    # Data
+    deflection = deflection or []
+    z_sensor = z_sensor or []
+    lines += [f"{i}\t{z}\t{d}\n" for i, (z, d) in enumerate(zip(z_sensor, deflection))]
+    return "".join(lines)
+
+def iter_txt_export(
+    db_path: str,
+    curve_ids: Optional[List[int]] = None,
+    metadata: Dict[str, Any] = {}
+) -> Iterator[str]:
+    """
+    The TXT export as text chunks: the global metadata first, then one chunk per
+    curve. Nothing is yielded (ValueError) when there are no curves; the
+    generator's return value is the number of curves exported.
+    """
+    rows = iter_curve_rows(db_path, curve_ids)
+    first_row = next(rows)  # Raises before any output when there is nothing to export
+    yield "".join(f"# {key}: {value}\n" for key, value in metadata.items())
+    num_exported = 0
+    for row in chain([first_row], rows):
+        yield _txt_curve(row)
+        num_exported += 1
+    return num_exported
+
 def export_from_duckdb_to_txt(
     db_path: str,
     output_path: str,
@@ -148,63 +177,7 @@ def export_from_duckdb_to_txt(
         Number of curves exported.
     """
     try:
-        # Connect to DuckDB
-        with duckdb.connect(db_path) as conn:
-            query = """
-                SELECT curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-                       tip_geometry, tip_radius, segment_type, force_values AS deflection,
-                       z_values AS z_sensor, sampling_rate, velocity, no_points
-                FROM force_vs_z
-            """
-            params = None
-            if curve_ids:
-                query += " WHERE curve_id IN ({})".format(",".join("?" for _ in curve_ids))
-                params = curve_ids
-            
-            results = conn.execute(query, params or []).fetchall()
-            if not results:
-                logger.error("No curves found in database")
-                raise ValueError("No curves found in database")
-
-        # Write to TXT file
-        with open(output_path, "w") as f:
-            # Write global metadata
-            for key, value in metadata.items():
-                f.write(f"# {key}: {value}\n")
-            
-            num_exported = 0
-            for row in results:
-                (curve_id, file_id, date, instrument, sample, spring_constant, inv_ols,
-                 tip_geometry, tip_radius, segment_type, deflection, z_sensor,
-                 sampling_rate, velocity, no_points) = row
-                
-                # Write row-specific metadata
-                f.write(f"# curve_id: {curve_id}\n")
-                f.write(f"# file_id: {file_id}\n")
-                f.write(f"# date: {date}\n")
-                f.write(f"# instrument: {instrument}\n")
-                f.write(f"# sample: {sample}\n")
-                f.write(f"# spring_constant: {spring_constant}\n")
-                f.write(f"# inv_ols: {inv_ols}\n")
-                f.write(f"# tip_geometry: {tip_geometry}\n")
-                f.write(f"# tip_radius: {tip_radius}\n")
-                f.write(f"# segment_type: {segment_type}\n")
-                f.write(f"# sampling_rate: {sampling_rate}\n")
-                f.write(f"# velocity: {velocity}\n")
-                f.write(f"# no_points: {no_points}\n")
-                
-                # Write headers
-                f.write("# Index\tZ (m)\tForce (N)\n")
-                
-                # Write data
-                deflection_arr = np.array(deflection) if deflection else np.array([])
-                z_sensor_arr = np.array(z_sensor) if z_sensor else np.array([])
-                min_length = min(len(deflection_arr), len(z_sensor_arr))
-                for i in range(min_length):
-                    f.write(f"{i}\t{z_sensor_arr[i]}\t{deflection_arr[i]}\n")
-                
-                num_exported += 1
-
+        num_exported = write_chunks(output_path, iter_txt_export(db_path, curve_ids, metadata))
         logger.info(f"Exported {num_exported} curves from DuckDB to TXT file at {output_path}")
         return num_exported
 
@@ -2,6 +2,7 @@ import json
 from typing import Dict
 import duckdb
 import numpy as np
+from metrics import instrument_udf, record_udf_error
 
 CONTACT_POINT_REGISTRY: Dict[str, Dict] = {}
 
@@ -91,6 +92,7 @@ def create_contact_point_udf(filter_name: str, conn: duckdb.DuckDBPyConnection):
             return result
         except Exception as e:
             print(f"❌ Error in UDF for {filter_name}: {e}")
+            record_udf_error(udf_name, "cp")
             import traceback
             traceback.print_exc()
             return None
@@ -101,7 +103,7 @@ def create_contact_point_udf(filter_name: str, conn: duckdb.DuckDBPyConnection):
     try:
         conn.create_function(
             udf_name,
-            udf_wrapper,
+            instrument_udf(udf_wrapper, udf_name, "cp"),
             udf_param_types,
             return_type=return_type,
             null_handling="SPECIAL"  # All contact point filters can return None
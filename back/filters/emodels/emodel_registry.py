@@ -3,6 +3,7 @@ from typing import Dict
 import json
 from pathlib import Path
 import numpy as np
+from metrics import instrument_udf, record_udf_error
 
 EMODEL_REGISTRY: Dict[str, Dict] = {}
 
@@ -101,6 +102,7 @@ def create_emodel_udf(emodel_name: str, conn: duckdb.DuckDBPyConnection):
             return result if result is not None else None
         except Exception as e:
             print(f"Error in UDF for {emodel_name}: {e}")
+            record_udf_error(udf_name, "emodel")
             return None
 
     return_type = duckdb.list_type(duckdb.list_type('DOUBLE'))
@@ -116,7 +118,7 @@ def create_emodel_udf(emodel_name: str, conn: duckdb.DuckDBPyConnection):
     try:
         conn.create_function(
             udf_name,
-            udf_wrapper,
+            instrument_udf(udf_wrapper, udf_name, "emodel"),
             udf_param_types,
             return_type=return_type,
             null_handling='SPECIAL'
@@ -3,6 +3,7 @@ from typing import Dict
 import duckdb
 import numpy as np
 import json
+from metrics import instrument_udf, record_udf_error
 
 FILTER_REGISTRY: Dict[str, Dict] = {}
 
@@ -51,6 +52,7 @@ def create_udf(filter_name: str, conn: duckdb.DuckDBPyConnection):
             return result if result is not None else None
         except Exception as e:
             print(f"Error in UDF for {filter_name}: {e}")
+            record_udf_error(udf_name, "regular_filter")
             return None
 
     # Consistent return type: DOUBLE[]
@@ -59,7 +61,7 @@ def create_udf(filter_name: str, conn: duckdb.DuckDBPyConnection):
     try:
         conn.create_function(
             udf_name,
-            udf_wrapper,
+            instrument_udf(udf_wrapper, udf_name, "regular_filter"),
             udf_param_types,
             return_type=return_type,
             null_handling='SPECIAL'
@@ -3,6 +3,7 @@ import duckdb
 from typing import Dict
 import json
 import numpy as np
+from metrics import instrument_udf, record_udf_error
 
 FMODEL_REGISTRY: Dict[str, Dict] = {}
 
@@ -100,13 +101,14 @@ def create_fmodel_udf(fmodel_name: str, conn: duckdb.DuckDBPyConnection):
 
         except Exception as e:
             print(f"Error in UDF for {fmodel_name}: {e}")
+            record_udf_error(udf_name, "fmodel")
             return None
 
     return_type = duckdb.list_type(duckdb.list_type('DOUBLE'))
     try:
         conn.create_function(
             udf_name,
-            udf_wrapper,
+            instrument_udf(udf_wrapper, udf_name, "fmodel"),
             udf_param_types,
             return_type=return_type,
             null_handling='SPECIAL'
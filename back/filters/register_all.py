@@ -12,6 +12,7 @@ from filters.emodels.emodel_registry import register_emodel, create_emodel_udf,
 
 from pathlib import Path
 from filters.load_classes import load_filter_classes
+from metrics import instrument_udf
 
 
 def register_filters(conn):
@@ -103,7 +104,7 @@ def register_filters(conn):
     try:
         conn.create_function(
             "calc_indentation",
-            calc_indentation,
+            instrument_udf(calc_indentation, "calc_indentation", "indentation"),
             [
                 duckdb.list_type('DOUBLE'),                # z_values: DOUBLE[]
                 duckdb.list_type('DOUBLE'),                # force_values: DOUBLE[]
@@ -124,7 +125,7 @@ def register_filters(conn):
     try:
         conn.create_function(
             "calc_elspectra",
-            calc_elspectra,
+            instrument_udf(calc_elspectra, "calc_elspectra", "elspectra"),
             [
                 duckdb.list_type('DOUBLE'),    # z_values: DOUBLE[]
                 duckdb.list_type('DOUBLE'),    # force_values: DOUBLE[]
@@ -0,0 +1 @@
+from .manager import JobManager, job_manager, ensure_job_tables, JOB_KINDS, TERMINAL_STATUSES
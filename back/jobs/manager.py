@@ -0,0 +1,399 @@
+# Runs whole-dataset fit computations in the background with per-batch checkpoints in DuckDB
+import asyncio
+import json
+import logging
+import math
+import threading
+from typing import Dict, Any, List, Optional
+
+import duckdb
+
+from db import (
+    fetch_curves_batch, ensure_cache_tables, get_metadata_for_curves, get_dataset_fingerprint,
+    fmodel_stage_hash, emodel_stage_hash, split_cached_curves, load_curve_results, save_curve_results,
+    make_fparam_entry, make_elasticity_entry, _json_hash, DB_PATH,
+)
+from filters.register_all import register_filters
+from metrics import family, register_collector
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("fparams", "elasticity")
+ACTIVE_STATUSES = ("queued", "running")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+DEFAULT_BATCH_SIZE = 50
+
+
+def ensure_job_tables(conn: duckdb.DuckDBPyConnection) -> None:
+    """Create the jobs table and its per-batch checkpoint table if they don't exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id VARCHAR PRIMARY KEY,
+            kind VARCHAR,
+            status VARCHAR,
+            dataset_fp VARCHAR,
+            stage_hash VARCHAR,
+            request JSON,
+            curve_ids INTEGER[],
+            batch_size INTEGER,
+            total_curves INTEGER,
+            total_batches INTEGER,
+            done_batches INTEGER,
+            error VARCHAR,
+            created_at TIMESTAMP DEFAULT current_timestamp,
+            updated_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_batches (
+            job_id VARCHAR,
+            batch_idx INTEGER,
+            curve_count INTEGER,
+            completed_at TIMESTAMP DEFAULT current_timestamp,
+            PRIMARY KEY (job_id, batch_idx)
+        )
+    """)
+
+
+def _normalize_request(kind: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply the same model defaults as the synchronous bulk endpoints."""
+    filters = dict(request.get("filters") or {})
+    if kind == "fparams" and not filters.get("f_models"):
+        filters["f_models"] = {"hertz_filter_array": {"model": "hertz", "poisson": 0.5}}
+    if kind == "elasticity" and not filters.get("e_models"):
+        filters["e_models"] = {"constant_filter_array": {"model": "constant"}}
+    return {
+        "filters": filters,
+        "num_curves": request.get("num_curves"),
+        "force_model_params": request.get("force_model_params"),
+        "elasticity_params": request.get("elasticity_params"),
+        "emodel_params": request.get("emodel_params"),
+        "set_zero_force": request.get("set_zero_force", True),
+    }
+
+
+def _stage_hash(kind: str, request: Dict[str, Any], metadata: Dict) -> str:
+    if kind == "fparams":
+        return fmodel_stage_hash(
+            request["filters"], metadata, request["force_model_params"], request["set_zero_force"]
+        )
+    return emodel_stage_hash(
+        request["filters"], metadata, request["elasticity_params"], request["emodel_params"], request["set_zero_force"]
+    )
+
+
+class JobManager:
+    """
+    Owns background fit jobs. Each job walks its curve list batch by batch in a
+    worker thread, storing a batch's fit results in curve_results together with
+    its checkpoint row, so an interrupted job resumes from the next pending batch.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        conn = duckdb.connect(self.db_path)
+        ensure_job_tables(conn)
+        return conn
+
+    # ---------- API ----------
+
+    async def submit(self, kind: str, request: Dict[str, Any], batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+        """
+        Create (or resume) a job. Job ids are derived from the dataset, the pipeline
+        stage and the curve selection, so resubmitting an interrupted request resumes it.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(JOB_KINDS)}")
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+        request = _normalize_request(kind, request)
+
+        conn = self._connect()
+        try:
+            ensure_cache_tables(conn)
+            query = "SELECT DISTINCT curve_id FROM force_vs_z ORDER BY curve_id"
+            if request["num_curves"]:
+                query += f" LIMIT {int(request['num_curves'])}"
+            curve_ids = [row[0] for row in conn.execute(query).fetchall()]
+            if not curve_ids:
+                raise ValueError("No curves found")
+
+            dataset_fp = get_dataset_fingerprint(conn)
+            request["metadata"] = get_metadata_for_curves(conn, [str(curve_ids[0])])
+            stage_hash = _stage_hash(kind, request, request["metadata"])
+            job_id = _json_hash({"dataset_fp": dataset_fp, "kind": kind, "stage_hash": stage_hash, "curve_ids": curve_ids})[:16]
+
+            existing = conn.execute("SELECT status FROM jobs WHERE job_id = ?", [job_id]).fetchone()
+            if existing is None:
+                conn.execute(
+                    """
+                    INSERT INTO jobs (job_id, kind, status, dataset_fp, stage_hash, request, curve_ids,
+                                      batch_size, total_curves, total_batches, done_batches)
+                    VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?, 0)
+                    """,
+                    [job_id, kind, dataset_fp, stage_hash, json.dumps(request), curve_ids,
+                     batch_size, len(curve_ids), math.ceil(len(curve_ids) / batch_size)],
+                )
+            elif existing[0] != "completed" and job_id not in self._tasks:
+                # Interrupted, failed or cancelled earlier: resume from its checkpoints
+                self._set_status(conn, job_id, "queued", None)
+        finally:
+            conn.close()
+
+        if job_id not in self._tasks and self.status(job_id)["status"] == "queued":
+            self._start(job_id)
+        return self.status(job_id)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                """
+                SELECT job_id, kind, status, dataset_fp, stage_hash, total_curves, total_batches,
+                       done_batches, batch_size, error, created_at, updated_at
+                FROM jobs WHERE job_id = ?
+                """,
+                [job_id],
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            raise KeyError(job_id)
+        (job_id, kind, status, dataset_fp, stage_hash, total_curves, total_batches,
+         done_batches, batch_size, error, created_at, updated_at) = row
+        return {
+            "job_id": job_id,
+            "kind": kind,
+            "status": status,
+            "dataset_fp": dataset_fp,
+            "stage_hash": stage_hash,
+            "total": total_curves,
+            "done": min(done_batches * batch_size, total_curves),
+            "total_batches": total_batches,
+            "done_batches": done_batches,
+            "error": error,
+            "created_at": str(created_at),
+            "updated_at": str(updated_at),
+        }
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        status = self.status(job_id)
+        if job_id in self._cancel:
+            # The worker stops after its current batch and records the cancellation
+            self._cancel[job_id].set()
+        elif status["status"] in ACTIVE_STATUSES:
+            conn = self._connect()
+            try:
+                self._set_status(conn, job_id, "cancelled", None)
+            finally:
+                conn.close()
+            self._publish(job_id, {"type": "cancelled", **self.status(job_id)})
+        return self.status(job_id)
+
+    def results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Fit results computed so far for the job's curves, in curve order."""
+        status = self.status(job_id)
+        conn = self._connect()
+        try:
+            ensure_cache_tables(conn)
+            curve_ids = conn.execute("SELECT curve_ids FROM jobs WHERE job_id = ?", [job_id]).fetchone()[0]
+            stored = load_curve_results(conn, status["dataset_fp"], status["stage_hash"])
+        finally:
+            conn.close()
+
+        make_entry = make_fparam_entry if status["kind"] == "fparams" else make_elasticity_entry
+        entries = [
+            make_entry(cid, stored[cid], idx)
+            for idx, cid in enumerate(curve_ids)
+            if cid in stored
+        ]
+        end = None if limit is None else offset + limit
+        key = "fparams" if status["kind"] == "fparams" else "elasticity_params"
+        return {**status, "available": len(entries), key: entries[offset:end]}
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(job_id, [])
+        if queue in queues:
+            queues.remove(queue)
+
+    def metric_lines(self) -> List[str]:
+        """Progress of active bulk jobs and queue depths, for GET /metrics."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, kind, status, total_curves, done_batches, batch_size FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        finally:
+            conn.close()
+        totals, done, progress = [], [], []
+        for job_id, kind, status, total_curves, done_batches, batch_size in rows:
+            labels = {"job_id": job_id, "kind": kind, "status": status}
+            done_curves = min(done_batches * batch_size, total_curves)
+            totals.append((labels, total_curves))
+            done.append((labels, done_curves))
+            progress.append((labels, done_curves / total_curves if total_curves else 0.0))
+        queued_jobs = sum(1 for row in rows if row[2] == "queued")
+        pending_events = sum(queue.qsize() for queues in list(self._subscribers.values()) for queue in queues)
+        return [
+            *family("nanoidenter_job_curves_total", "gauge", "Curves of each active bulk job", totals),
+            *family("nanoidenter_job_curves_done", "gauge", "Curves processed so far by each active bulk job", done),
+            *family("nanoidenter_job_progress_ratio", "gauge", "Share of each active bulk job that is done", progress),
+            *family("nanoidenter_queue_depth", "gauge", "Bulk jobs waiting to start, progress events waiting to reach subscribers",
+                    [({"queue": "jobs"}, queued_jobs), ({"queue": "job_events"}, pending_events)]),
+        ]
+
+    async def resume_pending(self) -> None:
+        """Restart jobs left queued or running by a previous server process."""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT job_id FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchall()
+            finally:
+                conn.close()
+        except duckdb.Error as e:
+            logger.warning(f"Could not inspect pending jobs: {e}")
+            return
+        for (job_id,) in rows:
+            if job_id not in self._tasks:
+                logger.info(f"Resuming job {job_id}")
+                self._start(job_id)
+
+    # ---------- Execution ----------
+
+    def _start(self, job_id: str) -> None:
+        self._cancel[job_id] = threading.Event()
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._run_blocking, job_id, self._cancel[job_id], loop)
+        finally:
+            self._tasks.pop(job_id, None)
+            self._cancel.pop(job_id, None)
+
+    def _run_blocking(self, job_id: str, cancel_event: threading.Event, loop: asyncio.AbstractEventLoop) -> None:
+        def publish(event: Dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(self._publish, job_id, event)
+
+        conn = self._connect()
+        try:
+            register_filters(conn)
+            ensure_cache_tables(conn)
+            (kind, dataset_fp, request_json, curve_ids, batch_size, total_batches) = conn.execute(
+                "SELECT kind, dataset_fp, request, curve_ids, batch_size, total_batches FROM jobs WHERE job_id = ?",
+                [job_id],
+            ).fetchone()
+            request = json.loads(request_json)
+            metadata = request["metadata"]
+            stage_hash = _stage_hash(kind, request, metadata)
+
+            if get_dataset_fingerprint(conn) != dataset_fp:
+                raise ValueError("Dataset changed since the job was submitted")
+
+            completed = {
+                row[0] for row in conn.execute(
+                    "SELECT batch_idx FROM job_batches WHERE job_id = ?", [job_id]
+                ).fetchall()
+            }
+            self._set_status(conn, job_id, "running", None)
+            publish({"type": "progress", **self.status(job_id)})
+
+            for batch_idx in range(total_batches):
+                if batch_idx in completed:
+                    continue
+                if cancel_event.is_set():
+                    self._set_status(conn, job_id, "cancelled", None)
+                    publish({"type": "cancelled", **self.status(job_id)})
+                    return
+                # force_vs_z follows the active dataset; stop rather than mix datasets
+                if get_dataset_fingerprint(conn) != dataset_fp:
+                    raise ValueError("Active dataset changed while the job was running")
+
+                batch_ids = [f"curve{cid}" for cid in curve_ids[batch_idx * batch_size:(batch_idx + 1) * batch_size]]
+                cached, missing_ids = split_cached_curves(conn, batch_ids, dataset_fp, stage_hash)
+                result_rows: List[tuple] = []
+                if missing_ids:
+                    # Fit results come back as rows and are saved together with the checkpoint
+                    fetch_curves_batch(
+                        conn,
+                        missing_ids,
+                        request["filters"],
+                        single=True,
+                        metadata=metadata,
+                        set_zero_force=request["set_zero_force"],
+                        elasticity_params=request["elasticity_params"],
+                        elastic_model_params=request["emodel_params"],
+                        force_model_params=request["force_model_params"],
+                        compute_elspectra=(kind == "elasticity"),
+                        result_rows=result_rows,
+                    )
+
+                self._checkpoint(conn, job_id, batch_idx, len(batch_ids), result_rows)
+                publish({"type": "progress", **self.status(job_id)})
+
+            self._set_status(conn, job_id, "completed", None)
+            publish({"type": "complete", **self.status(job_id)})
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            try:
+                self._set_status(conn, job_id, "failed", str(e))
+                publish({"type": "error", **self.status(job_id)})
+            except Exception:
+                publish({"type": "error", "job_id": job_id, "status": "failed", "error": str(e)})
+        finally:
+            conn.close()
+
+    def _checkpoint(self, conn: duckdb.DuckDBPyConnection, job_id: str, batch_idx: int,
+                    curve_count: int, result_rows: List[tuple]) -> None:
+        """
+        Store a batch's fit results and mark it done in one transaction, so a batch
+        is never skipped on resume without its results having landed. A failed write
+        raises and fails the job.
+        """
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            save_curve_results(conn, result_rows)
+            conn.execute(
+                "INSERT INTO job_batches (job_id, batch_idx, curve_count) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+                [job_id, batch_idx, curve_count],
+            )
+            conn.execute(
+                """
+                UPDATE jobs
+                SET done_batches = (SELECT COUNT(*) FROM job_batches WHERE job_id = ?),
+                    updated_at = current_timestamp
+                WHERE job_id = ?
+                """,
+                [job_id, job_id],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _set_status(self, conn: duckdb.DuckDBPyConnection, job_id: str, status: str, error: Optional[str]) -> None:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = current_timestamp WHERE job_id = ?",
+            [status, error, job_id],
+        )
+
+    def _publish(self, job_id: str, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait(event)
+
+
+job_manager = JobManager(DB_PATH)
+register_collector(job_manager.metric_lines)
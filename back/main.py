@@ -6,11 +6,19 @@ import json
 import duckdb
 import os
 import logging
+import time
 # from db import transform_hdf5_to_db
 from filters.register_all import register_filters
-from db import fetch_curves_batch, ensure_cache_tables, get_metadata_for_curves, get_conn, compute_elasticity_params_batched
+from db import (
+    fetch_curves_batch, ensure_cache_tables, get_metadata_for_curves, compute_elasticity_params_batched,
+    get_dataset_fingerprint, fmodel_stage_hash, emodel_stage_hash, split_cached_curves, save_curve_results,
+    result_curve_id, make_fparam_entry, make_elasticity_entry, DB_PATH,
+)
 import asyncio
+from contextlib import aclosing
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from result_stream import ResultStreamWriter
+from metrics import REQUEST_SECONDS, WEBSOCKET_SESSIONS, recording as metrics_recording, time_stage
 from typing import Dict, List, Tuple, Any
 
 
@@ -26,9 +34,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Per-endpoint latency for GET /metrics; passes straight through while nobody scrapes."""
+    if not metrics_recording():
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, getattr(route, "path", "unmatched"), response.status_code)
+    return response
+
 # Paths
 HDF5_FILE_PATH = "data/all.hdf5"  # HDF5 file path
-DB_PATH = "data/experiment.db"  # DuckDB database file
 BATCH_SIZE = 10  # Process 10 curves per batch (adjust based on your needs)
 MAX_WORKERS = 8  # Number of parallel workers (tune based on CPU cores)
 
@@ -43,7 +61,7 @@ logger = logging.getLogger(__name__)
 # Each worker owns its DuckDB connection (read-only), registers UDFs,
 # sets PRAGMAs, then runs the pipeline for its subset.
 # Returns a dict with only what's needed by the caller.
-def _parallel_worker(curve_ids, filters, compute="elasticity"):
+def _parallel_worker(curve_ids, filters, compute="elasticity", metadata=None):
     """
     Process-level worker function that processes a batch of curves.
     Each worker creates its own DuckDB connection, registers UDFs,
@@ -58,10 +76,14 @@ def _parallel_worker(curve_ids, filters, compute="elasticity"):
                  - "emodel": (optional) elastic model name
                  - "emodel_params": (optional) elastic model parameters dict
                  - "elasticity_params": (optional) elasticity parameters dict
+        metadata: Metadata to compute with; the caller derives its stage hash from the same
+                  dict. Resolved from this batch's first curve when omitted.
     
     Returns:
         For string compute: Dict containing either "fparams" or "elasticity_params" key with results
         For dict compute_spec: Tuple (True, out_dict) where out_dict contains full result structure
+        Both carry "result_rows": fit results for the caller to persist (the worker's
+        connection is read-only).
     """
     # Each worker gets its own read-only connection (separate process, won't conflict with main process)
     conn = duckdb.connect(DB_PATH, read_only=True)
@@ -79,8 +101,10 @@ def _parallel_worker(curve_ids, filters, compute="elasticity"):
             # Main process will handle cache table creation
             pass
 
-        # Per-batch metadata (spring_constant, tip_radius, tip_geometry)
-        metadata = get_metadata_for_curves(conn, curve_ids)
+        # Metadata (spring_constant, tip_radius, tip_geometry), per batch unless the caller fixed it
+        if metadata is None:
+            metadata = get_metadata_for_curves(conn, curve_ids)
+        result_rows = []
 
         # Parse compute parameter - support both string (backward compat) and dict (new pattern)
         if isinstance(compute, dict):
@@ -109,11 +133,13 @@ def _parallel_worker(curve_ids, filters, compute="elasticity"):
                 conn, curve_ids, filters, single=True, metadata=metadata,
                 compute_elspectra=need_elspectra,
                 elasticity_params=elasticity_params if elasticity_params else None,
-                elastic_model_params=elastic_model_params
+                elastic_model_params=elastic_model_params,
+                result_rows=result_rows,
             )
             
             # Build result dict with full structure
             out = {
+                "result_rows": result_rows,
                 "num_curves": len(curve_ids),
                 "graph_force_vs_z": g_fvz,
                 "graph_force_indentation": g_fi,
@@ -142,20 +168,21 @@ def _parallel_worker(curve_ids, filters, compute="elasticity"):
             
             # Run your full pipeline for this subset (single=True exposes params) 
             g_fvz, g_fi, g_el = fetch_curves_batch(
-                conn, curve_ids, filters, single=True, metadata=metadata, compute_elspectra=(compute_type == "elasticity")
+                conn, curve_ids, filters, single=True, metadata=metadata, compute_elspectra=(compute_type == "elasticity"),
+                result_rows=result_rows,
             )
 
             if compute_type == "fparams":
                 out = []
                 if g_fi and isinstance(g_fi.get("curves"), dict):
                     out = g_fi["curves"].get("curves_fparam", [])
-                return {"fparams": out}
+                return {"fparams": out, "result_rows": result_rows}
 
             elif compute_type == "elasticity":
                 out = []
                 if g_el and isinstance(g_el, dict):
                     out = g_el.get("curves_elasticity_param", [])
-                return {"elasticity_params": out}
+                return {"elasticity_params": out, "result_rows": result_rows}
 
             else:
                 return {}
@@ -169,6 +196,7 @@ async def websocket_data_stream(websocket: WebSocket):
     """WebSocket endpoint to stream batches of curve data from DuckDB and send filter defaults."""
     # print("WebSocket connected")
     await websocket.accept()
+    WEBSOCKET_SESSIONS.inc("/ws/data")
     conn = duckdb.connect(DB_PATH)
     # print(f"Connected to database: {DB_PATH}")
 
@@ -359,6 +387,7 @@ async def websocket_data_stream(websocket: WebSocket):
         await websocket.send_text(json.dumps({"status": "error", "message": str(e)}))
     finally:
         conn.close()
+        WEBSOCKET_SESSIONS.dec("/ws/data")
         # print("WebSocket connection closed")
 
 
@@ -539,10 +568,9 @@ async def process_and_stream_batch(
 
         # Send or report empty
         if response_data["data"]:
-            await websocket.send_text(json.dumps(
-                response_data,
-                default=str,
-            ))
+            with time_stage("serialization"):
+                payload = json.dumps(response_data, default=str)
+            await websocket.send_text(payload)
         else:
             print(f"No data returned for batch (scope={compute_scope}): {batch_ids}")
             await websocket.send_text(json.dumps({
@@ -568,6 +596,9 @@ async def startup_event():
     #     transform_hdf5_to_db(HDF5_FILE_PATH, DB_PATH)
     # else:
     #     print("✅ DuckDB database already exists, skipping reload.")
+    # Pick up background jobs interrupted by a previous shutdown
+    from jobs import job_manager
+    await job_manager.resume_pending()
     print("✅ Startup complete.")
 
 
@@ -597,6 +628,10 @@ from fastapi.responses import FileResponse
 from pathlib import Path
 from routers.opener import router as experiment_router
 from routers.exporter import router as exporter_router
+from routers.results import router as results_router
+from routers.jobs import router as jobs_router
+from routers.datasets import router as datasets_router
+from routers.metrics import router as metrics_router
 
 # Configure logging
 logging.basicConfig(
@@ -610,6 +645,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 app.include_router(experiment_router)
 app.include_router(exporter_router)
+app.include_router(results_router)
+app.include_router(jobs_router)
+app.include_router(datasets_router)
+app.include_router(metrics_router)
 
 
 # Sanitize file system paths
@@ -641,7 +680,7 @@ async def export_hdf5_endpoint(data: Dict[str, Any]):
     level_names = data.get("level_names", ["curve0", "segment0"])
     metadata_path = data.get("metadata_path", "")
     metadata = data.get("metadata", {})
-    db_path = "data/experiment.db"
+    db_path = DB_PATH
     errors = []
 
     # Validate export_hdf5_path
@@ -735,9 +774,17 @@ async def export_hdf5_endpoint(data: Dict[str, Any]):
 @app.post("/get-all-fparams-stream")
 async def get_all_fparams_stream(data: Dict[str, Any]):
     """
-    Server-Sent Events endpoint to stream fparams progress and results.
-    Emits progress updates during batch processing.
+    Streams fparams progress and results batch by batch.
+    "format" selects the encoding: "sse" (default), "ndjson" or "arrow" (Arrow IPC).
+    Result rows are sent as each batch finishes and are not accumulated server-side.
+    The stream always ends with a "complete" or "error" event; in Arrow IPC that is a
+    final empty record batch carrying the event in its custom metadata (see ResultStreamWriter).
     """
+    try:
+        writer = ResultStreamWriter(data.get("format", "sse"), "fparams")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
+
     async def generate():
         try:
             # Extract parameters from request
@@ -769,17 +816,23 @@ async def get_all_fparams_stream(data: Dict[str, Any]):
             print(f"Found {total_curves} total curves in database")
             
             # Emit initial progress
-            yield f"data: {json.dumps({'type': 'progress', 'phase': 'Starting...', 'done': 0, 'total': total_curves})}\n\n"
+            yield writer.event({'type': 'progress', 'phase': 'Starting...', 'done': 0, 'total': total_curves})
             
             if not curve_ids:
-                yield f"data: {json.dumps({'type': 'complete', 'status': 'success', 'fparams': [], 'message': 'No curves found'})}\n\n"
+                yield writer.end({'type': 'complete', 'status': 'success', 'count': 0, 'message': 'No curves found'})
                 conn.close()
                 return
             
             # Process curves in smaller batches to avoid memory issues
             batch_size = 50  # Process 50 curves at a time
-            all_fparams = []
+            sent = 0
             total_batches = (total_curves + batch_size - 1) // batch_size
+            # Previously fitted curves are served from the curve_results store
+            dataset_fp = get_dataset_fingerprint(conn)
+            # One metadata for every batch, used for computing and for the stage hash alike
+            metadata = get_metadata_for_curves(conn, curve_ids)
+            stage_hash = fmodel_stage_hash(filters, metadata)
+            positions = {int(cid): idx for idx, cid in enumerate(curve_ids)}
             
             for i in range(0, len(curve_ids), batch_size):
                 batch_curve_ids = curve_ids[i:i + batch_size]
@@ -787,41 +840,46 @@ async def get_all_fparams_stream(data: Dict[str, Any]):
                 print(f"Processing batch {batch_num}/{total_batches}: curves {i} to {min(i + batch_size, len(curve_ids))}")
                 
                 # Emit batch progress
-                yield f"data: {json.dumps({'type': 'progress', 'phase': f'Processing batch {batch_num}/{total_batches}...', 'done': i, 'total': total_curves, 'current_batch': batch_num, 'total_batches': total_batches})}\n\n"
+                yield writer.event({'type': 'progress', 'phase': f'Processing batch {batch_num}/{total_batches}...', 'done': i, 'total': total_curves, 'current_batch': batch_num, 'total_batches': total_batches})
                 
+                cached, missing_ids = split_cached_curves(conn, batch_curve_ids, dataset_fp, stage_hash)
+                batch_fparams = [make_fparam_entry(cid, params, positions[cid]) for cid, params in cached.items()]
+
                 # Fetch curves with fparam calculation (use single=True to get fparams)
                 # Skip elspectra calculation for fparams endpoint to improve performance
-                graph_force_vs_z, graph_force_indentation, graph_elspectra = fetch_curves_batch(
-                    conn, batch_curve_ids, filters, single=True, compute_elspectra=False
-                )
+                graph_force_indentation = None
+                if missing_ids:
+                    graph_force_vs_z, graph_force_indentation, graph_elspectra = fetch_curves_batch(
+                        conn, missing_ids, filters, single=True, metadata=metadata, compute_elspectra=False
+                    )
                 
                 # Extract fparams from this batch
                 if graph_force_indentation and graph_force_indentation.get("curves"):
                     curves_data = graph_force_indentation["curves"]
                     if isinstance(curves_data, dict) and "curves_fparam" in curves_data:
-                        batch_fparams = curves_data["curves_fparam"]
                         # Adjust curve_index to be global
-                        for fparam in batch_fparams:
-                            fparam["curve_index"] += i  # Add the batch offset
-                        all_fparams.extend(batch_fparams)
-                        print(f"Batch {batch_num}: Found {len(batch_fparams)} fparams")
+                        for fparam in curves_data["curves_fparam"]:
+                            fparam["curve_index"] = positions.get(result_curve_id(fparam), fparam["curve_index"] + i)
+                            batch_fparams.append(fparam)
+                sent += len(batch_fparams)
+                logger.debug(f"Batch {batch_num}: found {len(batch_fparams)} fparams")
                 
-                # Emit batch completion
-                yield f"data: {json.dumps({'type': 'progress', 'phase': f'Batch {batch_num}/{total_batches} complete', 'done': min(i + batch_size, total_curves), 'total': total_curves})}\n\n"
+                # Emit this batch's rows, then batch completion
+                yield writer.rows(batch_fparams)
+                yield writer.event({'type': 'progress', 'phase': f'Batch {batch_num}/{total_batches} complete', 'done': min(i + batch_size, total_curves), 'total': total_curves})
             
-            fparams = all_fparams
-            print(f"Total fparams found: {len(fparams)}")
+            print(f"Total fparams found: {sent}")
             
             conn.close()
             
-            # Emit final result
-            yield f"data: {json.dumps({'type': 'complete', 'status': 'success', 'fparams': fparams, 'message': f'Retrieved fparams for {len(fparams)} curves'})}\n\n"
+            # Emit final summary; rows were already delivered per batch
+            yield writer.end({'type': 'complete', 'status': 'success', 'count': sent, 'stage_hash': stage_hash, 'message': f'Retrieved fparams for {sent} curves'})
             
         except Exception as e:
             logger.error(f"Failed to fetch fparams: {str(e)}")
-            yield f"data: {json.dumps({'type': 'error', 'status': 'error', 'message': f'Failed to fetch fparams: {str(e)}'})}\n\n"
+            yield writer.end({'type': 'error', 'status': 'error', 'message': f'Failed to fetch fparams: {str(e)}'})
     
-    return StreamingResponse(generate(), media_type="text/event-stream")
+    return StreamingResponse(generate(), media_type=writer.media_type)
 
 
 # Helper function for SSE events
@@ -835,7 +893,7 @@ def sse_event(payload: dict) -> bytes:
 async def get_all_emodels_stream(req: Request):
     """
     SSE stream of elasticity model parameters with progress.
-    Uses consistent DuckDB connection to avoid configuration conflicts.
+    Reads curves from and stores fits in the experiment database, like the other bulk endpoints.
     
     Body:
       {
@@ -847,8 +905,13 @@ async def get_all_emodels_stream(req: Request):
         },
         "num_curves": <optional>,
         "elasticity_params": {"interpolate": true, "order": 2, "window": 61},
-        "emodel_params": {"maxInd": 800, "minInd": 0}
+        "emodel_params": {"maxInd": 800, "minInd": 0},
+        "format": "sse" | "ndjson" | "arrow"   (optional, default "sse")
       }
+
+    Rows are streamed per batch ("rows" events in SSE) and never accumulated.
+    The stream always ends with a "complete" or "error" event; in Arrow IPC that is a
+    final empty record batch carrying the event in its custom metadata (see ResultStreamWriter).
     """
     body = await req.json()
     filters = (body or {}).get("filters", {})
@@ -859,15 +922,23 @@ async def get_all_emodels_stream(req: Request):
     # Ensure we have e_models to calculate elasticity
     if not filters.get("e_models"):
         filters["e_models"] = {"constant_filter_array": {"model": "constant"}}
+
+    try:
+        writer = ResultStreamWriter((body or {}).get("format", "sse"), "elasticity_params")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
     
     async def gen():
         # Important for proxies like nginx
-        yield b": keep-alive\n\n"
-        yield sse_event({"type": "initializing", "phase": "Initializing...", "done": 0, "total": 0, "total_batches": 0})
+        if writer.format == "sse":
+            yield b": keep-alive\n\n"
+        yield writer.event({"type": "initializing", "phase": "Initializing...", "done": 0, "total": 0, "total_batches": 0})
         
-        # Use consistent connection from get_conn() to avoid DuckDB configuration conflicts
-        conn = get_conn()
+        # Same database as the other bulk endpoints, so fits are looked up and stored alongside theirs
+        conn = duckdb.connect(DB_PATH)
         try:
+            register_filters(conn)
+            ensure_cache_tables(conn)
             # Use the batched async generator
             batch_iter = compute_elasticity_params_batched(
                 conn,
@@ -881,49 +952,53 @@ async def get_all_emodels_stream(req: Request):
             total_batches = None
             total = None
             done_global = 0
-            all_rows = []
+            sent = 0
             
-            async for batch_idx, tb, done, tot, rows in batch_iter:
-                # Cache totals once
-                total_batches = tb if total_batches is None else total_batches
-                total = tot if total is None else total
+            # Closed before conn is, so no batch is still running when the connection goes
+            async with aclosing(batch_iter):
+                async for batch_idx, tb, done, tot, rows in batch_iter:
+                    # Cache totals once
+                    total_batches = tb if total_batches is None else total_batches
+                    total = tot if total is None else total
                 
-                done_global = done
-                all_rows.extend(rows)
+                    done_global = done
+                    sent += len(rows)
+
+                    # Deliver this batch's rows immediately, then its progress event
+                    yield writer.rows(rows)
+                    yield writer.event({
+                        "type": "progress",
+                        "phase": f"Processing batch {batch_idx}/{tb}",
+                        "current_batch": batch_idx,
+                        "total_batches": tb,
+                        "done": done,
+                        "total": tot,
+                    })
                 
-                # Progress event with correct field names matching fparams stream
-                yield sse_event({
-                    "type": "progress",
-                    "phase": f"Processing batch {batch_idx}/{tb}",
-                    "current_batch": batch_idx,
-                    "total_batches": tb,
-                    "done": done,
-                    "total": tot,
-                })
-                
-                # Give the event loop a breath so chunks flush
-                await asyncio.sleep(0)
+                    # Give the event loop a breath so chunks flush
+                    await asyncio.sleep(0)
             
-            # Complete event with final payload
-            yield sse_event({
+            # Complete event; rows were already delivered per batch
+            yield writer.end({
                 "type": "complete",
                 "status": "success",
                 "done": done_global,
                 "total": total,
-                "elasticity_params": all_rows
+                "count": sent,
             })
             
         except Exception as e:
             logger.error(f"Failed to fetch elasticity params: {str(e)}")
-            yield sse_event({"type": "error", "status": "error", "message": str(e)})
-        # Note: Do NOT close the singleton connection here
+            yield writer.end({"type": "error", "status": "error", "message": str(e)})
+        finally:
+            conn.close()
         
     headers = {
         "Cache-Control": "no-cache",
         "Connection": "keep-alive",
         "X-Accel-Buffering": "no",  # Disables nginx buffering
     }
-    return StreamingResponse(gen(), media_type="text/event-stream", headers=headers)
+    return StreamingResponse(gen(), media_type=writer.media_type, headers=headers)
 
 
 # New endpoint to fetch all curves' fparams (non-streaming, kept for compatibility)
@@ -938,46 +1013,66 @@ async def get_all_fparams(data: Dict[str, Any]):
         if not filters.get("f_models"):
             filters["f_models"] = {"hertz_filter_array": {"model": "hertz", "poisson": 0.5}}
         
-        # Use consistent connection to avoid DuckDB configuration conflicts
-        conn = get_conn()
-        try:
-            # Let DuckDB parallelize scans/CTEs within queries
-            conn.execute(f"PRAGMA threads = {os.cpu_count() or 2};")
+        # Curves, stored results and new fits all live in the experiment database. The
+        # connection is closed before the worker processes open it read-only.
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_cache_tables(conn)
             # Build the full id list once
             curve_ids_result = conn.execute("SELECT curve_id FROM force_vs_z").fetchall()
             all_ids = [str(r[0]) for r in curve_ids_result]
-        finally:
-            # Don't close singleton connection
-            pass
-        
-        if not all_ids:
-            return {
-                "status": "success",
-                "fparams": [],
-                "message": "No curves found"
-            }
-        
-        print(f"Found {len(all_ids)} total curves in database")
+            if not all_ids:
+                return {
+                    "status": "success",
+                    "fparams": [],
+                    "message": "No curves found"
+                }
+
+            print(f"Found {len(all_ids)} total curves in database")
+
+            # Serve previously fitted curves from the curve_results store
+            dataset_fp = get_dataset_fingerprint(conn)
+            # Workers compute with this exact metadata, so stored rows carry this stage hash
+            metadata = get_metadata_for_curves(conn, all_ids)
+            stage_hash = fmodel_stage_hash(filters, metadata)
+            cached, missing_ids = split_cached_curves(conn, all_ids, dataset_fp, stage_hash)
+        positions = {int(cid): idx for idx, cid in enumerate(all_ids)}
+        all_fparams = [make_fparam_entry(cid, params, positions[cid]) for cid, params in cached.items()]
         
         # Process curves in batches with process-level parallelism
         batch_size = 100  # Process 100 curves per batch (tune as you like)
-        batches = [all_ids[i:i+batch_size] for i in range(0, len(all_ids), batch_size)]
+        batches = [missing_ids[i:i+batch_size] for i in range(0, len(missing_ids), batch_size)]
         
-        all_fparams = []
-        # Use ProcessPoolExecutor for true process-level parallelism
-        # Each worker = its own DuckDB connection + its own UDFs
-        with ProcessPoolExecutor(max_workers=(os.cpu_count() // 2) or 2) as ex:
-            futs = [ex.submit(_parallel_worker, b, filters, "fparams") for b in batches]
-            for fut in as_completed(futs):
-                res = fut.result()
-                if res and "fparams" in res:
-                    all_fparams.extend(res["fparams"])
+        computed_rows = []
+        if batches:
+            # Use ProcessPoolExecutor for true process-level parallelism
+            # Each worker = its own DuckDB connection + its own UDFs
+            with ProcessPoolExecutor(max_workers=(os.cpu_count() // 2) or 2) as ex:
+                futs = [ex.submit(_parallel_worker, b, filters, "fparams", metadata) for b in batches]
+                for fut in as_completed(futs):
+                    res = fut.result()
+                    if res and "fparams" in res:
+                        for fparam in res["fparams"]:
+                            cid = result_curve_id(fparam)
+                            if cid is None:
+                                continue
+                            fparam["curve_index"] = positions.get(cid, fparam["curve_index"])
+                            all_fparams.append(fparam)
+                        computed_rows.extend(res["result_rows"])
+
+        # Workers hold read-only connections, so results are persisted here
+        try:
+            with duckdb.connect(DB_PATH) as conn:
+                save_curve_results(conn, computed_rows)
+        except duckdb.Error:
+            # Already logged; the fits are returned either way and recomputed next time
+            pass
         
         print(f"Total fparams found: {len(all_fparams)}")
         
         return {
             "status": "success",
             "fparams": all_fparams,
+            "stage_hash": stage_hash,
             "message": f"Retrieved fparams for {len(all_fparams)} curves"
         }
         
@@ -998,34 +1093,54 @@ async def get_all_elasticity_params(data: Dict[str, Any]):
         if not filters.get("e_models"):
             filters["e_models"] = {"constant_filter_array": {"model": "constant"}}
 
-        # Use consistent connection to avoid DuckDB configuration conflicts
-        conn = get_conn()
-        try:
-            # Let DuckDB parallelize scans/CTEs within queries
-            conn.execute(f"PRAGMA threads = {os.cpu_count() or 2};")
+        # Curves, stored results and new fits all live in the experiment database. The
+        # connection is closed before the worker processes open it read-only.
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_cache_tables(conn)
             curve_ids_result = conn.execute("SELECT curve_id FROM force_vs_z").fetchall()
             all_ids = [str(r[0]) for r in curve_ids_result]
-        finally:
-            # Don't close singleton connection
-            pass
-
-        if not all_ids:
-            return {"status": "success", "elasticity_params": [], "message": "No curves found"}
+            if not all_ids:
+                return {"status": "success", "elasticity_params": [], "message": "No curves found"}
+
+            # Serve previously fitted curves from the curve_results store
+            dataset_fp = get_dataset_fingerprint(conn)
+            # Workers compute with this exact metadata, so stored rows carry this stage hash
+            metadata = get_metadata_for_curves(conn, all_ids)
+            stage_hash = emodel_stage_hash(filters, metadata)
+            cached, missing_ids = split_cached_curves(conn, all_ids, dataset_fp, stage_hash)
+        positions = {int(cid): idx for idx, cid in enumerate(all_ids)}
+        all_params = [make_elasticity_entry(cid, params, positions[cid]) for cid, params in cached.items()]
 
         batch_size = 100   # Process 100 curves per batch to reduce coordinator round-trips
-        batches = [all_ids[i:i+batch_size] for i in range(0, len(all_ids), batch_size)]
-
-        all_params = []
-        with ProcessPoolExecutor(max_workers=(os.cpu_count() // 2) or 2) as ex:
-            futs = [ex.submit(_parallel_worker, b, filters, "elasticity") for b in batches]
-            for fut in as_completed(futs):
-                res = fut.result()
-                if res and "elasticity_params" in res:
-                    all_params.extend(res["elasticity_params"])
+        batches = [missing_ids[i:i+batch_size] for i in range(0, len(missing_ids), batch_size)]
+
+        computed_rows = []
+        if batches:
+            with ProcessPoolExecutor(max_workers=(os.cpu_count() // 2) or 2) as ex:
+                futs = [ex.submit(_parallel_worker, b, filters, "elasticity", metadata) for b in batches]
+                for fut in as_completed(futs):
+                    res = fut.result()
+                    if res and "elasticity_params" in res:
+                        for entry in res["elasticity_params"]:
+                            cid = result_curve_id(entry)
+                            if cid is None:
+                                continue
+                            entry["curve_index"] = positions.get(cid, entry["curve_index"])
+                            all_params.append(entry)
+                        computed_rows.extend(res["result_rows"])
+
+        # Workers hold read-only connections, so results are persisted here
+        try:
+            with duckdb.connect(DB_PATH) as conn:
+                save_curve_results(conn, computed_rows)
+        except duckdb.Error:
+            # Already logged; the fits are returned either way and recomputed next time
+            pass
 
         return {
             "status": "success",
             "elasticity_params": all_params,
+            "stage_hash": stage_hash,
             "message": f"Retrieved elasticity params for {len(all_params)} curves"
         }
 
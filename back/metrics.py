@@ -0,0 +1,251 @@
+# Process-wide metrics rendered in the Prometheus text exposition format (served at GET /metrics)
+import time
+import bisect
+import functools
+import threading
+import contextlib
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Event metrics are recorded only while someone scrapes: a scrape starts recording and it
+# stops once no scrape came for this long, so an unscraped server pays one flag check per event
+SCRAPE_IDLE_SECONDS = 300.0
+
+# Histogram buckets (seconds) for stage and request latencies
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_recording = False
+_recording_until = 0.0
+
+def recording() -> bool:
+    """Whether event metrics (counters, histograms) are currently being recorded."""
+    global _recording
+    if _recording and time.monotonic() > _recording_until:
+        _recording = False
+    return _recording
+
+def _keep_recording() -> None:
+    global _recording, _recording_until
+    _recording_until = time.monotonic() + SCRAPE_IDLE_SECONDS
+    _recording = True
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], float]]) -> List[str]:
+    """Exposition lines of one metric family from (labels, value) samples; used by collectors."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return lines
+
+class _Metric:
+    KIND = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def _key(self, labelvalues: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return tuple(str(value) for value in labelvalues)
+
+    def value(self, *labelvalues: Any) -> Any:
+        return self._values.get(self._key(labelvalues))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.KIND}", *self.samples()]
+
+class Counter(_Metric):
+    """Monotonic event count; recorded only while scraped."""
+    KIND = "counter"
+
+    def inc(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        if not _recording or not recording():
+            return
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    """Current level of something (e.g. open sessions); always kept up to date."""
+    KIND = "gauge"
+
+    def set(self, value: float, *labelvalues: Any) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labelvalues: Any, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    @contextlib.contextmanager
+    def track(self, *labelvalues: Any):
+        """Count the block as in progress while it runs."""
+        self.inc(*labelvalues)
+        try:
+            yield
+        finally:
+            self.dec(*labelvalues)
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets; recorded only while scraped."""
+    KIND = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: Any) -> None:
+        if not _recording or not recording():
+            return
+        key = self._key(labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labelvalues: Any):
+        """Context manager observing the block's duration; a no-op while not recording."""
+        if not _recording or not recording():
+            return _NOT_TIMED
+        return _Timer(self, labelvalues)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "start")
+
+    def __init__(self, histogram: Histogram, labelvalues: Sequence[Any]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+_NOT_TIMED = contextlib.nullcontext()
+_METRICS: List[_Metric] = []
+_COLLECTORS: List[Callable[[], List[str]]] = []
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """Add a callable producing exposition lines (see family) at every scrape, for state read on demand."""
+    _COLLECTORS.append(collector)
+
+# ---------- Pipeline metrics ----------
+
+STAGE_SECONDS = Histogram(
+    "nanoidenter_stage_duration_seconds",
+    "Processing stage latency: per UDF call (one curve) for the filter, CP, indentation, elspectra and model stages, per batch for domain and serialization",
+    ("stage",),
+)
+UDF_CALLS = Counter("nanoidenter_udf_calls_total", "DuckDB UDF invocations", ("udf", "stage"))
+UDF_ERRORS = Counter("nanoidenter_udf_errors_total", "DuckDB UDF invocations that raised (including errors the UDF turned into NULL)", ("udf", "stage"))
+CACHE_REQUESTS = Counter("nanoidenter_cache_requests_total", "Cache lookups by outcome", ("cache", "result"))
+REQUEST_SECONDS = Histogram("nanoidenter_http_request_duration_seconds", "HTTP request latency until the response starts", ("method", "route", "status"))
+WEBSOCKET_SESSIONS = Gauge("nanoidenter_websocket_sessions", "Open WebSocket sessions", ("endpoint",))
+
+def time_stage(stage: str):
+    """Context manager timing one pipeline stage (see STAGE_SECONDS)."""
+    return STAGE_SECONDS.time(stage)
+
+def record_cache(cache: str, hits: int, misses: int) -> None:
+    if not _recording or not recording():
+        return
+    if hits:
+        CACHE_REQUESTS.inc(cache, "hit", amount=hits)
+    if misses:
+        CACHE_REQUESTS.inc(cache, "miss", amount=misses)
+
+def record_udf_error(udf: str, stage: str) -> None:
+    """For UDF wrappers that turn exceptions into NULL results."""
+    UDF_ERRORS.inc(udf, stage)
+
+def instrument_udf(fn: Callable, udf: str, stage: str) -> Callable:
+    """Wrap a UDF implementation to count its calls and errors and time it as stage; keeps fn's signature for DuckDB."""
+    @functools.wraps(fn)
+    def wrapper(*args):
+        if not _recording or not recording():
+            return fn(*args)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        except Exception:
+            UDF_ERRORS.inc(udf, stage)
+            raise
+        finally:
+            UDF_CALLS.inc(udf, stage)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+    return wrapper
+
+def _cache_hit_ratios() -> List[str]:
+    with CACHE_REQUESTS._lock:
+        totals: Dict[str, List[float]] = {}
+        for (cache, result), value in CACHE_REQUESTS._values.items():
+            totals.setdefault(cache, [0.0, 0.0])[0 if result == "hit" else 1] += value
+    samples = [({"cache": cache}, hits / (hits + misses)) for cache, (hits, misses) in sorted(totals.items()) if hits + misses]
+    return family("nanoidenter_cache_hit_ratio", "gauge", "Share of cache lookups that hit, since recording started", samples)
+
+register_collector(_cache_hit_ratios)
+
+def render_metrics() -> str:
+    """All metrics in the text exposition format. Scraping (re)starts recording of event metrics."""
+    _keep_recording()
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collector in _COLLECTORS:
+        try:
+            lines.extend(collector())
+        except Exception as e:  # A failing collector must not take the others down
+            lines.append(f"# collector {getattr(collector, '__name__', collector)} failed: {_escape(e)}")
+    return "\n".join(lines) + "\n"
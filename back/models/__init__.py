@@ -1 +1,2 @@
-from .force_curve import ForceCurve, Segment
\ No newline at end of file
+from .force_curve import ForceCurve, Segment
+from .curve_batch import CurveBatch
\ No newline at end of file
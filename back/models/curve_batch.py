@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Channels a batch can carry: raw force-distance, indentation (after the contact
+# point) and elasticity spectra
+CHANNELS = ("z", "force", "zi", "fi", "ze", "ee")
+
+
+def _channel_array(values, dtype) -> np.ndarray:
+    """One curve's samples as a 1-D array; NULL lists become empty, NULL samples NaN."""
+    if values is None or values is np.ma.masked:
+        return np.empty(0, dtype=dtype)
+    if isinstance(values, np.ma.MaskedArray):
+        return values.astype(dtype).filled(np.nan)
+    return np.asarray(values, dtype=dtype).ravel()
+
+
+class CurveBatch:
+    """
+    Ragged batch of curves: for every channel one contiguous values buffer plus an
+    offsets array, so curve i of channel c is values[offsets[i]:offsets[i + 1]].
+    Slicing a batch or taking a curve returns views into the same buffers, and
+    whole-batch NumPy operations run once over a buffer instead of per curve.
+    """
+
+    __slots__ = ("curve_ids", "_values", "_offsets")
+
+    def __init__(self, curve_ids: Sequence, values: Dict[str, np.ndarray], offsets: Dict[str, np.ndarray]):
+        self.curve_ids = np.asarray(curve_ids)
+        self._values = {}
+        self._offsets = {}
+        for name, buffer in values.items():
+            if name not in CHANNELS:
+                raise ValueError(f"Unknown channel: {name}")
+            channel_offsets = np.asarray(offsets[name], dtype=np.int64)
+            if len(channel_offsets) != len(self.curve_ids) + 1:
+                raise ValueError(f"Channel {name} needs {len(self.curve_ids) + 1} offsets, got {len(channel_offsets)}")
+            self._values[name] = buffer
+            self._offsets[name] = channel_offsets
+
+    @classmethod
+    def from_arrays(cls, curve_ids: Sequence, dtype=np.float64, **channels: Sequence) -> "CurveBatch":
+        """
+        Pack per-curve arrays (lists, ndarrays or DuckDB list values) into one buffer
+        per channel, e.g. CurveBatch.from_arrays(ids, z=z_rows, force=force_rows).
+        """
+        curve_ids = np.asarray(curve_ids)
+        values, offsets = {}, {}
+        for name, rows in channels.items():
+            arrays = [_channel_array(row, dtype) for row in rows]
+            if len(arrays) != len(curve_ids):
+                raise ValueError(f"Channel {name} has {len(arrays)} curves for {len(curve_ids)} curve ids")
+            channel_offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+            np.cumsum([len(a) for a in arrays], out=channel_offsets[1:])
+            values[name] = np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+            offsets[name] = channel_offsets
+        return cls(curve_ids, values, offsets)
+
+    def __len__(self) -> int:
+        return len(self.curve_ids)
+
+    def __getitem__(self, index: slice) -> "CurveBatch":
+        """Sub-batch sharing this batch's buffers (no samples are copied)."""
+        if not isinstance(index, slice):
+            raise TypeError("CurveBatch supports slicing only; use curve() for a single curve")
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("CurveBatch slices must be contiguous")
+        stop = max(start, stop)
+        return CurveBatch(
+            self.curve_ids[start:stop],
+            self._values,
+            {name: offsets[start:stop + 1] for name, offsets in self._offsets.items()},
+        )
+
+    @property
+    def channels(self) -> Tuple[str, ...]:
+        return tuple(self._values)
+
+    def _channel(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        if name not in self._values:
+            raise ValueError(f"Channel {name} is not in this batch")
+        return self._values[name], self._offsets[name]
+
+    def values(self, name: str) -> np.ndarray:
+        """Samples of every curve in the batch, back to back (a view)."""
+        buffer, offsets = self._channel(name)
+        return buffer[offsets[0]:offsets[-1]]
+
+    def offsets(self, name: str) -> np.ndarray:
+        """Offsets into values(name): curve i spans offsets[i]:offsets[i + 1]."""
+        _, offsets = self._channel(name)
+        return offsets - offsets[0]
+
+    def lengths(self, name: str) -> np.ndarray:
+        _, offsets = self._channel(name)
+        return np.diff(offsets)
+
+    def curve(self, name: str, index: int) -> np.ndarray:
+        """Samples of one curve (a view)."""
+        buffer, offsets = self._channel(name)
+        return buffer[offsets[index]:offsets[index + 1]]
+
+    def arrays(self, name: str) -> List[np.ndarray]:
+        """Per-curve views, in batch order."""
+        buffer, offsets = self._channel(name)
+        return [buffer[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+    def _reduce(self, name: str, ufunc: np.ufunc) -> np.ndarray:
+        """Per-curve reduction with ufunc; empty curves give NaN."""
+        values = self.values(name)
+        starts = self.offsets(name)[:-1]
+        out = np.full(len(self), np.nan)
+        nonempty = self.lengths(name) > 0
+        if nonempty.any():
+            # Skipped (empty) curves own no samples, so each kept start still runs to the next kept one
+            out[nonempty] = ufunc.reduceat(values, starts[nonempty])
+        return out
+
+    def curve_min(self, name: str) -> np.ndarray:
+        """Per-curve minimum, ignoring NaN samples."""
+        return self._reduce(name, np.fmin)
+
+    def curve_max(self, name: str) -> np.ndarray:
+        """Per-curve maximum, ignoring NaN samples."""
+        return self._reduce(name, np.fmax)
+
+    def _bounds(self, name: str) -> Tuple[Optional[float], Optional[float]]:
+        values = self.values(name)
+        if not len(values):
+            return None, None
+        low, high = np.fmin.reduce(values), np.fmax.reduce(values)
+        return (None if np.isnan(low) else float(low)), (None if np.isnan(high) else float(high))
+
+    def domain(self, x: str, y: str) -> Dict[str, Optional[float]]:
+        """xMin/xMax/yMin/yMax over the whole batch, in the graph payload format."""
+        x_min, x_max = self._bounds(x)
+        y_min, y_max = self._bounds(y)
+        return {"xMin": x_min, "xMax": x_max, "yMin": y_min, "yMax": y_max}
+
+    def to_graph_curves(self, x: str, y: str, prefix: str = "curve") -> List[Dict]:
+        """The {"curve_id", "x", "y"} dicts the frontend draws; NaN samples go out as null."""
+        curves = []
+        for index, curve_id in enumerate(self.curve_ids):
+            curves.append({
+                "curve_id": f"{prefix}{curve_id}",
+                "x": _json_list(self.curve(x, index)),
+                "y": _json_list(self.curve(y, index)),
+            })
+        return curves
+
+
+def _json_list(values: np.ndarray) -> list:
+    samples = values.tolist()
+    if np.isnan(values).any():
+        samples = [None if v != v else v for v in samples]
+    return samples
@@ -3,6 +3,8 @@ from .hdf5_opener import HDF5Opener
 from .json_opener import JSONOpener
 from .csv_opener import CSVOpener  # New
 from .txt_opener import TXTOpener  # New
+from .parquet_opener import ParquetOpener
+from .arrow_opener import ArrowOpener
 
 def get_opener(file_type: str) -> Opener:
     if file_type == "json":
@@ -13,5 +15,9 @@ def get_opener(file_type: str) -> Opener:
         return CSVOpener()
     elif file_type == "txt":
         return TXTOpener()
+    elif file_type == "parquet":
+        return ParquetOpener()
+    elif file_type == "arrow":
+        return ArrowOpener()
     else:
         raise ValueError(f"Unsupported file type: {file_type}")
\ No newline at end of file
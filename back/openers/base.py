@@ -1,7 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Tuple
 from models.force_curve import ForceCurve
 
+# Curves per chunk handed from an opener to transform/storage
+DEFAULT_CHUNK_SIZE = 500
+
+def chunk_curves(curves: Iterable[Tuple[str, ForceCurve]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, ForceCurve]]:
+    """Group (curve_name, ForceCurve) pairs into dicts of at most chunk_size curves."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    chunk = {}
+    for curve_name, curve in curves:
+        chunk[curve_name] = curve
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = {}
+    if chunk:
+        yield chunk
+
 class Opener(ABC):
     @abstractmethod
     def validate_metadata(self, metadata: Dict) -> bool:
@@ -16,4 +32,15 @@ class Opener(ABC):
     @abstractmethod
     def process(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
         """Process the file with user-selected dataset paths and metadata into ForceCurve objects."""
-        pass
\ No newline at end of file
+        pass
+
+    def iter_curves(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+        """
+        Yield (curve_name, ForceCurve) pairs one at a time. Openers that can read
+        incrementally override this; the default materializes process().
+        """
+        yield from self.process(file_path, force_path, z_path, metadata).items()
+
+    def process_chunks(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, ForceCurve]]:
+        """Yield the file's curves in dicts of at most chunk_size, for streaming into transform and storage."""
+        return chunk_curves(self.iter_curves(file_path, force_path, z_path, metadata), chunk_size)
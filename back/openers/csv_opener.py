@@ -1,6 +1,6 @@
 import logging
-from typing import Dict, Any
-from file_types.csv import get_csv_structure, process_csv  # Assuming functions are defined in file_types/csv.py
+from typing import Dict, Any, Iterator, Tuple
+from file_types.csv import get_csv_structure, process_csv, iter_csv_curves  # Assuming functions are defined in file_types/csv.py
 from models.force_curve import ForceCurve
 from .base import Opener
 
@@ -41,4 +41,7 @@ class CSVOpener(Opener):
     def process(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
         return process_csv(file_path, force_path, z_path, metadata)
 
+    def iter_curves(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+        return iter_csv_curves(file_path, force_path, z_path, metadata)
+
     
\ No newline at end of file
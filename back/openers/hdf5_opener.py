@@ -1,5 +1,5 @@
-from typing import Dict, Any
-from file_types.hdf5 import  get_hdf5_structure, process_hdf5
+from typing import Dict, Any, Iterator, Tuple
+from file_types.hdf5 import  get_hdf5_structure, process_hdf5, iter_hdf5_curves
 from models.force_curve import ForceCurve
 from .base import Opener
 import logging
@@ -40,4 +40,7 @@ class HDF5Opener(Opener):
         return get_hdf5_structure(file_path)
     
     def process(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
-        return process_hdf5(file_path, force_path, z_path, metadata)
\ No newline at end of file
+        return process_hdf5(file_path, force_path, z_path, metadata)
+
+    def iter_curves(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+        return iter_hdf5_curves(file_path, force_path, z_path, metadata)
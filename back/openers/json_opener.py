@@ -1,7 +1,7 @@
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Tuple
 import json
 import logging
-from file_types.json import process_json, get_json_structure  
+from file_types.json import process_json, iter_json_curves, get_json_file_structure
 from models.force_curve import ForceCurve
 from .base import Opener
 
@@ -38,10 +38,10 @@ class JSONOpener(Opener):
             return False
     
     def get_structure(self, file_path: str) -> Dict[str, Any]:
-        with open(file_path, "r") as f:
-            json_data = json.load(f)
-        return get_json_structure(json_data)
+        return get_json_file_structure(file_path)
     
     def process(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
         return process_json(file_path, force_path, z_path, metadata)
 
+    def iter_curves(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+        return iter_json_curves(file_path, force_path, z_path, metadata)
@@ -1,6 +1,6 @@
 import logging
-from typing import Dict, Any
-from file_types.txt import get_txt_structure, process_txt  # Assuming functions are defined in file_types/txt.py
+from typing import Dict, Any, Iterator, Tuple
+from file_types.txt import get_txt_structure, process_txt, iter_txt_curves  # Assuming functions are defined in file_types/txt.py
 from models.force_curve import ForceCurve
 from .base import Opener
 
@@ -41,4 +41,7 @@ class TXTOpener(Opener):
     def process(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Dict[str, ForceCurve]:
         return process_txt(file_path, force_path, z_path, metadata)
 
+    def iter_curves(self, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> Iterator[Tuple[str, ForceCurve]]:
+        return iter_txt_curves(file_path, force_path, z_path, metadata)
+
     
\ No newline at end of file
@@ -0,0 +1,110 @@
+# Incremental encoders for bulk fit-result streams (SSE, NDJSON, Arrow IPC)
+import io
+import json
+from typing import Dict, List, Optional
+
+from metrics import time_stage
+
+RESULT_STREAM_FORMATS = ("sse", "ndjson", "arrow")
+
+STREAM_MEDIA_TYPES = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Custom metadata key of the terminal Arrow record batch (see ResultStreamWriter)
+ARROW_EVENT_KEY = "event"
+
+# Keys holding the parameter vector in fparam / elasticity result entries
+_PARAM_KEYS = ("params", "elasticity_param")
+
+
+class ResultStreamWriter:
+    """
+    Encodes progress events and per-batch result rows for one response stream.
+    Nothing is accumulated: every call returns the bytes to send for that event.
+
+    - sse:    `data:` events; rows arrive as {"type": "rows", <rows_key>: [...]}
+    - ndjson: one JSON object per line; each result row is {"type": "row", ...}
+    - arrow:  an Arrow IPC stream with one record batch per result batch
+              (curve_id, curve_index, params); progress events are not sent
+
+    Every stream ends with end(event), where event is the terminal "complete" or
+    "error" event. In SSE and NDJSON it is the last message. In Arrow it is an
+    empty record batch whose custom metadata holds the event as JSON under
+    ARROW_EVENT_KEY (pyarrow: read_next_batch_with_custom_metadata), followed
+    by end-of-stream. A stream without that batch was cut short.
+    """
+
+    def __init__(self, fmt: str, rows_key: str):
+        if fmt not in RESULT_STREAM_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(RESULT_STREAM_FORMATS)}")
+        self.format = fmt
+        self.rows_key = rows_key
+        self.media_type = STREAM_MEDIA_TYPES[fmt]
+        self._arrow_writer = None
+        self._arrow_sink: Optional[io.BytesIO] = None
+        if fmt == "arrow":
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ValueError("Arrow IPC streaming requires pyarrow to be installed")
+            self._pa = pa
+            self._arrow_schema = pa.schema([
+                ("curve_id", pa.string()),
+                ("curve_index", pa.int64()),
+                ("params", pa.list_(pa.float64())),
+            ])
+
+    def event(self, payload: Dict) -> bytes:
+        """Progress / complete / error event."""
+        if self.format == "sse":
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+        if self.format == "ndjson":
+            return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        return b""
+
+    def rows(self, rows: List[Dict]) -> bytes:
+        """Result rows of one batch."""
+        if not rows:
+            return b""
+        with time_stage("serialization"):
+            if self.format == "sse":
+                return self.event({"type": "rows", self.rows_key: rows})
+            if self.format == "ndjson":
+                return b"".join(self.event({"type": "row", **row}) for row in rows)
+            return self._arrow_batch(rows)
+
+    def end(self, payload: Dict) -> bytes:
+        """Terminal complete / error event followed by the end of the stream."""
+        if self.format != "arrow":
+            return self.event(payload)
+        self._ensure_arrow_writer()
+        empty = self._pa.record_batch([[] for _ in self._arrow_schema], schema=self._arrow_schema)
+        self._arrow_writer.write_batch(empty, custom_metadata={ARROW_EVENT_KEY: json.dumps(payload, ensure_ascii=False)})
+        self._arrow_writer.close()
+        return self._drain()
+
+    def _ensure_arrow_writer(self) -> None:
+        if self._arrow_writer is None:
+            self._arrow_sink = io.BytesIO()
+            self._arrow_writer = self._pa.ipc.new_stream(self._arrow_sink, self._arrow_schema)
+
+    def _arrow_batch(self, rows: List[Dict]) -> bytes:
+        pa = self._pa
+        self._ensure_arrow_writer()
+        params = [next((row[k] for k in _PARAM_KEYS if k in row), None) for row in rows]
+        batch = pa.record_batch([
+            pa.array([str(row.get("curve_id")) for row in rows], pa.string()),
+            pa.array([int(row.get("curve_index", 0)) for row in rows], pa.int64()),
+            pa.array(params, pa.list_(pa.float64())),
+        ], schema=self._arrow_schema)
+        self._arrow_writer.write_batch(batch)
+        return self._drain()
+
+    def _drain(self) -> bytes:
+        data = self._arrow_sink.getvalue()
+        self._arrow_sink.seek(0)
+        self._arrow_sink.truncate()
+        return data
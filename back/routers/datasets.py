@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException
+import logging
+import duckdb
+
+from db import DB_PATH
+from storage.duckdb_storage import ensure_dataset_tables, list_datasets, activate_dataset, delete_dataset
+
+router = APIRouter(prefix="/datasets", tags=["datasets"])
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("")
+async def get_datasets():
+    """Stored datasets (experiments), most recently used first; one of them is active."""
+    try:
+        with duckdb.connect(DB_PATH) as conn:
+            datasets = list_datasets(conn)
+        return {"status": "success", "datasets": datasets}
+    except Exception as e:
+        logger.error(f"Failed to list datasets: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to list datasets: {str(e)}"
+        })
+
+
+@router.post("/{dataset_id}/activate")
+async def activate(dataset_id: int):
+    """Make a stored dataset the one all curve queries, fits and exports operate on."""
+    try:
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_dataset_tables(conn)
+            conn.execute("BEGIN TRANSACTION")
+            try:
+                activate_dataset(conn, dataset_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            datasets = list_datasets(conn)
+        active = next(d for d in datasets if d["dataset_id"] == dataset_id)
+        logger.info(f"Activated dataset {dataset_id}")
+        return {"status": "success", "dataset": active}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to activate dataset {dataset_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to activate dataset: {str(e)}"
+        })
+
+
+@router.delete("/{dataset_id}")
+async def remove(dataset_id: int):
+    """Delete a stored (inactive) dataset and its persisted fit results."""
+    try:
+        with duckdb.connect(DB_PATH) as conn:
+            delete_dataset(conn, dataset_id)
+        logger.info(f"Deleted dataset {dataset_id}")
+        return {"status": "success", "dataset_id": dataset_id}
+    except ValueError as e:
+        status_code = 404 if "not found" in str(e) else 409
+        raise HTTPException(status_code=status_code, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to delete dataset {dataset_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to delete dataset: {str(e)}"
+        })
@@ -1,19 +1,27 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from typing import Dict, Any, List
+from itertools import chain
 import os
 import logging
 import re
 from pathlib import Path
 import duckdb
 
+from db import DB_PATH
 from exporters import get_exporter  # Assuming exporters package similar to openers
+from exporters.csv_exporter import preview_hertz_metadata
+from file_types.export_stream import gzip_chunks
+from storage.export_cache import export_cache_key, cached_export
 
 router = APIRouter(prefix="", tags=["export"])
 
 logger = logging.getLogger(__name__)
 
-SUPPORTED_EXPORT_EXTENSIONS = ["hdf5", "json", "csv", "txt"]
+SUPPORTED_EXPORT_EXTENSIONS = ["hdf5", "json", "csv", "txt", "parquet", "arrow"]
+# Formats that can be streamed straight to the client ("stream": true), with their media types
+STREAM_MEDIA_TYPES = {"csv": "text/csv", "txt": "text/plain", "json": "application/json"}
 
 
 # Sanitize file system paths
@@ -25,7 +33,11 @@ def sanitize_file_path(path: str) -> str:
 
 @router.post("/export/{extension}")
 async def export_endpoint(extension: str, data: Dict[str, Any]):
-    """Export curves from DuckDB to a file with custom level names and metadata."""
+    """
+    Export curves from DuckDB to a file with custom level names and metadata. With
+    "stream": true (CSV/TXT/JSON) the export is sent as the response body while it is
+    produced, optionally gzip-encoded ("gzip": true), and no file is written.
+    """
     extension = extension.lower()
     if extension not in SUPPORTED_EXPORT_EXTENSIONS:
         raise HTTPException(status_code=400, detail={"status": "error", "message": f"Unsupported export extension: {extension}"})
@@ -46,10 +58,22 @@ async def export_endpoint(extension: str, data: Dict[str, Any]):
     filters = data.get("filters", {})
     # Stores force model parameters (maxInd, minInd, poisson) used for Hertz fit calculations.
     force_model_params = data.get("force_model_params")
+
+    # Streamed exports go straight into the response; export_path then only names the download
+    stream = bool(data.get("stream", False))
+    gzip_response = bool(data.get("gzip", False))
+    # File exports are kept in the export cache; "cache": false re-runs the export (and refreshes the cache)
+    use_cache = bool(data.get("cache", True))
     
-    db_path = "data/experiment.db"
+    db_path = DB_PATH
     errors = []
 
+    if stream and extension not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": f"Streamed export is only available for: {', '.join(STREAM_MEDIA_TYPES)}"})
+    if stream and not export_path:
+        export_path = f"exports/export.{extension}"
+        data = {**data, "export_path": export_path}
+
     # Validate export_path
     if not export_path:
         errors.append("Missing export_path")
@@ -129,7 +153,8 @@ async def export_endpoint(extension: str, data: Dict[str, Any]):
 
         logger.info(f"Starting {extension.upper()} export to {export_path} with {len(converted_curve_ids or [])} curves")
         logger.info(f"Export type: {export_type}, Dataset type: {dataset_type}")
-        os.makedirs(os.path.dirname(export_path), exist_ok=True)
+        if not stream:
+            os.makedirs(os.path.dirname(export_path), exist_ok=True)
         
         # Prepare kwargs with SoftMech-style parameters
         export_kwargs = {
@@ -145,15 +170,37 @@ async def export_endpoint(extension: str, data: Dict[str, Any]):
             "filters": filters,  # Pass filters to the exporter
             "force_model_params": force_model_params,  # Pass force model parameters for Hertz fit calculations
             "elasticity_params": data.get("elasticity_params") or {},  # optional, but add
+            "content": data.get("content", "curves"),  # Parquet / Arrow: curves or results
+            "compression": data.get("compression", "zstd"),  # Parquet only
+            "layout": data.get("layout", "per_curve"),  # HDF5: per_curve or chunked
+            "hdf5_compression": data.get("compression", "gzip"),  # HDF5 chunked layout
         }
         
-        num_exported = exporter.export(
-            db_path=db_path,
-            output_path=export_path,
-            curve_ids=converted_curve_ids,
-            **export_kwargs
-        )
-        logger.info("exporter5")
+        if stream:
+            chunks = exporter.iter_chunks(db_path, converted_curve_ids, **export_kwargs)
+            # Pull the first chunk (the query and first serialization) off the event loop, here,
+            # so "no curves" and similar errors still get an error response
+            first = await run_in_threadpool(next, chunks, None)
+            if first is None:
+                raise ValueError("No curves found in database")
+            body = chain([first], chunks)
+            headers = {"Content-Disposition": f'attachment; filename="{os.path.basename(export_path)}"'}
+            if gzip_response:
+                body = gzip_chunks(body)
+                headers["Content-Encoding"] = "gzip"
+            return StreamingResponse(body, media_type=STREAM_MEDIA_TYPES[extension], headers=headers)
+
+        def produce(output_path: str) -> int:
+            return exporter.export(
+                db_path=db_path,
+                output_path=output_path,
+                curve_ids=converted_curve_ids,
+                **export_kwargs
+            )
+
+        cache_key = export_cache_key(db_path, extension, converted_curve_ids, export_kwargs)
+        num_exported, from_cache = cached_export(cache_key, extension, export_path, produce, refresh=not use_cache)
+        logger.info(f"exporter5 (from cache: {from_cache})")
 
         return {
             "status": "success",
@@ -161,7 +208,8 @@ async def export_endpoint(extension: str, data: Dict[str, Any]):
             "export_path": export_path,
             "exported_curves": num_exported,
             "export_type": export_type,
-            "dataset_type": dataset_type
+            "dataset_type": dataset_type,
+            "from_cache": from_cache
         }
     except Exception as e:
         errors.append(str(e))
@@ -184,8 +232,9 @@ async def calculate_softmech_metadata(data: Dict[str, Any]):
         direction = data.get("direction", "V")
         loose = data.get("loose", 100)
         filters = data.get("filters", {})
+        force_model_params = data.get("force_model_params")
         
-        db_path = "data/experiment.db"
+        db_path = DB_PATH
         
         # Convert curve_ids
         converted_curve_ids = None
@@ -208,9 +257,6 @@ async def calculate_softmech_metadata(data: Dict[str, Any]):
                 "message": "No curves found"
             }
         
-        # Get exporter to access the metadata calculation method
-        exporter = get_exporter("csv")
-        
         # Get tip parameters from database
         with duckdb.connect(db_path) as conn:
             # Check if tip_angle column exists
@@ -231,13 +277,12 @@ async def calculate_softmech_metadata(data: Dict[str, Any]):
                 """).fetchone()
                 tip_geometry, tip_radius, spring_constant = metadata_row or ("sphere", 1e-6, 0.1)
                 tip_angle = 30.0  # Default value
+
+            # Hertz figures from stored fits and cached indentations (a bounded sample is computed if needed)
+            hertz_metadata = preview_hertz_metadata(
+                conn, converted_curve_ids, filters, direction, loose, force_model_params
+            )
         
-        # For now, return basic metadata. In a full implementation, you would:
-        # 1. Fetch the actual curve data using fetch_curves_batch
-        # 2. Calculate the averaged curves
-        # 3. Use the _calculate_softmech_metadata method
-        
-        # This is a simplified version - in practice, you'd need to process the actual data
         # Validate and sanitize tip_geometry
         valid_tip_shapes = ['sphere', 'cylinder', 'cone', 'pyramid']
         if tip_geometry not in valid_tip_shapes:
@@ -251,8 +296,7 @@ async def calculate_softmech_metadata(data: Dict[str, Any]):
             "tip_radius_nm": tip_radius * 1e9 if tip_geometry in ['sphere', 'cylinder'] and tip_radius else None,
             "tip_angle_deg": tip_angle if tip_geometry in ['cone', 'pyramid'] else None,
             "elastic_constant_nm": spring_constant,
-            "average_hertz_modulus_pa": 0,  # Would be calculated from actual data
-            "hertz_max_indentation_nm": 0   # Would be calculated from actual data
+            **hertz_metadata,  # average_hertz_modulus_pa, hertz_max_indentation_nm, exact, sampled/unresolved counts
         }
         
         return {
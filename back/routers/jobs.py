@@ -0,0 +1,137 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
+import asyncio
+import json
+import logging
+
+from jobs import job_manager, TERMINAL_STATUSES
+from metrics import WEBSOCKET_SESSIONS
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+
+
+def _sse_event(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _not_found(job_id: str) -> HTTPException:
+    return HTTPException(status_code=404, detail={"status": "error", "message": f"Job {job_id} not found"})
+
+
+@router.post("")
+async def submit_job(data: Dict[str, Any]):
+    """
+    Submit a whole-dataset fit job (kind: "fparams" or "elasticity").
+    Resubmitting the same request resumes an interrupted job instead of starting over.
+    """
+    try:
+        status = await job_manager.submit(
+            data.get("kind", "fparams"), data, data.get("batch_size", 50)
+        )
+        return {"status": "success", "job": status}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to submit job: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to submit job: {str(e)}"
+        })
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    try:
+        return {"status": "success", "job": job_manager.status(job_id)}
+    except KeyError:
+        raise _not_found(job_id)
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Request cancellation; a running job stops after its current batch."""
+    try:
+        return {"status": "success", "job": job_manager.cancel(job_id)}
+    except KeyError:
+        raise _not_found(job_id)
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: Optional[int] = None):
+    """Results computed so far (partial while the job is running)."""
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail={"status": "error", "message": "Invalid offset/limit"})
+    try:
+        return {"status": "success", **job_manager.results(job_id, offset, limit)}
+    except KeyError:
+        raise _not_found(job_id)
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """SSE progress feed. Starts with a snapshot so clients can reattach at any point."""
+    try:
+        job_manager.status(job_id)
+    except KeyError:
+        raise _not_found(job_id)
+
+    async def gen():
+        # Subscribe before taking the snapshot so no transition is missed in between
+        queue = job_manager.subscribe(job_id)
+        try:
+            snapshot = job_manager.status(job_id)
+            yield _sse_event({"type": "snapshot", **snapshot})
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield _sse_event(event)
+                if event.get("status") in TERMINAL_STATUSES:
+                    break
+        finally:
+            job_manager.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{job_id}/ws")
+async def job_websocket(websocket: WebSocket, job_id: str):
+    """WebSocket progress feed with the same messages as the SSE endpoint."""
+    await websocket.accept()
+    WEBSOCKET_SESSIONS.inc("/jobs/{job_id}/ws")
+    queue = job_manager.subscribe(job_id)
+    try:
+        try:
+            snapshot = job_manager.status(job_id)
+        except KeyError:
+            await websocket.send_text(json.dumps({"type": "error", "message": f"Job {job_id} not found"}))
+            await websocket.close()
+            return
+        await websocket.send_text(json.dumps({"type": "snapshot", **snapshot}))
+        if snapshot["status"] not in TERMINAL_STATUSES:
+            while True:
+                event = await queue.get()
+                await websocket.send_text(json.dumps(event))
+                if event.get("status") in TERMINAL_STATUSES:
+                    break
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Client detached from job {job_id}")
+    finally:
+        job_manager.unsubscribe(job_id, queue)
+        WEBSOCKET_SESSIONS.dec("/jobs/{job_id}/ws")
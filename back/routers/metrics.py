@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from metrics import EXPOSITION_CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Pipeline and endpoint metrics in the Prometheus text exposition format.
+    Stage latencies, UDF calls and cache lookups are only recorded while this
+    endpoint keeps being scraped (see metrics.SCRAPE_IDLE_SECONDS).
+    """
+    return PlainTextResponse(render_metrics(), media_type=EXPOSITION_CONTENT_TYPE)
@@ -1,12 +1,19 @@
-from storage.duckdb_storage import save_to_duckdb
+from db import DB_PATH
+from storage.duckdb_storage import save_curve_chunks_to_duckdb, activate_dataset, STORAGE_PROFILES, DEFAULT_STORAGE_PROFILE, LAZY_BACKENDS
+from storage.ingest_catalog import (
+    HASH_CHUNK_SIZE, new_content_hash, remember_content_hash, file_content_hash,
+    ingest_key, find_stored_ingest, record_ingest,
+)
+from storage.lazy_source import register_lazy_dataset
 from transform.transform import transform_data
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import Dict, Any
 import os
 import logging
+import duckdb
 from openers import get_opener
 
-SUPPORTED_EXTENSIONS = [".json", ".hdf5", ".csv", ".txt"]
+SUPPORTED_EXTENSIONS = [".json", ".hdf5", ".csv", ".txt", ".parquet", ".arrow"]
 
 def detect_file_type(file_path: str) -> str:
     """Detect the type of the input file based on its extension."""
@@ -27,8 +34,24 @@ async def load_experiment_endpoint(file: UploadFile = File(...)):
     os.makedirs("uploads", exist_ok=True)
     
     try:
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        # Stream the upload to disk in chunks, hashing it on the way; the temp file
+        # is only moved into place once complete
+        digest = new_content_hash()
+        tmp_path = f"{file_path}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    block = await file.read(HASH_CHUNK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    f.write(block)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        content_hash = digest.hexdigest()
+        remember_content_hash(file_path, content_hash)
 
         file_type = detect_file_type(file_path)
         opener = get_opener(file_type)
@@ -40,6 +63,7 @@ async def load_experiment_endpoint(file: UploadFile = File(...)):
             "message": "Select dataset paths and metadata",
             "filename": file_path,
             "file_type": file_type,
+            "content_hash": content_hash,
             "structure": structure,
             "errors": []
         }
@@ -60,6 +84,9 @@ async def process_file_endpoint(data: Dict[str, Any]):
     force_path = data.get("force_path")
     z_path = data.get("z_path")
     metadata = data.get("metadata", {})
+    storage_profile = data.get("storage_profile", DEFAULT_STORAGE_PROFILE)
+    # Zero-ingest: register the file in place instead of copying its curves into DuckDB
+    lazy = bool(data.get("lazy", False))
     errors = []
     logger.info(f"processing file structure for {file_path} (type: {file_type})")
 
@@ -72,6 +99,22 @@ async def process_file_endpoint(data: Dict[str, Any]):
             "filename": file_path or "unknown",
             "errors": errors
         })
+    if storage_profile not in STORAGE_PROFILES:
+        errors.append(f"storage_profile must be one of: {', '.join(STORAGE_PROFILES)}")
+        raise HTTPException(status_code=400, detail={
+            "status": "error",
+            "message": "Invalid storage profile",
+            "filename": file_path,
+            "errors": errors
+        })
+    if lazy and file_type not in LAZY_BACKENDS:
+        errors.append(f"lazy mode is only available for: {', '.join(LAZY_BACKENDS)}")
+        raise HTTPException(status_code=400, detail={
+            "status": "error",
+            "message": "Lazy mode not supported for this file type",
+            "filename": file_path,
+            "errors": errors
+        })
     try:
         opener = get_opener(file_type)
         logger.info("info22")
@@ -88,21 +131,48 @@ async def process_file_endpoint(data: Dict[str, Any]):
             raise ValueError("Invalid or incomplete metadata")
         logger.info("info2222")
 
-        curves = opener.process(file_path, force_path, z_path, processed_metadata)
-        logging.info("info2")
-
-        transformed_curves = transform_data(curves)
-        db_path = "data/experiment.db"
-        save_to_duckdb(transformed_curves, db_path)
-        logger.info(f"Saved {len(curves)} curves to DuckDB at {db_path}")
-        logging.info("info3")
+        db_path = DB_PATH
+        if lazy:
+            # Content hashing would read the whole file; the dataset is identified by path, size and mtime
+            content_hash = None
+            dataset_id, curve_count = register_lazy_dataset(
+                db_path, file_type, file_path, force_path, z_path, processed_metadata, name=os.path.basename(file_path)
+            )
+            duckdb_status = "registered"
+            logger.info(f"Registered {curve_count} curves of {file_path} in place as dataset {dataset_id}")
+        else:
+            content_hash = file_content_hash(file_path)
+            key = ingest_key(content_hash, file_type, force_path, z_path, processed_metadata, storage_profile)
+            stored = find_stored_ingest(db_path, key)
+            if stored is not None:
+                # Same content and selections as a dataset that is still stored: just switch to it
+                with duckdb.connect(db_path) as conn:
+                    activate_dataset(conn, stored["dataset_id"])
+                curve_count = stored["curve_count"]
+                dataset_id = stored["dataset_id"]
+                duckdb_status = "unchanged"
+                logger.info(f"{file_path} already ingested as dataset {stored['dataset_id']} ({curve_count} curves); activated it")
+            else:
+                # Stream bounded chunks of curves through transform into storage
+                chunks = opener.process_chunks(file_path, force_path, z_path, processed_metadata)
+                transformed_chunks = (transform_data(chunk) for chunk in chunks)
+                saved = save_curve_chunks_to_duckdb(
+                    transformed_chunks, db_path, name=os.path.basename(file_path), storage_profile=storage_profile
+                )
+                record_ingest(db_path, key, content_hash, file_type, force_path, z_path, processed_metadata, saved)
+                curve_count = saved["curve_count"]
+                dataset_id = saved["dataset_id"]
+                duckdb_status = "saved"
+                logger.info(f"Saved {curve_count} curves to DuckDB at {db_path}")
 
         return {
             "status": "success",
             "message": f"{file_type.upper()} file processed",
-            "curves": len(curves),
+            "curves": curve_count,
             "filename": file_path,
-            "duckdb_status": "saved",
+            "content_hash": content_hash,
+            "dataset_id": dataset_id,
+            "duckdb_status": duckdb_status,
             "spring_constant": float(metadata.get("spring_constant", 0.1)),
             "tip_radius_um": float(metadata.get("tip_radius", 10)) / 1000,  # Convert nm to μm for display
             "errors": errors
@@ -0,0 +1,150 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any, List, Optional
+import logging
+import duckdb
+
+from db import (
+    ensure_cache_tables, get_dataset_fingerprint, get_metadata_for_curves, fmodel_stage_hash, emodel_stage_hash,
+    resolve_result_stage_hash, summarize_curve_results, histogram_curve_results, group_curve_results, DB_PATH,
+)
+
+router = APIRouter(prefix="/results", tags=["results"])
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_STAGES = ["fmodel", "emodel"]
+MAX_HISTOGRAM_BINS = 1000
+
+
+def _dataset_metadata(conn: duckdb.DuckDBPyConnection) -> Dict[str, Any]:
+    row = conn.execute("SELECT MIN(curve_id) FROM force_vs_z").fetchone()
+    return get_metadata_for_curves(conn, [str(row[0])] if row and row[0] is not None else [])
+
+
+def _resolve_stage(conn: duckdb.DuckDBPyConnection, data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """
+    Resolve which stored results a statistics request refers to.
+    Precedence: explicit stage_hash > hash of the supplied pipeline parameters >
+    the stage hash with the most stored curves for the current dataset.
+    """
+    stage = data.get("stage", "fmodel")
+    if stage not in SUPPORTED_STAGES:
+        raise ValueError(f"stage must be one of: {', '.join(SUPPORTED_STAGES)}")
+
+    dataset_fp = get_dataset_fingerprint(conn)
+    stage_hash = data.get("stage_hash")
+    filters = data.get("filters")
+    if not stage_hash and filters:
+        # Bulk computations run with the dataset's curve metadata unless the request overrides it
+        metadata = data.get("metadata") or _dataset_metadata(conn)
+        if stage == "fmodel":
+            stage_hash = fmodel_stage_hash(
+                filters, metadata, data.get("force_model_params"), data.get("set_zero_force", True)
+            )
+        else:
+            stage_hash = emodel_stage_hash(
+                filters, metadata, data.get("elasticity_params"),
+                data.get("elastic_model_params"), data.get("set_zero_force", True)
+            )
+    if not stage_hash:
+        stage_hash = resolve_result_stage_hash(conn, dataset_fp, stage, data.get("model_name"))
+    return {"stage": stage, "dataset_fp": dataset_fp, "stage_hash": stage_hash}
+
+
+def _param_index(data: Dict[str, Any]) -> int:
+    param_index = data.get("param_index", 0)
+    if not isinstance(param_index, int) or param_index < 0:
+        raise ValueError("param_index must be a non-negative integer")
+    return param_index
+
+
+def _quantiles(data: Dict[str, Any]) -> Optional[List[float]]:
+    quantiles = data.get("quantiles")
+    if quantiles is None:
+        return None
+    if (
+        not isinstance(quantiles, list) or not quantiles
+        or not all(isinstance(q, (int, float)) and not isinstance(q, bool) and 0 <= q <= 1 for q in quantiles)
+    ):
+        raise ValueError("quantiles must be a non-empty list of numbers between 0 and 1")
+    return [float(q) for q in quantiles]
+
+
+@router.post("/summary")
+async def results_summary(data: Dict[str, Any]):
+    """Mean, std, min/max and quantiles of a stored fit parameter."""
+    try:
+        quantiles = _quantiles(data)
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_cache_tables(conn)
+            resolved = _resolve_stage(conn, data)
+            summary = {"count": 0}
+            if resolved["stage_hash"]:
+                summary = summarize_curve_results(
+                    conn, resolved["dataset_fp"], resolved["stage_hash"],
+                    _param_index(data), quantiles
+                )
+        return {"status": "success", **resolved, "summary": summary}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to summarize results: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to summarize results: {str(e)}"
+        })
+
+
+@router.post("/histogram")
+async def results_histogram(data: Dict[str, Any]):
+    """Histogram of a stored fit parameter (optionally on a log10 axis)."""
+    bins = data.get("bins", 50)
+    value_range = data.get("range")
+    try:
+        if not isinstance(bins, int) or bins < 1 or bins > MAX_HISTOGRAM_BINS:
+            raise ValueError(f"bins must be an integer between 1 and {MAX_HISTOGRAM_BINS}")
+        if value_range is not None and (not isinstance(value_range, list) or len(value_range) != 2):
+            raise ValueError("range must be a [min, max] list")
+
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_cache_tables(conn)
+            resolved = _resolve_stage(conn, data)
+            histogram = {"edges": [], "counts": [], "log_scale": bool(data.get("log", False))}
+            if resolved["stage_hash"]:
+                histogram = histogram_curve_results(
+                    conn, resolved["dataset_fp"], resolved["stage_hash"], _param_index(data),
+                    bins, bool(data.get("log", False)), value_range
+                )
+        return {"status": "success", **resolved, "histogram": histogram}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to build results histogram: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to build histogram: {str(e)}"
+        })
+
+
+@router.post("/grouped")
+async def results_grouped(data: Dict[str, Any]):
+    """Per-group statistics of a stored fit parameter, grouped by sample, file_id or instrument."""
+    group_by = data.get("group_by", "sample")
+    try:
+        with duckdb.connect(DB_PATH) as conn:
+            ensure_cache_tables(conn)
+            resolved = _resolve_stage(conn, data)
+            groups = []
+            if resolved["stage_hash"]:
+                groups = group_curve_results(
+                    conn, resolved["dataset_fp"], resolved["stage_hash"], group_by, _param_index(data)
+                )
+        return {"status": "success", **resolved, "group_by": group_by, "groups": groups}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Failed to compute grouped results: {str(e)}")
+        raise HTTPException(status_code=500, detail={
+            "status": "error",
+            "message": f"Failed to compute grouped statistics: {str(e)}"
+        })
@@ -1 +1 @@
-from .duckdb_storage import save_to_duckdb
\ No newline at end of file
+from .duckdb_storage import save_to_duckdb, save_curve_chunks_to_duckdb
\ No newline at end of file
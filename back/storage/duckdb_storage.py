@@ -1,119 +1,480 @@
 import os
+import json
+import hashlib
 import duckdb
-from typing import Dict
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from models.force_curve import ForceCurve
+from file_types.parquet import lazy_parquet_columns
 
-def save_to_duckdb(curves: Dict[str, ForceCurve], db_path: str) -> None:
-    """Saves ForceCurve objects to DuckDB with one row per segment."""
+def _update_fingerprint(digest, curves: Iterable[Tuple[str, ForceCurve]]) -> None:
+    for curve_name, curve in curves:
+        digest.update(f"{curve_name}|{curve.file_id}|{curve.spring_constant}|{curve.tip_geometry}|{curve.tip_radius}".encode("utf-8"))
+        for segment in curve.segments:
+            digest.update(segment.type.encode("utf-8"))
+            digest.update(segment.deflection.tobytes())
+            digest.update(segment.z_sensor.tobytes())
+
+def compute_fingerprint(curves: Dict[str, ForceCurve]) -> str:
+    """Content hash of the curve arrays and per-curve metadata, identifying one ingested dataset."""
+    digest = hashlib.md5()
+    _update_fingerprint(digest, curves.items())
+    return digest.hexdigest()
+
+# Curves loaded per INSERT ... SELECT; bounds the size of the staged relation
+DEFAULT_INGEST_CHUNK_SIZE = 1000
+
+FORCE_VS_Z_COLUMNS = (
+    "curve_id", "segment_type", "force_values", "z_values", "indentation_values", "elasticity_values",
+    "file_id", "date", "instrument", "sample", "spring_constant", "inv_ols", "tip_geometry", "tip_radius",
+    "tip_angle", "sampling_rate", "velocity", "no_points", "fmodel_params", "fmodel_name",
+    "emodel_params", "emodel_name", "contact_point_z", "contact_point_force",
+)
+
+# Physical curve storage for every ingested dataset; force_vs_z is a view over the active one
+CURVE_STORE_TABLE = "force_vs_z_all"
+
+# Storage profile -> (curve store table, element type of the raw array columns).
+# float32 halves array scans, memory and file size; instrument data rarely carries
+# more precision. The force_vs_z view widens arrays back to DOUBLE[] for compute.
+STORAGE_PROFILES = {
+    "float64": (CURVE_STORE_TABLE, "DOUBLE"),
+    "float32": ("force_vs_z_f32", "FLOAT"),
+}
+DEFAULT_STORAGE_PROFILE = "float64"
+ARRAY_COLUMNS = ("force_values", "z_values", "indentation_values", "elasticity_values")
+
+# Zero-ingest datasets: the catalogue keeps only where each curve lives in its source
+# file (plus its metadata); values are read on demand by storage.lazy_source
+LAZY_CURVES_TABLE = "lazy_curves"
+LAZY_BACKENDS = ("hdf5", "parquet")
+# Lazy backends whose force_vs_z view has no values of its own: lazy_curve_scope
+# fills them per query. Parquet views scan the file directly instead.
+SCOPED_LAZY_BACKENDS = ("hdf5",)
+# force_vs_z columns a lazy dataset has no stored values for, with their types
+LAZY_NULL_COLUMNS = {
+    "force_values": "DOUBLE[]", "z_values": "DOUBLE[]", "indentation_values": "DOUBLE[]",
+    "elasticity_values": "DOUBLE[]", "fmodel_params": "DOUBLE[]", "fmodel_name": "TEXT",
+    "emodel_params": "DOUBLE[]", "emodel_name": "TEXT", "contact_point_z": "DOUBLE",
+    "contact_point_force": "DOUBLE",
+}
+
+def lazy_view_columns(values_alias: Optional[str] = None) -> str:
+    """
+    force_vs_z select list over lazy_curves (aliased l). With values_alias, force
+    and z values come from that relation's force_values/z_values columns.
+    """
+    columns = []
+    for column in FORCE_VS_Z_COLUMNS:
+        if values_alias and column in ("force_values", "z_values"):
+            columns.append(f"CAST({values_alias}.{column} AS DOUBLE[]) AS {column}")
+        elif column in LAZY_NULL_COLUMNS:
+            columns.append(f"NULL::{LAZY_NULL_COLUMNS[column]} AS {column}")
+        else:
+            columns.append(f"l.{column}")
+    return ", ".join(columns)
+
+def _storage_profile(storage_profile: str) -> Tuple[str, str]:
+    if storage_profile not in STORAGE_PROFILES:
+        raise ValueError(f"storage_profile must be one of: {', '.join(STORAGE_PROFILES)}")
+    return STORAGE_PROFILES[storage_profile]
+
+def create_force_vs_z_table(conn: duckdb.DuckDBPyConnection, storage_profile: str = DEFAULT_STORAGE_PROFILE) -> None:
+    """Create a curve store, one row per curve segment, partitioned by dataset_id."""
+    table_name, element_type = _storage_profile(storage_profile)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            dataset_id INTEGER,
+            curve_id INTEGER,
+            segment_type TEXT,
+            force_values {element_type}[],
+            z_values {element_type}[],
+            indentation_values {element_type}[],
+            elasticity_values {element_type}[],
+            file_id TEXT,
+            date TEXT,
+            instrument TEXT,
+            sample TEXT,
+            spring_constant DOUBLE,
+            inv_ols DOUBLE,
+            tip_geometry TEXT,
+            tip_radius DOUBLE,
+            tip_angle DOUBLE,
+            sampling_rate DOUBLE,
+            velocity DOUBLE,
+            no_points INTEGER,
+            fmodel_params DOUBLE[],
+            fmodel_name TEXT,
+            emodel_params DOUBLE[],
+            emodel_name TEXT,
+            contact_point_z DOUBLE,
+            contact_point_force DOUBLE,
+            PRIMARY KEY (dataset_id, curve_id, segment_type)
+        )
+    """)
+
+def _table_type(conn: duckdb.DuckDBPyConnection, name: str) -> Optional[str]:
+    row = conn.execute(
+        "SELECT table_type FROM information_schema.tables WHERE table_name = ? AND table_schema = 'main'", [name]
+    ).fetchone()
+    return row[0] if row else None
+
+def _legacy_fingerprint(conn: duckdb.DuckDBPyConnection) -> str:
+    """Fingerprint of a pre-catalogue force_vs_z table, derived as db.get_dataset_fingerprint's fallback does."""
+    row = conn.execute("""
+        SELECT COUNT(*), SUM(no_points), MIN(curve_id), MAX(curve_id),
+               SUM(force_values[1]), SUM(z_values[-1]),
+               string_agg(DISTINCT file_id, ',')
+        FROM force_vs_z
+    """).fetchone()
+    return hashlib.md5(json.dumps([str(v) for v in row], sort_keys=True).encode()).hexdigest()
+
+def _next_dataset_id(conn: duckdb.DuckDBPyConnection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(dataset_id), 0) + 1 FROM datasets").fetchone()[0]
+
+def ensure_dataset_tables(conn: duckdb.DuckDBPyConnection) -> None:
+    """
+    Create the dataset catalogue and the partitioned curve store. A database from
+    before the catalogue (force_vs_z / dataset_info as plain tables) is migrated in
+    place into a dataset of its own, keeping its fingerprint so cached fit results
+    stay valid.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS datasets (
+            dataset_id INTEGER PRIMARY KEY,
+            fingerprint VARCHAR UNIQUE,
+            name VARCHAR,
+            curve_count INTEGER,
+            created_at TIMESTAMP DEFAULT current_timestamp,
+            last_used_at TIMESTAMP DEFAULT current_timestamp,
+            storage_profile VARCHAR DEFAULT 'float64'
+        )
+    """)
+    conn.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS storage_profile VARCHAR DEFAULT 'float64'")
+    conn.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS backend VARCHAR DEFAULT 'duckdb'")
+    conn.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS source_path VARCHAR")
+    conn.execute("ALTER TABLE datasets ADD COLUMN IF NOT EXISTS source_options JSON")
+    for storage_profile in STORAGE_PROFILES:
+        create_force_vs_z_table(conn, storage_profile)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {LAZY_CURVES_TABLE} (
+            dataset_id INTEGER,
+            curve_id INTEGER,
+            segment_type TEXT,
+            force_location VARCHAR,
+            z_location VARCHAR,
+            no_points INTEGER,
+            file_id TEXT,
+            date TEXT,
+            instrument TEXT,
+            sample TEXT,
+            spring_constant DOUBLE,
+            inv_ols DOUBLE,
+            tip_geometry TEXT,
+            tip_radius DOUBLE,
+            tip_angle DOUBLE,
+            sampling_rate DOUBLE,
+            velocity DOUBLE,
+            PRIMARY KEY (dataset_id, curve_id, segment_type)
+        )
+    """)
+    if _table_type(conn, "force_vs_z") != "BASE TABLE":
+        return
+
+    fingerprint = None
+    if _table_type(conn, "dataset_info") == "BASE TABLE":
+        row = conn.execute("SELECT fingerprint FROM dataset_info LIMIT 1").fetchone()
+        fingerprint = row[0] if row else None
+    fingerprint = fingerprint or _legacy_fingerprint(conn)
+    curve_count = conn.execute("SELECT COUNT(DISTINCT curve_id) FROM force_vs_z").fetchone()[0]
+    dataset_id = _next_dataset_id(conn)
+    conn.execute(f"""
+        INSERT INTO {CURVE_STORE_TABLE} (dataset_id, {", ".join(FORCE_VS_Z_COLUMNS)})
+        SELECT ?, {", ".join(FORCE_VS_Z_COLUMNS)} FROM force_vs_z
+    """, [dataset_id])
+    conn.execute("INSERT INTO datasets (dataset_id, fingerprint, name, curve_count) VALUES (?, ?, ?, ?)",
+                 [dataset_id, fingerprint, "migrated", curve_count])
+    conn.execute("DROP TABLE force_vs_z")
+    conn.execute("DROP TABLE IF EXISTS dataset_info")
+    activate_dataset(conn, dataset_id)
+    print(f"📦 Migrated existing force_vs_z into dataset {dataset_id}")
+
+def _dataset_store(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> Tuple[str, str]:
+    """(table, array element type) holding a stored dataset's curves."""
+    row = conn.execute("SELECT storage_profile FROM datasets WHERE dataset_id = ?", [int(dataset_id)]).fetchone()
+    if row is None:
+        raise ValueError(f"Dataset {dataset_id} not found")
+    return _storage_profile(row[0] or DEFAULT_STORAGE_PROFILE)
+
+def _dataset_backend(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> str:
+    """'duckdb' for ingested datasets, else the source format of a lazy one."""
+    row = conn.execute("SELECT backend FROM datasets WHERE dataset_id = ?", [int(dataset_id)]).fetchone()
+    if row is None:
+        raise ValueError(f"Dataset {dataset_id} not found")
+    return row[0] or "duckdb"
+
+def _parquet_view_columns(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> str:
+    """force_vs_z select list and FROM clause reading a Parquet-backed dataset in place."""
+    source_path, source_options = conn.execute(
+        "SELECT source_path, source_options FROM datasets WHERE dataset_id = ?", [dataset_id]
+    ).fetchone()
+    if not source_path or not os.path.exists(source_path):
+        raise ValueError(f"Source file of dataset {dataset_id} not found: {source_path}")
+    options = json.loads(source_options)
+    source, expressions = lazy_parquet_columns(source_path, options["force_path"], options["z_path"], options["metadata"])
+    columns = ", ".join(
+        f"{expressions[column]} AS {column}" if column in expressions else f"NULL::{LAZY_NULL_COLUMNS[column]} AS {column}"
+        for column in FORCE_VS_Z_COLUMNS
+    )
+    return f"{columns} FROM {source}"
+
+def activate_dataset(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> None:
+    """
+    Point the force_vs_z and dataset_info views at one stored dataset. Every query,
+    cache lookup and export reading those views is then scoped to it, so switching
+    experiments is a catalogue update rather than a re-ingest.
+    """
+    dataset_id = int(dataset_id)
+    backend = _dataset_backend(conn, dataset_id)
+    if backend == "parquet":
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW force_vs_z AS
+            SELECT {_parquet_view_columns(conn, dataset_id)}
+        """)
+    elif backend in LAZY_BACKENDS:
+        # Curve index and metadata only; the arrays are filled in per query by storage.lazy_source
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW force_vs_z AS
+            SELECT {lazy_view_columns()} FROM {LAZY_CURVES_TABLE} l WHERE l.dataset_id = {dataset_id}
+        """)
+    else:
+        table_name, element_type = _dataset_store(conn, dataset_id)
+        columns = ", ".join(
+            f"CAST({column} AS DOUBLE[]) AS {column}" if column in ARRAY_COLUMNS and element_type != "DOUBLE" else column
+            for column in FORCE_VS_Z_COLUMNS
+        )
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW force_vs_z AS
+            SELECT {columns} FROM {table_name} WHERE dataset_id = {dataset_id}
+        """)
+    conn.execute(f"""
+        CREATE OR REPLACE VIEW dataset_info AS
+        SELECT fingerprint, curve_count, dataset_id FROM datasets WHERE dataset_id = {dataset_id}
+    """)
+    conn.execute("UPDATE datasets SET last_used_at = current_timestamp WHERE dataset_id = ?", [dataset_id])
+
+def get_active_dataset_id(conn: duckdb.DuckDBPyConnection) -> Optional[int]:
+    """dataset_id behind the force_vs_z view, or None if nothing has been ingested yet."""
+    if _table_type(conn, "dataset_info") != "VIEW":
+        return None
+    row = conn.execute("SELECT dataset_id FROM dataset_info").fetchone()
+    return row[0] if row else None
+
+def list_datasets(conn: duckdb.DuckDBPyConnection) -> List[Dict]:
+    """Catalogue of stored datasets, most recently used first."""
+    ensure_dataset_tables(conn)
+    active_id = get_active_dataset_id(conn)
+    rows = conn.execute("""
+        SELECT dataset_id, fingerprint, name, curve_count, created_at, last_used_at, storage_profile, backend, source_path
+        FROM datasets ORDER BY last_used_at DESC, dataset_id DESC
+    """).fetchall()
+    return [
+        {
+            "dataset_id": dataset_id,
+            "fingerprint": fingerprint,
+            "name": name,
+            "curve_count": curve_count,
+            "created_at": str(created_at),
+            "last_used_at": str(last_used_at),
+            "storage_profile": storage_profile,
+            "backend": backend or "duckdb",
+            "source_path": source_path,
+            "active": dataset_id == active_id,
+        }
+        for dataset_id, fingerprint, name, curve_count, created_at, last_used_at, storage_profile, backend, source_path in rows
+    ]
+
+def delete_dataset(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> None:
+    """Remove a stored dataset together with its persisted fit results. The active dataset cannot be deleted."""
+    ensure_dataset_tables(conn)
+    dataset_id = int(dataset_id)
+    row = conn.execute("SELECT fingerprint FROM datasets WHERE dataset_id = ?", [dataset_id]).fetchone()
+    if row is None:
+        raise ValueError(f"Dataset {dataset_id} not found")
+    if get_active_dataset_id(conn) == dataset_id:
+        raise ValueError("Cannot delete the active dataset; activate another one first")
+    if _dataset_backend(conn, dataset_id) in LAZY_BACKENDS:
+        table_name = LAZY_CURVES_TABLE  # The source file itself is left alone
+    else:
+        table_name = _dataset_store(conn, dataset_id)[0]
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        conn.execute(f"DELETE FROM {table_name} WHERE dataset_id = ?", [dataset_id])
+        conn.execute("DELETE FROM datasets WHERE dataset_id = ?", [dataset_id])
+        for table in ("curve_results", "ingest_catalog"):
+            if _table_type(conn, table) == "BASE TABLE":
+                conn.execute(f"DELETE FROM {table} WHERE dataset_fp = ?", [row[0]])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _segment_frame(curves: List[Tuple[str, ForceCurve]], first_curve_id: int, dtype=np.float64) -> pd.DataFrame:
+    """
+    One row per segment; the array columns hold the ndarrays themselves
+    (no .tolist()), which DuckDB scans straight into list columns.
+    """
+    records = {name: [] for name in (
+        "curve_id", "segment_type", "force_values", "z_values", "file_id", "date", "instrument",
+        "sample", "spring_constant", "inv_ols", "tip_geometry", "tip_radius", "tip_angle",
+        "sampling_rate", "velocity", "no_points",
+    )}
+    for offset, (curve_name, curve) in enumerate(curves):
+        for segment in curve.segments:
+            records["curve_id"].append(first_curve_id + offset)
+            records["segment_type"].append(segment.type)
+            records["force_values"].append(np.asarray(segment.deflection, dtype=dtype))
+            records["z_values"].append(np.asarray(segment.z_sensor, dtype=dtype))
+            records["file_id"].append(curve.file_id)
+            records["date"].append(curve.date)
+            records["instrument"].append(curve.instrument)
+            records["sample"].append(curve.sample)
+            records["spring_constant"].append(curve.spring_constant)
+            records["inv_ols"].append(curve.inv_ols)
+            records["tip_geometry"].append(curve.tip_geometry)
+            records["tip_radius"].append(curve.tip_radius)
+            records["tip_angle"].append(getattr(curve, 'tip_angle', 30.0))  # Default tip angle
+            records["sampling_rate"].append(segment.sampling_rate)
+            records["velocity"].append(segment.velocity)
+            records["no_points"].append(segment.no_points)
+    return pd.DataFrame({name: pd.Series(values, dtype=object) for name, values in records.items()})
+
+def insert_curve_chunk(conn: duckdb.DuckDBPyConnection, curves: List[Tuple[str, ForceCurve]], first_curve_id: int, dataset_id: int, storage_profile: str = DEFAULT_STORAGE_PROFILE) -> int:
+    """Bulk-load a chunk of curves into dataset_id's partition with a single INSERT ... SELECT. Returns segment rows inserted."""
+    table_name, element_type = _storage_profile(storage_profile)
+    frame = _segment_frame(curves, first_curve_id, np.float32 if element_type == "FLOAT" else np.float64)
+    if frame.empty:
+        return 0
+    # NaN samples are stored as NULL elements, as the row-wise insert did
+    conn.register("_ingest_chunk", frame)
+    try:
+        conn.execute(f"""
+            INSERT INTO {table_name} (dataset_id, {", ".join(FORCE_VS_Z_COLUMNS)})
+            SELECT
+                {int(dataset_id)}, CAST(curve_id AS INTEGER), segment_type,
+                CAST(force_values AS {element_type}[]), CAST(z_values AS {element_type}[]),
+                NULL, NULL,  -- indentation/elasticity values are calculated later
+                file_id, date, instrument, sample,
+                CAST(spring_constant AS DOUBLE), CAST(inv_ols AS DOUBLE), tip_geometry,
+                CAST(tip_radius AS DOUBLE), CAST(tip_angle AS DOUBLE),
+                CAST(sampling_rate AS DOUBLE), CAST(velocity AS DOUBLE), CAST(no_points AS INTEGER),
+                NULL, NULL, NULL, NULL, NULL, NULL  -- model results are filled in later
+            FROM _ingest_chunk
+        """)
+    finally:
+        conn.unregister("_ingest_chunk")
+    return len(frame)
+
+def save_curve_chunks_to_duckdb(chunks: Iterable[Dict[str, ForceCurve]], db_path: str, name: Optional[str] = None, storage_profile: str = DEFAULT_STORAGE_PROFILE) -> Dict[str, Any]:
+    """
+    Streaming variant of save_to_duckdb: consumes chunks of curves (e.g. from
+    Opener.process_chunks) and loads each one as it arrives, so only one chunk
+    is in memory at a time. Every ingest is appended as a new dataset and becomes
+    the active one; data identical to an already stored dataset re-activates that
+    dataset instead. Runs in a single transaction, so a failed or empty import
+    leaves the catalogue untouched. storage_profile picks the array precision
+    (see STORAGE_PROFILES). Returns the dataset it saved or re-activated as
+    {"dataset_id", "dataset_fp", "curve_count"}.
+    """
+    _storage_profile(storage_profile)
     print("🚀 Saving transformed data to DuckDB...")
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     conn = duckdb.connect(db_path)
     try:
-        conn.execute("DROP TABLE IF EXISTS force_vs_z")
-        conn.execute("""
-            CREATE TABLE force_vs_z (
-                curve_id INTEGER,
-                segment_type TEXT,
-                force_values DOUBLE[],
-                z_values DOUBLE[],
-                indentation_values DOUBLE[],
-                elasticity_values DOUBLE[],
-                file_id TEXT,
-                date TEXT,
-                instrument TEXT,
-                sample TEXT,
-                spring_constant DOUBLE,
-                inv_ols DOUBLE,
-                tip_geometry TEXT,
-                tip_radius DOUBLE,
-                tip_angle DOUBLE,
-                sampling_rate DOUBLE,
-                velocity DOUBLE,
-                no_points INTEGER,
-                fmodel_params DOUBLE[],
-                fmodel_name TEXT,
-                emodel_params DOUBLE[],
-                emodel_name TEXT,
-                contact_point_z DOUBLE,
-                contact_point_force DOUBLE,
-                PRIMARY KEY (curve_id, segment_type)
-            )
-        """)
-        batch_data = [
-            (
-                i,
-                segment.type,
-                segment.deflection.tolist(),
-                segment.z_sensor.tolist(),
-                None,  # indentation_values - will be calculated later
-                None,  # elasticity_values - will be calculated later
-                curve.file_id,
-                curve.date,
-                curve.instrument,
-                curve.sample,
-                curve.spring_constant,
-                curve.inv_ols,
-                curve.tip_geometry,
-                curve.tip_radius,
-                getattr(curve, 'tip_angle', 30.0),  # Default tip angle
-                segment.sampling_rate,
-                segment.velocity,
-                segment.no_points,
-                None,  # fmodel_params - will be calculated later
-                None,  # fmodel_name - will be set later
-                None,  # emodel_params - will be calculated later
-                None,  # emodel_name - will be set later
-                None,  # contact_point_z - will be calculated later
-                None,  # contact_point_force - will be calculated later
-            )
-            for i, (curve_name, curve) in enumerate(curves.items())
-            for segment in curve.segments
-        ]
-        conn.executemany(
-            """
-            INSERT INTO force_vs_z (
-                curve_id, segment_type, force_values, z_values, indentation_values, elasticity_values,
-                file_id, date, instrument, sample, spring_constant, inv_ols, tip_geometry, tip_radius,
-                tip_angle, sampling_rate, velocity, no_points, fmodel_params, fmodel_name,
-                emodel_params, emodel_name, contact_point_z, contact_point_force
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            batch_data
-        )
+        conn.execute("BEGIN TRANSACTION")
+        ensure_dataset_tables(conn)
+        dataset_id = _next_dataset_id(conn)
+        digest = hashlib.md5()
+        if storage_profile != DEFAULT_STORAGE_PROFILE:
+            # Reduced precision changes fit results, so it is a different dataset
+            digest.update(storage_profile.encode("utf-8"))
+        curve_count = 0
+        for chunk in chunks:
+            items = list(chunk.items())
+            _update_fingerprint(digest, items)
+            insert_curve_chunk(conn, items, curve_count, dataset_id, storage_profile)
+            curve_count += len(items)
+        if curve_count == 0:
+            raise ValueError("No valid curves found to save")
+
+        # The fingerprint keeps persisted fit results scoped to this data
+        fingerprint = digest.hexdigest()
+        existing = conn.execute("SELECT dataset_id FROM datasets WHERE fingerprint = ?", [fingerprint]).fetchone()
+        if existing is not None:
+            conn.execute("ROLLBACK")
+            conn.execute("BEGIN TRANSACTION")
+            activate_dataset(conn, existing[0])
+            conn.execute("COMMIT")
+            print(f"✅ Identical data already stored as dataset {existing[0]}; activated it")
+            return {"dataset_id": existing[0], "dataset_fp": fingerprint, "curve_count": curve_count}
+
+        conn.execute("INSERT INTO datasets (dataset_id, fingerprint, name, curve_count, storage_profile) VALUES (?, ?, ?, ?, ?)",
+                     [dataset_id, fingerprint, name, curve_count, storage_profile])
+        activate_dataset(conn, dataset_id)
+        conn.execute("COMMIT")
+
         row_count = conn.execute("SELECT COUNT(*) FROM force_vs_z").fetchone()[0]
-        print(f"✅ Inserted {row_count} rows into {db_path}!")
-
-        # Test query to verify data
-        print("Testing query for curve_id = 0:")
-        result = conn.execute("""
-            SELECT curve_id,
-                   z_values,
-                   force_values
-            FROM force_vs_z
-            WHERE curve_id = 0
-        """).fetchall()
-        # print("Query result:", result)
-
-    except duckdb.Error as e:
-        print(f"❌ DuckDB error: {e}")
+        print(f"✅ Inserted {row_count} rows into {db_path} as dataset {dataset_id}!")
+        return {"dataset_id": dataset_id, "dataset_fp": fingerprint, "curve_count": curve_count}
+
+    except Exception as e:
+        try:
+            conn.execute("ROLLBACK")
+        except duckdb.Error:
+            pass  # No open transaction (e.g. BEGIN itself failed)
+        if isinstance(e, duckdb.Error):
+            print(f"❌ DuckDB error: {e}")
         raise
     finally:
         conn.close()
 
+def save_to_duckdb(curves: Dict[str, ForceCurve], db_path: str, chunk_size: int = DEFAULT_INGEST_CHUNK_SIZE, storage_profile: str = DEFAULT_STORAGE_PROFILE) -> None:
+    """
+    Saves ForceCurve objects to DuckDB with one row per segment.
+    Curves are bulk-loaded chunk_size at a time, so the staged copy of the
+    data never exceeds one chunk.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    items = list(curves.items())
+    save_curve_chunks_to_duckdb(
+        (dict(items[start:start + chunk_size]) for start in range(0, len(items), chunk_size)),
+        db_path,
+        storage_profile=storage_profile,
+    )
+
 def update_curve_data(db_path: str, curve_id: int, updates: Dict) -> None:
-    """Update specific fields for a curve in the database."""
+    """Update specific fields for a curve of the active dataset."""
     conn = duckdb.connect(db_path)
     try:
+        ensure_dataset_tables(conn)
+        dataset_id = get_active_dataset_id(conn)
+        if dataset_id is None:
+            raise ValueError("No dataset loaded")
+        if _dataset_backend(conn, dataset_id) in LAZY_BACKENDS:
+            raise ValueError("The active dataset is read in place from its source file and cannot be updated")
+        table_name = _dataset_store(conn, dataset_id)[0]
         for field, value in updates.items():
             if field in ['indentation_values', 'elasticity_values', 'fmodel_params', 'emodel_params']:
                 # Handle array fields
                 if value is not None:
-                    conn.execute(f"UPDATE force_vs_z SET {field} = ? WHERE curve_id = ?", [value, curve_id])
+                    conn.execute(f"UPDATE {table_name} SET {field} = ? WHERE dataset_id = ? AND curve_id = ?", [value, dataset_id, curve_id])
             elif field in ['fmodel_name', 'emodel_name']:
                 # Handle text fields
-                conn.execute(f"UPDATE force_vs_z SET {field} = ? WHERE curve_id = ?", [value, curve_id])
+                conn.execute(f"UPDATE {table_name} SET {field} = ? WHERE dataset_id = ? AND curve_id = ?", [value, dataset_id, curve_id])
             elif field in ['contact_point_z', 'contact_point_force']:
                 # Handle numeric fields
-                conn.execute(f"UPDATE force_vs_z SET {field} = ? WHERE curve_id = ?", [value, curve_id])
+                conn.execute(f"UPDATE {table_name} SET {field} = ? WHERE dataset_id = ? AND curve_id = ?", [value, dataset_id, curve_id])
     finally:
         conn.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import duckdb
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from metrics import record_cache
+
+# Finished export artifacts, named by the hash of what produced them
+EXPORT_CACHE_DIR = os.path.join("data", "export_cache")
+# Least recently used artifacts are evicted beyond either limit
+EXPORT_CACHE_MAX_BYTES = 2 << 30
+EXPORT_CACHE_MAX_ENTRIES = 64
+
+def _dataset_state(db_path: str, params: Dict[str, Any]) -> List[Any]:
+    """
+    What the export reads from the database: the active dataset's fingerprint, plus
+    the persisted fit results when those are what gets exported (they grow as
+    curves are fitted, without the fingerprint changing).
+    """
+    from db import get_dataset_fingerprint  # Deferred: db pulls in the whole filter pipeline
+    with duckdb.connect(db_path) as conn:
+        fingerprint = get_dataset_fingerprint(conn)
+        state: List[Any] = [fingerprint]
+        if params.get("content") == "results":
+            try:
+                state += list(conn.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(hash(curve_id, stage_hash, e_modulus)), 0)
+                    FROM curve_results WHERE dataset_fp = ?
+                """, [fingerprint]).fetchone())
+            except duckdb.CatalogException:
+                pass  # No results table yet
+    return state
+
+def export_cache_key(db_path: str, extension: str, curve_ids: Optional[List[int]], params: Dict[str, Any]) -> str:
+    """Identity of one export: the dataset it reads, the format, the curves and every export parameter."""
+    payload = {
+        "dataset": _dataset_state(db_path, params),
+        "extension": extension,
+        "curve_ids": curve_ids or [],
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _artifact_paths(key: str, extension: str) -> Tuple[str, str]:
+    return os.path.join(EXPORT_CACHE_DIR, f"{key}.{extension}"), os.path.join(EXPORT_CACHE_DIR, f"{key}.json")
+
+def _publish(artifact_path: str, export_path: str) -> None:
+    """Make the artifact available at export_path: a hard link when possible, else a copy. Replaces any existing file."""
+    tmp_path = f"{export_path}.{uuid.uuid4().hex}.part"
+    try:
+        try:
+            os.link(artifact_path, tmp_path)
+        except OSError:
+            shutil.copyfile(artifact_path, tmp_path)  # Different filesystem, or links not supported
+        os.replace(tmp_path, export_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _lookup(key: str, extension: str) -> Optional[Dict[str, Any]]:
+    artifact_path, manifest_path = _artifact_paths(key, extension)
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(artifact_path):
+        return None
+    now = time.time()
+    os.utime(manifest_path, (now, now))  # Recency for eviction
+    return manifest
+
+def evict_exports(max_bytes: int = EXPORT_CACHE_MAX_BYTES, max_entries: int = EXPORT_CACHE_MAX_ENTRIES) -> int:
+    """Drop least recently used artifacts until the cache fits both limits. Returns the number evicted."""
+    if not os.path.isdir(EXPORT_CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(EXPORT_CACHE_DIR):
+        if not name.endswith(".json") or name.startswith("."):
+            continue
+        manifest_path = os.path.join(EXPORT_CACHE_DIR, name)
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            artifact_path = _artifact_paths(name[:-len(".json")], manifest["extension"])[0]
+            size = os.path.getsize(artifact_path) if os.path.exists(artifact_path) else 0
+            entries.append((os.path.getmtime(manifest_path), size, manifest_path, artifact_path))
+        except (OSError, ValueError, KeyError):
+            continue
+    entries.sort(reverse=True)  # Most recently used first
+    total_bytes, evicted = 0, 0
+    for index, (_, size, manifest_path, artifact_path) in enumerate(entries):
+        total_bytes += size
+        if index < max_entries and total_bytes <= max_bytes:
+            continue
+        for path in (manifest_path, artifact_path):
+            if os.path.exists(path):
+                os.remove(path)
+        evicted += 1
+    return evicted
+
+def cached_export(key: str, extension: str, export_path: str, produce: Callable[[str], int], refresh: bool = False) -> Tuple[int, bool]:
+    """
+    Place the export identified by key at export_path. A cached artifact is linked
+    there at once; otherwise (or with refresh) produce(output_path) writes it into
+    the cache first, returning the number of curves exported. Files are only ever
+    replaced, never rewritten in place, so linked copies stay intact.
+    Returns (exported_curves, from_cache).
+    """
+    manifest = None if refresh else _lookup(key, extension)
+    if not refresh:
+        record_cache("export", manifest is not None, manifest is None)
+    if manifest is not None:
+        _publish(_artifact_paths(key, extension)[0], export_path)
+        return manifest["exported_curves"], True
+
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    artifact_path, manifest_path = _artifact_paths(key, extension)
+    # Hidden, unique name while being written; never picked up by lookups or eviction
+    tmp_path = os.path.join(EXPORT_CACHE_DIR, f".{key}.{uuid.uuid4().hex}.{extension}")
+    try:
+        exported_curves = produce(tmp_path)
+        os.replace(tmp_path, artifact_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    with open(manifest_path, "w") as f:
+        json.dump({"extension": extension, "exported_curves": exported_curves, "created_at": time.time()}, f)
+    _publish(artifact_path, export_path)
+    evict_exports()
+    return exported_curves, False
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import duckdb
+from typing import Any, Dict, Optional, Tuple
+
+# Bytes read per step when hashing uploads and files on disk
+HASH_CHUNK_SIZE = 1 << 20
+
+# (path, size, mtime_ns) -> content hash, filled when an upload is written so
+# /process-file does not have to re-read the file to identify it
+_content_hashes: Dict[Tuple[str, int, int], str] = {}
+
+def _file_key(file_path: str) -> Tuple[str, int, int]:
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+def new_content_hash():
+    """Digest used for upload content hashes."""
+    return hashlib.sha256()
+
+def remember_content_hash(file_path: str, content_hash: str) -> None:
+    """Record the hash computed while a file was being written."""
+    _content_hashes[_file_key(file_path)] = content_hash
+
+def file_content_hash(file_path: str) -> str:
+    """Content hash of a file on disk; reuses the upload-time hash while the file is unchanged."""
+    key = _file_key(file_path)
+    cached = _content_hashes.get(key)
+    if cached:
+        return cached
+    digest = new_content_hash()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    _content_hashes[key] = digest.hexdigest()
+    return _content_hashes[key]
+
+def ingest_key(content_hash: str, file_type: str, force_path: str, z_path: str, metadata: Dict[str, Any], storage_profile: str = "float64") -> str:
+    """Identity of one ingest: the file content plus every selection that shapes the stored curves."""
+    payload = {
+        "content_hash": content_hash,
+        "file_type": file_type,
+        "force_path": force_path,
+        "z_path": z_path,
+        "metadata": metadata,
+    }
+    if storage_profile != "float64":
+        payload["storage_profile"] = storage_profile
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def ensure_ingest_catalog(conn: duckdb.DuckDBPyConnection) -> None:
+    """Create the ingest catalogue table if it doesn't exist."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_catalog (
+            ingest_key VARCHAR PRIMARY KEY,
+            content_hash VARCHAR,
+            file_type VARCHAR,
+            force_path VARCHAR,
+            z_path VARCHAR,
+            metadata JSON,
+            dataset_fp VARCHAR,
+            curve_count INTEGER,
+            ingested_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+
+def find_stored_ingest(db_path: str, key: str) -> Optional[Dict[str, Any]]:
+    """
+    Catalogue entry for key, provided the dataset it produced is still stored.
+    None means the file must be ingested.
+    """
+    if not os.path.exists(db_path):
+        return None
+    conn = duckdb.connect(db_path)
+    try:
+        ensure_ingest_catalog(conn)
+        row = conn.execute("""
+            SELECT d.dataset_id, c.dataset_fp, c.curve_count
+            FROM ingest_catalog c
+            JOIN datasets d ON d.fingerprint = c.dataset_fp
+            WHERE c.ingest_key = ?
+        """, [key]).fetchone()
+    except duckdb.CatalogException:
+        return None  # No dataset catalogue yet: nothing has been ingested
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"dataset_id": row[0], "dataset_fp": row[1], "curve_count": row[2]}
+
+def record_ingest(db_path: str, key: str, content_hash: str, file_type: str, force_path: str, z_path: str, metadata: Dict[str, Any], dataset: Dict[str, Any]) -> None:
+    """Catalogue under key the dataset save_curve_chunks_to_duckdb saved or re-activated for this ingest."""
+    conn = duckdb.connect(db_path)
+    try:
+        ensure_ingest_catalog(conn)
+        conn.execute("""
+            INSERT OR REPLACE INTO ingest_catalog
+                (ingest_key, content_hash, file_type, force_path, z_path, metadata, dataset_fp, curve_count, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, current_timestamp)
+        """, [key, content_hash, file_type, force_path, z_path, json.dumps(metadata, sort_keys=True, default=str), dataset["dataset_fp"], dataset["curve_count"]])
+    finally:
+        conn.close()
@@ -0,0 +1,204 @@
+import os
+import json
+import hashlib
+import duckdb
+import pandas as pd
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from file_types.hdf5 import scan_hdf5_curves, read_hdf5_curve_values
+from file_types.parquet import count_lazy_parquet_curves
+from models.curve_batch import CurveBatch
+from storage.duckdb_storage import (
+    LAZY_CURVES_TABLE, LAZY_BACKENDS, SCOPED_LAZY_BACKENDS, ensure_dataset_tables, activate_dataset, get_active_dataset_id,
+    lazy_view_columns, _next_dataset_id, _dataset_backend,
+)
+from transform.transform import subtract_baseline
+
+# Relation the values read for one query are registered under
+LAZY_VALUES_RELATION = "_lazy_values"
+
+def _lazy_fingerprint(file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any]) -> str:
+    """
+    Identity of a lazily registered file: its location, size and modification time
+    plus the selections. Hashing the content would mean reading the whole file,
+    which is what zero-ingest avoids.
+    """
+    stat = os.stat(file_path)
+    payload = [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, force_path, z_path, metadata]
+    return hashlib.md5(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _register_lazy(db_path: str, backend: str, file_path: str, fingerprint: str, curve_count: int, name: Optional[str],
+                   insert_index: Optional[Callable[[duckdb.DuckDBPyConnection, int], None]] = None,
+                   source_options: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """
+    Catalogue a source file as a dataset of the given backend and activate it; an
+    unchanged file registered before is re-activated instead. insert_index writes the
+    per-curve index rows for the new dataset_id. Returns (dataset_id, curve_count).
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = duckdb.connect(db_path)
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        ensure_dataset_tables(conn)
+        existing = conn.execute("SELECT dataset_id, curve_count FROM datasets WHERE fingerprint = ?", [fingerprint]).fetchone()
+        if existing is not None:
+            activate_dataset(conn, existing[0])
+            conn.execute("COMMIT")
+            print(f"✅ {file_path} already registered as dataset {existing[0]}; activated it")
+            return existing[0], existing[1]
+
+        dataset_id = _next_dataset_id(conn)
+        if insert_index is not None:
+            insert_index(conn, dataset_id)
+        conn.execute("""
+            INSERT INTO datasets (dataset_id, fingerprint, name, curve_count, backend, source_path, source_options)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            dataset_id, fingerprint, name, curve_count, backend, os.path.abspath(file_path),
+            json.dumps(source_options, default=str) if source_options is not None else None,
+        ])
+        activate_dataset(conn, dataset_id)
+        conn.execute("COMMIT")
+        print(f"✅ Registered {curve_count} curves of {file_path} in place as dataset {dataset_id}")
+        return dataset_id, curve_count
+    except Exception:
+        try:
+            conn.execute("ROLLBACK")
+        except duckdb.Error:
+            pass  # No open transaction (e.g. BEGIN itself failed)
+        raise
+    finally:
+        conn.close()
+
+def register_lazy_hdf5(db_path: str, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], name: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Catalogue an HDF5 file as a dataset without copying its curves: only dataset
+    locations, lengths and metadata are stored, and the dataset becomes the active
+    one. Registering the same unchanged file again re-activates the existing
+    dataset. Returns (dataset_id, curve_count).
+    """
+    entries, validated_metadata = scan_hdf5_curves(file_path, force_path, z_path, metadata)
+    if not entries:
+        raise ValueError("No valid Force and Z datasets found in HDF5")
+
+    def insert_index(conn: duckdb.DuckDBPyConnection, dataset_id: int) -> None:
+        index = pd.DataFrame({
+            "curve_id": range(len(entries)),
+            "force_location": [entry["force_location"] for entry in entries],
+            "z_location": [entry["z_location"] for entry in entries],
+            "no_points": [entry["no_points"] for entry in entries],
+        })
+        conn.register("_lazy_index", index)
+        try:
+            conn.execute(f"""
+                INSERT INTO {LAZY_CURVES_TABLE}
+                SELECT ?, CAST(curve_id AS INTEGER), 'approach', force_location, z_location,
+                       CAST(no_points AS INTEGER), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                FROM _lazy_index
+            """, [
+                dataset_id,
+                validated_metadata["file_id"], validated_metadata["date"], validated_metadata["instrument"],
+                validated_metadata["sample"], float(validated_metadata["spring_constant"]),
+                float(validated_metadata["inv_ols"]), validated_metadata["tip_geometry"],
+                float(validated_metadata["tip_radius"]), float(validated_metadata.get("tip_angle", 30.0)),
+                float(validated_metadata["sampling_rate"]), float(validated_metadata["velocity"]),
+            ])
+        finally:
+            conn.unregister("_lazy_index")
+
+    fingerprint = _lazy_fingerprint(file_path, force_path, z_path, validated_metadata)
+    return _register_lazy(db_path, "hdf5", file_path, fingerprint, len(entries), name, insert_index=insert_index)
+
+def register_lazy_parquet(db_path: str, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], name: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Catalogue a Parquet file as a dataset read in place: force_vs_z becomes a view
+    scanning the file, so nothing but the catalogue row is written and DuckDB reads
+    only the row groups and columns a query needs.
+    """
+    if not os.path.exists(file_path):
+        raise ValueError(f"File not found: {file_path}")
+    curve_count = count_lazy_parquet_curves(file_path, force_path, z_path)
+    if not curve_count:
+        raise ValueError("No valid Force and Z data in Parquet file")
+    fingerprint = _lazy_fingerprint(file_path, force_path, z_path, metadata)
+    source_options = {"force_path": force_path, "z_path": z_path, "metadata": metadata}
+    return _register_lazy(db_path, "parquet", file_path, fingerprint, curve_count, name, source_options=source_options)
+
+_LAZY_REGISTRARS = {"hdf5": register_lazy_hdf5, "parquet": register_lazy_parquet}
+
+def register_lazy_dataset(db_path: str, file_type: str, file_path: str, force_path: str, z_path: str, metadata: Dict[str, Any], name: Optional[str] = None) -> Tuple[int, int]:
+    """Register file_path in place with the backend for its file_type (one of LAZY_BACKENDS)."""
+    if file_type not in _LAZY_REGISTRARS:
+        raise ValueError(f"lazy mode is only available for: {', '.join(LAZY_BACKENDS)}")
+    return _LAZY_REGISTRARS[file_type](db_path, file_path, force_path, z_path, metadata, name=name)
+
+def get_lazy_source(conn: duckdb.DuckDBPyConnection) -> Optional[Dict[str, Any]]:
+    """dataset_id, backend and source_path of the active dataset if its values are read per query, else None."""
+    dataset_id = get_active_dataset_id(conn)
+    if dataset_id is None or _dataset_backend(conn, dataset_id) not in SCOPED_LAZY_BACKENDS:
+        return None
+    backend, source_path = conn.execute(
+        "SELECT backend, source_path FROM datasets WHERE dataset_id = ?", [dataset_id]
+    ).fetchone()
+    return {"dataset_id": dataset_id, "backend": backend, "source_path": source_path}
+
+def read_lazy_curves(conn: duckdb.DuckDBPyConnection, source: Dict[str, Any], curve_ids: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    Values of the requested curves (all when curve_ids is None), read from the
+    source file and baseline-corrected exactly as transform_data does at ingest.
+    One row per (curve_id, segment_type) with force_values and z_values.
+    """
+    query = f"""
+        SELECT curve_id, segment_type, force_location, z_location, no_points
+        FROM {LAZY_CURVES_TABLE} WHERE dataset_id = ?
+    """
+    params: List[Any] = [source["dataset_id"]]
+    if curve_ids is not None:
+        if not curve_ids:
+            return pd.DataFrame({"curve_id": [], "segment_type": [], "force_values": [], "z_values": []})
+        query += " AND curve_id IN ({})".format(",".join("?" for _ in curve_ids))
+        params += [int(curve_id) for curve_id in curve_ids]
+    rows = conn.execute(query + " ORDER BY curve_id", params).fetchall()
+
+    forces, zs = read_hdf5_curve_values(source["source_path"], [(row[2], row[3], row[4]) for row in rows])
+    batch = CurveBatch.from_arrays([row[0] for row in rows], force=forces, z=zs)
+    subtract_baseline(batch)
+    return pd.DataFrame({
+        "curve_id": pd.Series([row[0] for row in rows], dtype="int64"),
+        "segment_type": [row[1] for row in rows],
+        "force_values": pd.Series(batch.arrays("force"), dtype=object),
+        "z_values": pd.Series(batch.arrays("z"), dtype=object),
+    })
+
+def _has_lazy_scope(conn: duckdb.DuckDBPyConnection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM duckdb_views() WHERE view_name = 'force_vs_z' AND temporary"
+    ).fetchone() is not None
+
+@contextmanager
+def lazy_curve_scope(conn: duckdb.DuckDBPyConnection, curve_ids: Optional[List[int]] = None) -> Iterator[None]:
+    """
+    While active, force_vs_z on this connection carries real values for
+    curve_ids (all curves when None) of a lazily registered dataset: they are read
+    from the source file and a temporary force_vs_z view shadows the catalogue
+    view. Only the curves a request touches cost any I/O. A no-op for ingested
+    and Parquet-backed datasets and inside an enclosing scope.
+    """
+    source = get_lazy_source(conn)
+    if source is None or _has_lazy_scope(conn):
+        yield
+        return
+    conn.register(LAZY_VALUES_RELATION, read_lazy_curves(conn, source, curve_ids))
+    try:
+        conn.execute(f"""
+            CREATE TEMP VIEW force_vs_z AS
+            SELECT {lazy_view_columns("v")}
+            FROM {LAZY_CURVES_TABLE} l
+            JOIN {LAZY_VALUES_RELATION} v ON v.curve_id = l.curve_id AND v.segment_type = l.segment_type
+            WHERE l.dataset_id = {int(source["dataset_id"])}
+        """)
+        yield
+    finally:
+        conn.execute("DROP VIEW IF EXISTS temp.force_vs_z")
+        conn.unregister(LAZY_VALUES_RELATION)
@@ -0,0 +1,110 @@
+import duckdb
+import numpy as np
+import pytest
+
+from db import _cached_pair_extents
+from exporters.csv_exporter import CSVExporter
+from models.curve_batch import CurveBatch
+
+
+def _average_all(batch, x_channel, y_channel, direction, loose=100, grid_points=None):
+    """The single-batch average the export computed before _average_batches (np.mean / np.std)."""
+    dset, ddep = (y_channel, x_channel) if direction == 'H' else (x_channel, y_channel)
+    N = max(2, min(int(batch.lengths(x_channel).max()), int(grid_points or 4096)))
+    lengths = batch.lengths(dset)
+    mins = batch.curve_min(dset)[lengths > 0]
+    maxs_all = batch.curve_max(dset)
+    maxs = maxs_all[lengths > 0]
+    inf = np.max(mins)
+    sup = np.min(maxs) if loose >= 100 else np.percentile(maxs, 100 - loose)
+    newax = np.linspace(inf, sup, N)
+    contributing = (lengths >= 2) & (lengths == batch.lengths(ddep)) & (maxs_all >= sup)
+    neway = [np.interp(newax, batch.curve(dset, i), batch.curve(ddep, i)) for i in np.flatnonzero(contributing)]
+    newyavg, newstd = np.mean(neway, axis=0), np.std(neway, axis=0)
+    return (newyavg, newax, newstd) if direction == 'H' else (newax, newyavg, newstd)
+
+
+def _curves(seed, n_curves=23):
+    rng = np.random.default_rng(seed)
+    curves = []
+    for i in range(n_curves):
+        n = int(rng.integers(20, 300))
+        x = np.sort(rng.uniform(0, 1, n)) * rng.uniform(0.6, 1.4) + rng.uniform(-0.2, 0.2)
+        y = np.abs(x) ** 1.5 * rng.uniform(0.5, 2) + rng.normal(0, 0.01, n)
+        if i % 7 == 3:
+            x[rng.integers(n)] = np.nan  # dropped by _sanitize_xy_pair, not by the average
+        curves.append({"curve_id": f"curve{i}", "x": x, "y": y})
+    return curves
+
+
+def _sources(exporter, curves, batch_size):
+    """fetch_batch / curve_extents over in-memory curves, extents taken from the sanitized batch."""
+    by_id = {c["curve_id"]: c for c in curves}
+
+    def fetch_batch(batch_ids):
+        return exporter._collect_xy([by_id[cid] for cid in batch_ids], "zi", "fi")
+
+    def curve_extents(batch_ids, channel):
+        batch = fetch_batch(batch_ids)
+        return list(zip(batch.curve_min(channel), batch.curve_max(channel), batch.lengths("zi")))
+
+    ids = list(by_id)
+    return fetch_batch, curve_extents, [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("direction", ["V", "H"])
+@pytest.mark.parametrize("loose", [100, 80])
+@pytest.mark.parametrize("batch_size", [1, 5, 23])
+def test_average_batches_matches_single_batch_average(seed, direction, loose, batch_size):
+    exporter = CSVExporter()
+    curves = _curves(seed)
+    fetch_batch, curve_extents, id_batches = _sources(exporter, curves, batch_size)
+
+    averaged = exporter._average_batches(fetch_batch, curve_extents, id_batches, "zi", "fi", direction, loose, 256)
+    expected = _average_all(exporter._collect_xy(curves, "zi", "fi"), "zi", "fi", direction, loose, 256)
+
+    for got, want in zip(averaged, expected):
+        np.testing.assert_allclose(got, want, rtol=1e-10, atol=1e-12)
+
+
+def test_average_batches_fetches_each_batch_once():
+    exporter = CSVExporter()
+    fetch_batch, curve_extents, id_batches = _sources(exporter, _curves(0), 5)
+    fetched = []
+
+    def counting_fetch(batch_ids):
+        fetched.append(tuple(batch_ids))
+        return fetch_batch(batch_ids)
+
+    exporter._average_batches(counting_fetch, curve_extents, id_batches, "zi", "fi", "V")
+    assert fetched == [tuple(ids) for ids in id_batches]
+
+
+def test_average_batches_without_usable_curves():
+    exporter = CSVExporter()
+    assert exporter._average_batches(lambda ids: CurveBatch.from_arrays([]), lambda ids, channel: [], [["curve0"]], "zi", "fi", "V") is None
+
+
+@pytest.mark.parametrize("channel", ["zi", "fi"])
+def test_cached_pair_extents_match_sanitized_curves(channel):
+    exporter = CSVExporter()
+    curves = _curves(4)
+    curves.append({"curve_id": "curve23", "x": np.array([1.0, np.nan]), "y": np.array([np.inf, 2.0])})
+    curves[0]["x"][:4] = [0.5, 0.5, -0.0, 0.0]  # duplicate x count once
+    curves[0]["y"][:4] = [1.0, 1.0, 2.0, 2.0]
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE indentations (curve_id INTEGER, cp_hash VARCHAR, zi DOUBLE[], fi DOUBLE[])")
+    conn.executemany(
+        "INSERT INTO indentations VALUES (?, ?, ?, ?)",
+        [(int(c["curve_id"][5:]), "key", c["x"].tolist(), c["y"].tolist()) for c in curves],
+    )
+
+    extents = _cached_pair_extents(conn, "indentations", "cp_hash", "zi", "fi", channel, {i: "key" for i in range(len(curves))})
+
+    assert extents[23][2] == 0
+    for curve in curves[:-1]:
+        x, y = exporter._sanitize_xy_pair(curve["x"], curve["y"])
+        values = x if channel == "zi" else y
+        lo, hi, n = extents[int(curve["curve_id"][5:])]
+        assert (lo, hi, n) == (values.min(), values.max(), len(x))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from models.curve_batch import CurveBatch
+from transform.transform import BASELINE_POINTS, subtract_baseline
+
+CURVES = [[1.0, 2.0, 3.0], [], [np.nan, -4.0, 5.0, np.nan], [7.0], [np.nan, np.nan]]
+
+
+def _batch():
+    return CurveBatch.from_arrays(np.arange(len(CURVES)), force=CURVES, z=[[i] * len(c) for i, c in enumerate(CURVES)])
+
+
+def test_offsets_and_lengths():
+    batch = _batch()
+    np.testing.assert_array_equal(batch.lengths("force"), [3, 0, 4, 1, 2])
+    np.testing.assert_array_equal(batch.offsets("force"), [0, 3, 3, 7, 8, 10])
+    for i, curve in enumerate(CURVES):
+        np.testing.assert_array_equal(batch.curve("force", i), curve)
+        np.testing.assert_array_equal(batch.arrays("force")[i], curve)
+
+
+@pytest.mark.parametrize("start, stop", [(0, 5), (1, 4), (2, 3), (3, 3), (4, 5), (-2, None), (3, 1)])
+def test_slice_is_a_view_with_rebased_offsets(start, stop):
+    batch = _batch()
+    sub = batch[start:stop]
+    expected = CURVES[start:stop]
+    assert len(sub) == len(expected)
+    np.testing.assert_array_equal(sub.curve_ids, batch.curve_ids[start:stop])
+    np.testing.assert_array_equal(sub.lengths("force"), [len(c) for c in expected])
+    assert sub.offsets("force")[0] == 0
+    np.testing.assert_array_equal(sub.values("force"), np.concatenate([np.asarray(c) for c in expected]) if expected else [])
+    for i, curve in enumerate(expected):
+        np.testing.assert_array_equal(sub.curve("force", i), curve)
+    if len(sub.values("force")):
+        assert np.shares_memory(sub.values("force"), batch.values("force"))
+
+
+def test_slicing_rejects_steps_and_integers():
+    batch = _batch()
+    with pytest.raises(ValueError):
+        batch[::2]
+    with pytest.raises(TypeError):
+        batch[0]
+
+
+def test_curve_min_max_with_empty_and_nan_curves():
+    batch = _batch()
+    np.testing.assert_array_equal(batch.curve_min("force"), [1.0, np.nan, -4.0, 7.0, np.nan])
+    np.testing.assert_array_equal(batch.curve_max("force"), [3.0, np.nan, 5.0, 7.0, np.nan])
+    # Per-curve reductions of a slice start from the slice's own first curve
+    np.testing.assert_array_equal(batch[2:4].curve_min("force"), [-4.0, 7.0])
+    np.testing.assert_array_equal(batch[1:2].curve_max("force"), [np.nan])
+
+
+def test_subtract_baseline_matches_per_segment_mean():
+    rng = np.random.default_rng(0)
+    segments = [rng.normal(size=n) + rng.normal() for n in (0, 1, 5, BASELINE_POINTS - 1, BASELINE_POINTS, BASELINE_POINTS + 1, 1000)]
+    batch = CurveBatch.from_arrays(np.arange(len(segments)), force=segments)
+    subtract_baseline(batch)
+    for segment, corrected in zip(segments, batch.arrays("force")):
+        expected = segment - np.mean(segment[:100]) if len(segment) else segment
+        np.testing.assert_allclose(corrected, expected, rtol=0, atol=1e-12)
@@ -0,0 +1,74 @@
+import duckdb
+import pytest
+
+from db import (
+    _fit_params, emodel_stage_hash, ensure_cache_tables, fmodel_stage_hash, save_curve_results, split_cached_curves,
+)
+
+FILTERS = {"regular": {}, "cp_filters": {"autothresh": {}}, "f_models": {"hertz": {}}, "e_models": {"constant": {}}}
+METADATA = {"spring_constant": 0.1, "tip_radius": 1e-5, "tip_geometry": "sphere", "file_id": "a"}
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    ensure_cache_tables(conn)
+    yield conn
+    conn.close()
+
+
+def test_split_cached_curves(conn):
+    stage_hash = fmodel_stage_hash(FILTERS, METADATA)
+    save_curve_results(conn, [
+        ("fp", 1, stage_hash, "fmodel", "hertz", [1000.0, 2.0]),
+        ("fp", 3, stage_hash, "fmodel", "hertz", [3000.0]),
+        ("other_fp", 0, stage_hash, "fmodel", "hertz", [1.0]),
+        ("fp", 0, "other_stage", "fmodel", "hertz", [1.0]),
+    ])
+    ids = ["curve0", "curve1", "2", "curve3", "curvex"]
+    stored, missing = split_cached_curves(conn, ids, "fp", stage_hash)
+    assert stored == {1: [1000.0, 2.0], 3: [3000.0]}
+    assert missing == ["curve0", "2", "curvex"]
+
+
+def test_saving_a_result_twice_keeps_the_first(conn):
+    stage_hash = fmodel_stage_hash(FILTERS, METADATA)
+    save_curve_results(conn, [("fp", 0, stage_hash, "fmodel", "hertz", [1.0])])
+    save_curve_results(conn, [("fp", 0, stage_hash, "fmodel", "hertz", [2.0])])
+    assert split_cached_curves(conn, ["curve0"], "fp", stage_hash) == ({0: [1.0]}, [])
+
+
+def test_fmodel_stage_hash_tracks_fit_inputs_only():
+    base = fmodel_stage_hash(FILTERS, METADATA)
+    # Regular filters and metadata that does not reach the fit leave the hash alone
+    assert fmodel_stage_hash({**FILTERS, "regular": {"median": {"window": 5}}}, {**METADATA, "file_id": "b"}) == base
+    assert fmodel_stage_hash(FILTERS, METADATA, {"maxInd": 800, "minInd": 0, "poisson": 0.5}) == base
+    for changed in (
+        fmodel_stage_hash({**FILTERS, "cp_filters": {"threshold": {}}}, METADATA),
+        fmodel_stage_hash({**FILTERS, "f_models": {"driftedhertz": {}}}, METADATA),
+        fmodel_stage_hash(FILTERS, {**METADATA, "spring_constant": 0.2}),
+        fmodel_stage_hash(FILTERS, METADATA, {"maxInd": 500, "minInd": 0, "poisson": 0.5}),
+        fmodel_stage_hash(FILTERS, METADATA, set_zero_force=False),
+        fmodel_stage_hash(FILTERS, None),
+    ):
+        assert changed != base
+
+
+def test_emodel_stage_hash_tracks_elspectra_settings():
+    base = emodel_stage_hash(FILTERS, METADATA)
+    assert emodel_stage_hash(FILTERS, METADATA, {"window": 61, "order": 2, "interpolate": True}) == base
+    assert emodel_stage_hash(FILTERS, METADATA, {"window": 31}) != base
+    assert emodel_stage_hash({**FILTERS, "e_models": {"linemax": {}}}, METADATA) != base
+    assert emodel_stage_hash(FILTERS, METADATA) != fmodel_stage_hash(FILTERS, METADATA)
+
+
+def test_fit_params_of_models_without_params():
+    assert _fit_params([[0.0], [1.0], [5.0, 6.0]]) == [5.0, 6.0]
+    assert _fit_params([[0.0], [1.0]]) is None  # e.g. sigmoidnew returns only the fitted curve
+    assert _fit_params(None) is None
+
+
+def test_failed_save_raises(conn):
+    conn.execute("DROP TABLE curve_results")
+    with pytest.raises(duckdb.Error):
+        save_curve_results(conn, [("fp", 0, "stage", "fmodel", "hertz", [1.0])])
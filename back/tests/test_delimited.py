@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from file_types.csv import _parse_csv_metadata, _split_csv_line
+from file_types.delimited import iter_delimited_curves
+
+
+def _curves(path, chunk_rows=200_000):
+    return list(iter_delimited_curves(
+        str(path), "force", "z",
+        delimiter=",",
+        split_line=_split_csv_line,
+        split_header=_split_csv_line,
+        parse_metadata=_parse_csv_metadata,
+        chunk_rows=chunk_rows,
+    ))
+
+
+def test_blocks_carry_metadata_over(tmp_path):
+    path = tmp_path / "curves.csv"
+    path.write_text(
+        "spring_constant,0.1\nsample,cells\nindex,z,force\n0,1.0,10.0\n1,2.0,20.0\n"
+        "\nspring_constant,0.2\nindex,z,force\n0,3.0,30.0\n1,4.0,40.0\n2,5.0,50.0\n"
+        "index,force,z\n0,60.0,6.0\n"
+    )
+    curves = _curves(path)
+
+    assert [meta for meta, _, _ in curves] == [
+        {"spring_constant": "0.1", "sample": "cells"},
+        {"spring_constant": "0.2", "sample": "cells"},
+        {"spring_constant": "0.2", "sample": "cells"},
+    ]
+    np.testing.assert_array_equal(curves[0][1], [10.0, 20.0])
+    np.testing.assert_array_equal(curves[0][2], [1.0, 2.0])
+    np.testing.assert_array_equal(curves[1][1], [30.0, 40.0, 50.0])
+    np.testing.assert_array_equal(curves[2][1], [60.0])  # Column order may change between blocks
+    np.testing.assert_array_equal(curves[2][2], [6.0])
+
+
+def test_repeated_columns_hold_one_curve_each(tmp_path):
+    path = tmp_path / "side_by_side.csv"
+    path.write_text("z,force,z,force\n1,10,2,20\n3,30,4,40\n")
+    curves = _curves(path)
+
+    assert len(curves) == 2
+    np.testing.assert_array_equal(curves[0][1], [10.0, 30.0])
+    np.testing.assert_array_equal(curves[1][1], [20.0, 40.0])
+    np.testing.assert_array_equal(curves[1][2], [2.0, 4.0])
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 100, 1000])
+def test_malformed_rows_are_skipped(tmp_path, chunk_rows):
+    bad = {17: "17,abc,1.0", 150: "150,1.0", 151: '"151","1.5",', 299: "299,nan,1e400x"}
+    lines = ["index,z,force"]
+    expected = []
+    for i in range(300):
+        if i in bad:
+            lines.append(bad[i])
+        else:
+            lines.append(f"{i},{i * 0.5},{-i * 1e-9}")
+            expected.append((-i * 1e-9, i * 0.5))
+    path = tmp_path / "malformed.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    [(meta, force, z)] = _curves(path, chunk_rows)
+
+    assert meta == {}
+    np.testing.assert_array_equal(force, [f for f, _ in expected])
+    np.testing.assert_array_equal(z, [z for _, z in expected])
+
+
+def test_missing_column(tmp_path):
+    path = tmp_path / "missing.csv"
+    path.write_text("index,z,deflection\n0,1,2\n")
+    with pytest.raises(ValueError, match="force"):
+        _curves(path)
+    path.write_text("index,z,deflection\n")
+    with pytest.raises(ValueError, match="force"):
+        _curves(path)
+
+
+def test_chunk_rows_must_be_positive(tmp_path):
+    path = tmp_path / "curves.csv"
+    path.write_text("z,force\n1,2\n")
+    with pytest.raises(ValueError):
+        _curves(path, chunk_rows=0)
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import duckdb
+import pytest
+
+import db
+
+CURVE_IDS = [f"curve{i}" for i in range(10, 33)]
+
+
+@pytest.fixture
+def fake_batches(monkeypatch):
+    """Replace the selection and per-batch work; batch k sleeps delays[k] seconds."""
+    state = {"delays": {}, "started": [], "finished": [], "lock": threading.Lock()}
+
+    def selection(conn, filters, num_curves, elasticity_params, elastic_model_params):
+        state["selection_thread"] = threading.get_ident()
+        return CURVE_IDS, "fp", {}, "stage"
+
+    def batch(conn, batch_ids, positions, *args):
+        k = CURVE_IDS.index(batch_ids[0]) // 5
+        with state["lock"]:
+            state["started"].append(k)
+        time.sleep(state["delays"].get(k, 0.01))
+        with state["lock"]:
+            state["finished"].append(k)
+        return [{"curve_id": cid, "curve_index": positions[int(cid[5:])]} for cid in batch_ids]
+
+    monkeypatch.setattr(db, "_elasticity_selection", selection)
+    monkeypatch.setattr(db, "_elasticity_params_for_batch", batch)
+    return state
+
+
+def _batches(**kwargs):
+    return db.compute_elasticity_params_batched(None, {}, batch_size=5, **kwargs)
+
+
+def test_batches_arrive_in_completion_order_with_global_indices(fake_batches):
+    fake_batches["delays"] = {0: 0.3}
+
+    async def collect():
+        return threading.get_ident(), [item async for item in _batches(max_workers=2)]
+
+    loop_thread, items = asyncio.run(collect())
+
+    assert fake_batches["selection_thread"] != loop_thread
+    assert [item[0] for item in items] == [1, 2, 3, 4, 5]
+    # done counts the curves of the batches delivered so far (the last batch holds 3)
+    assert [item[2] for item in items] == [5, 10, 15, 18, 23]
+    assert all(item[1] == 5 and item[3] == 23 for item in items)
+    # The slow first batch is delivered last, its rows still indexed within the whole selection
+    assert [row["curve_id"] for row in items[-1][4]] == CURVE_IDS[:5]
+    rows = [row for item in items for row in item[4]]
+    assert sorted((row["curve_index"], row["curve_id"]) for row in rows) == list(enumerate(CURVE_IDS))
+
+
+def test_slow_consumer_throttles_submission(fake_batches):
+    async def consume():
+        batches = _batches(max_workers=2, max_in_flight=2)
+        await batches.__anext__()
+        await asyncio.sleep(0.2)
+        started_while_paused = list(fake_batches["started"])
+        rest = [item async for item in batches]
+        return started_while_paused, rest
+
+    started_while_paused, rest = asyncio.run(consume())
+
+    assert len(started_while_paused) == 2
+    assert len(rest) == 4
+
+
+def test_closing_early_waits_for_running_batches(fake_batches):
+    fake_batches["delays"] = {1: 0.3}
+
+    async def consume():
+        batches = _batches(max_workers=2, max_in_flight=4)
+        await batches.__anext__()
+        await batches.aclose()
+        return list(fake_batches["started"]), list(fake_batches["finished"])
+
+    started, finished = asyncio.run(consume())
+
+    assert sorted(started) == sorted(finished)
+    assert len(started) < 5
+
+
+def test_batch_rows_use_positions_and_skip_unknown_curves(monkeypatch):
+    monkeypatch.setattr(db, "split_cached_curves", lambda conn, ids, fp, stage: ({11: [1.0]}, ["curve12"]))
+    elspectra = {"curves_elasticity_param": [
+        {"curve_id": "curve12", "curve_index": 1, "elasticity_param": [2.0]},
+        {"curve_id": "curve99", "curve_index": 0, "elasticity_param": [3.0]},
+    ]}
+    monkeypatch.setattr(db, "fetch_curves_batch", lambda *args, **kwargs: (None, None, elspectra))
+
+    rows = db._elasticity_params_for_batch(
+        duckdb.connect(), ["curve11", "curve12"], {11: 7, 12: 8}, "fp", {}, {}, "stage", None, None
+    )
+
+    assert [(row["curve_id"], row["curve_index"]) for row in rows] == [("curve11", 7), ("curve12", 8)]
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from routers import exporter as exporter_router
+
+
+class _StreamingExporter:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.first_chunk_thread = None
+
+    def validate_params(self, data):
+        pass
+
+    def iter_chunks(self, db_path, curve_ids=None, **kwargs):
+        for i, chunk in enumerate(self.chunks):
+            if i == 0:
+                self.first_chunk_thread = threading.get_ident()
+            yield chunk
+
+
+def _export(monkeypatch, fake):
+    monkeypatch.setattr(exporter_router, "get_exporter", lambda extension: fake)
+
+    async def call():
+        response = await exporter_router.export_endpoint("csv", {"stream": True, "curve_ids": ["curve0"]})
+        return threading.get_ident(), b"".join([chunk.encode() async for chunk in response.body_iterator])
+
+    return asyncio.run(call())
+
+
+def test_first_chunk_is_produced_off_the_event_loop(monkeypatch):
+    fake = _StreamingExporter(["a,b\n", "1,2\n"])
+    loop_thread, body = _export(monkeypatch, fake)
+
+    assert body == b"a,b\n1,2\n"
+    assert fake.first_chunk_thread not in (None, loop_thread)
+
+
+def test_empty_stream_is_an_error_response(monkeypatch):
+    with pytest.raises(HTTPException) as exc_info:
+        _export(monkeypatch, _StreamingExporter([]))
+    assert exc_info.value.status_code == 500
+    assert "No curves" in exc_info.value.detail["message"]
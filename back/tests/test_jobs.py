@@ -0,0 +1,42 @@
+import duckdb
+import pytest
+
+from db import ensure_cache_tables, split_cached_curves
+from jobs.manager import JobManager
+
+ROWS = [("fp", 0, "stage", "fmodel", "hertz", [1000.0]), ("fp", 1, "stage", "fmodel", "hertz", [2000.0])]
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(str(tmp_path / "jobs.db"))
+    conn = manager._connect()
+    ensure_cache_tables(conn)
+    conn.execute("INSERT INTO jobs (job_id, status, done_batches) VALUES ('job', 'running', 0)")
+    conn.close()
+    return manager
+
+
+def _checkpoints(conn):
+    return conn.execute("SELECT batch_idx FROM job_batches WHERE job_id = 'job'").fetchall()
+
+
+def test_checkpoint_stores_results_with_the_batch(manager):
+    conn = manager._connect()
+    manager._checkpoint(conn, "job", 0, 2, ROWS)
+
+    assert _checkpoints(conn) == [(0,)]
+    assert conn.execute("SELECT done_batches FROM jobs").fetchone() == (1,)
+    assert split_cached_curves(conn, ["curve0", "curve1"], "fp", "stage") == ({0: [1000.0], 1: [2000.0]}, [])
+    conn.close()
+
+
+def test_failed_result_write_leaves_the_batch_pending(manager):
+    conn = manager._connect()
+    conn.execute("DROP TABLE curve_results")
+    with pytest.raises(duckdb.Error):
+        manager._checkpoint(conn, "job", 0, 2, ROWS)
+
+    assert _checkpoints(conn) == []
+    assert conn.execute("SELECT done_batches FROM jobs").fetchone() == (0,)
+    conn.close()
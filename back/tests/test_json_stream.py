@@ -0,0 +1,74 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from file_types.json_stream import JSON_READ_CHUNK, iter_json_datasets
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 16, 61, JSON_READ_CHUNK]
+
+
+def _random_number(rng: random.Random):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.randint(-10**6, 10**6)
+    if kind == 1:
+        return rng.uniform(-1, 1)
+    if kind == 2:
+        return rng.uniform(-1, 1) * 10 ** rng.randint(-12, 12)
+    return 0.0123
+
+
+def _document(seed: int) -> dict:
+    rng = random.Random(seed)
+    datasets = {}
+    for i in range(rng.randint(1, 6)):
+        entry = {
+            "alias": rng.choice(["Force", "Z", "Time", 'quote " and \\ slash', "ünïcode"]),
+            "value": [_random_number(rng) for _ in range(rng.randint(0, 40))],
+            "attributes": {"unit": rng.choice(["N", "m", None]), "scale": _random_number(rng), "flags": [True, False, None]},
+        }
+        if rng.random() < 0.3:
+            entry["value"] = _random_number(rng)  # Scalar dataset
+        datasets[f"curve{i}/segment0/{i}"] = entry
+    return {"version": 1, "datasets": datasets, "meta": {"spring_constant": _random_number(rng)}}
+
+
+def _assert_same(streamed, expected):
+    assert set(streamed) == set(expected)
+    for key, value in expected.items():
+        if key == "value" and isinstance(value, list):
+            np.testing.assert_array_equal(np.asarray(streamed[key], dtype=np.float64), np.asarray(value, dtype=np.float64))
+        else:
+            assert streamed[key] == value
+
+
+def _compare(path, chunk_size):
+    with open(path, "r") as f:
+        expected = json.load(f)
+    top_level = {}
+    streamed = dict(iter_json_datasets(str(path), top_level=top_level, chunk_size=chunk_size))
+    assert list(streamed) == list(expected["datasets"])
+    for dataset_id, dataset in expected["datasets"].items():
+        _assert_same(streamed[dataset_id], dataset)
+    assert top_level == {key: value for key, value in expected.items() if key != "datasets"}
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("seed", range(8))
+def test_iter_json_datasets_matches_json_load(tmp_path, seed, indent, chunk_size):
+    path = tmp_path / "curves.json"
+    path.write_text(json.dumps(_document(seed), indent=indent))
+    _compare(path, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_scalar_split_inside_a_number(tmp_path, chunk_size):
+    # With the prefix below, the default chunk size ends the first read right after "0."
+    prefix = '{"datasets": {"c": {"value": '
+    padding = " " * (JSON_READ_CHUNK - len(prefix) - 2)
+    path = tmp_path / "scalar.json"
+    path.write_text(prefix + padding + '0.0123, "alias": "x"}}}')
+    _compare(path, chunk_size)
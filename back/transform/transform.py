@@ -1,13 +1,39 @@
 from typing import Dict
 from models.force_curve import ForceCurve
+from models.curve_batch import CurveBatch
 import numpy as np
 
+# Leading samples of each segment averaged for the baseline
+BASELINE_POINTS = 100
+
+def subtract_baseline(batch: CurveBatch, channel: str = "force") -> None:
+    """Subtract from every curve of the batch the mean of its first BASELINE_POINTS samples, in place."""
+    values = batch.values(channel)
+    starts = batch.offsets(channel)[:-1]
+    lengths = batch.lengths(channel)
+    head = np.minimum(lengths, BASELINE_POINTS)
+    head_starts = np.cumsum(head) - head
+    head_index = np.repeat(starts - head_starts, head) + np.arange(head.sum())
+    baseline = np.zeros(len(batch))
+    nonempty = head > 0
+    if nonempty.any():
+        baseline[nonempty] = np.add.reduceat(values[head_index], head_starts[nonempty]) / head[nonempty]
+    values -= np.repeat(baseline, lengths)
+
 def transform_data(curves: Dict[str, ForceCurve]) -> Dict[str, ForceCurve]:
-    """Apply transformations to ForceCurve objects (e.g., baseline correction)."""
+    """
+    Apply transformations to ForceCurve objects (e.g., baseline correction).
+    All segments of the chunk are corrected at once on a CurveBatch; afterwards
+    each segment's deflection is a view into the batch's force buffer.
+    """
+    segments = [segment for curve in curves.values() for segment in curve.segments]
+    batch = CurveBatch.from_arrays(np.arange(len(segments)), force=[segment.deflection for segment in segments])
+    # Example: Baseline correction
+    subtract_baseline(batch)
+
+    for segment, deflection in zip(segments, batch.arrays("force")):
+        segment.deflection = deflection
     for curve in curves.values():
-        for segment in curve.segments:
-            # Example: Baseline correction
-            segment.deflection -= np.mean(segment.deflection[:100])
         # Example: Add analysis results
         curve.analysis = {"youngs_modulus": 1000, "model": "hertz"}
-    return curves
\ No newline at end of file
+    return curves
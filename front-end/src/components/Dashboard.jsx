@@ -468,6 +468,8 @@ const Dashboard = () => {
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
       let buffer = "";
+      // Rows arrive per batch; render them as they come in
+      let streamedFparams = [];
 
       while (true) {
         const { done, value } = await reader.read();
@@ -498,11 +500,14 @@ const Dashboard = () => {
                   totalBatches: data.total_batches || 0,
                   isLoading: true
                 });
+              } else if (data.type === 'rows') {
+                streamedFparams = streamedFparams.concat(data.fparams || []);
+                setAllFparams(streamedFparams);
               } else if (data.type === 'complete') {
                 // Final result received
                 setFparamsProgress(prev => ({ ...prev, isLoading: false, phase: "Complete" }));
                 if (data.status === "success") {
-                  setAllFparams(data.fparams || []);
+                  setAllFparams(streamedFparams);
                   setLastFparamsKey(fparamsCacheKey);
                 } else {
                   setAllFparams([]);
@@ -639,6 +644,8 @@ const Dashboard = () => {
         const reader = response.body.getReader();
         const decoder = new TextDecoder();
         let buffer = "";
+        // Rows arrive per batch; render them as they come in
+        let streamedElasticity = [];
         while (true) {
           const { done, value } = await reader.read();
           if (done) break;
@@ -669,10 +676,13 @@ const Dashboard = () => {
                   totalBatches: data.total_batches || 0,
                   isLoading: true,
                 });
+              } else if (data.type === "rows") {
+                streamedElasticity = streamedElasticity.concat(data.elasticity_params || []);
+                setAllElasticityParams(streamedElasticity);
               } else if (data.type === "complete") {
                 setEparamsProgress(prev => ({ ...prev, isLoading: false, phase: "Complete" }));
                 if (data.status === "success") {
-                  setAllElasticityParams(data.elasticity_params || []);
+                  setAllElasticityParams(streamedElasticity);
                   setLastElasticityKey(eparamsCacheKey);
                 } else {
                   setAllElasticityParams([]);
@@ -530,6 +530,9 @@ const ExportButton = ({
                             {calculatedMetadata.hertz_max_indentation_nm > 0 && (
                               <><strong>Hertz max indentation [nm]:</strong> {calculatedMetadata.hertz_max_indentation_nm.toFixed(1)}<br/></>
                             )}
+                            {calculatedMetadata.exact === false && (
+                              <em>Estimated from a sample of curves; the export computes exact values.</em>
+                            )}
                           </Typography>
                         </Box>
                       ) : (